@@ -4,10 +4,10 @@
 # License:             BSD-3-Clause
 # Author:              valery brinnel <firstname.lastname@gmail.com>
 # Date:                10.03.2020
-# Last Modified Date:  09.10.2021
+# Last Modified Date:  19.10.2026
 # Last Modified By:    valery brinnel <firstname.lastname@gmail.com>
 
-from typing import Any, Generic
+from typing import Any, Generic, ClassVar
 from ampel.types import T
 from ampel.base.AmpelABC import AmpelABC
 from ampel.base.decorator import abstractmethod
@@ -19,6 +19,10 @@ class AbsDocIngester(Generic[T], AmpelABC, AmpelBaseModel, abstract=True):
 
 	updates_buffer: DBUpdatesBuffer
 
+	#: Fields always included in the upsert filters of this ingester (None: unknown).
+	#: Used to check that upserts can be routed to a single shard (see AmpelDB.check_targetable)
+	match_keys: ClassVar[None | tuple[str, ...]] = None
+
 	@abstractmethod
 	def ingest(self, doc: T) -> None:
 		...
@@ -4,11 +4,11 @@
 # License:             BSD-3-Clause
 # Author:              valery brinnel <firstname.lastname@gmail.com>
 # Date:                09.12.2019
-# Last Modified Date:  17.02.2020
+# Last Modified Date:  19.10.2026
 # Last Modified By:    valery brinnel <firstname.lastname@gmail.com>
 
 from typing import ClassVar
-from collections.abc import Iterable
+from collections.abc import Iterable, Iterator
 from ampel.base.AmpelABC import AmpelABC
 from ampel.base.decorator import abstractmethod
 from ampel.core.ContextUnit import ContextUnit
@@ -22,3 +22,14 @@ class AbsT3Selector(AmpelABC, ContextUnit, abstract=True):
 	@abstractmethod
 	def fetch(self) -> None | Iterable:
 		""" Get selected stock ids """
+
+
+	def fetch_pages(self, page_size: int) -> Iterator[list]:
+		"""
+		Get selected stock ids in pages of (at most) page_size elements.
+		The default implementation consumes the results of fetch() entirely before paging,
+		subclasses may override this method to stream the selection.
+		"""
+		ids = list(self.fetch() or [])
+		for i in range(0, len(ids), page_size):
+			yield ids[i:i + page_size]
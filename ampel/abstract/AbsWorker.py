@@ -4,12 +4,13 @@
 # License:             BSD-3-Clause
 # Author:              valery brinnel <firstname.lastname@gmail.com>
 # Date:                28.05.2021
-# Last Modified Date:  14.12.2021
+# Last Modified Date:  19.10.2026
 # Last Modified By:    valery brinnel <firstname.lastname@gmail.com>
 
 import gc, signal
-from time import time
-from typing import ClassVar, Any, TypeVar, Generic, Literal
+from time import time, monotonic
+from collections import OrderedDict
+from typing import ClassVar, Any, TypeVar, Generic, Literal, cast
 
 from ampel.types import OneOrMany, JDict, UBson, Tag
 from ampel.base.decorator import abstractmethod
@@ -23,6 +24,7 @@ from ampel.content.T2Document import T2Document
 from ampel.enum.MetaActionCode import MetaActionCode
 from ampel.log import AmpelLogger, LogFlag, VERBOSE, DEBUG
 from ampel.core.EventHandler import EventHandler
+from ampel.core.UnitClaimScheduler import UnitClaimScheduler
 from ampel.log.utils import report_exception, report_error
 from ampel.log.handlers.DefaultRecordBufferingHandler import DefaultRecordBufferingHandler
 from ampel.util.hash import build_unsafe_dict_id
@@ -32,6 +34,7 @@ from ampel.mongo.update.MongoStockUpdater import MongoStockUpdater
 from ampel.mongo.utils import maybe_use_each
 from ampel.metrics.AmpelMetricsRegistry import AmpelMetricsRegistry, Histogram, Counter
 from ampel.util.tag import merge_tags
+from ampel.util.compact import encode_arrays
 
 T = TypeVar("T", T1Document, T2Document)
 
@@ -69,6 +72,40 @@ class AbsWorker(Generic[T], AbsEventUnit, abstract=True):
 	#: maximum number of processing attempts per document
 	max_try: int = 5
 
+	#: Enables weighted fair scheduling of claims across units (see :class:`~ampel.core.UnitClaimScheduler.UnitClaimScheduler`).
+	#: Key: unit name, value: number of documents claimed per cycle for this unit.
+	#: If None, documents are claimed in natural order regardless of their unit.
+	unit_weights: None | dict[str, int] = None
+
+	#: Number of documents claimed per cycle for units not listed in unit_weights
+	default_unit_weight: int = 1
+
+	#: Min number of seconds between two counts of claimable documents per unit (weighted scheduling only)
+	unit_backlog_refresh: float = 10
+
+	#: Max number of unit instances (one per unit and config) kept between documents and runs.
+	#: Least recently used instances are discarded first.
+	unit_cache_size: int = 128
+
+	#: Max lifetime in seconds of cached unit instances (None: unlimited)
+	unit_cache_ttl: None | float = None
+
+	#: Name of a collection (ex: 't2summary') holding, for each stock, the latest successful
+	#: result (code 0) of every unit. The collection is maintained upon result commits
+	#: and can be used by :class:`~ampel.t3.supply.select.T3FilteringStockSelector.T3FilteringStockSelector`.
+	#: The entry of a unit is removed when a document of this unit is committed with a non-zero code.
+	#: Summary docs: {'_id': <stock id>, 'channel': [...], <unit name>: <last body element>, ...}
+	summary_col: None | str = None
+
+	#: Store numeric arrays (ex: covariance matrices) of at least this many elements contained in result bodies
+	#: as compact binaries (see :func:`~ampel.util.compact.encode_arrays`). Bodies are decoded transparently
+	#: by DataLoader and by workers gathering dependencies. Summary docs are never encoded. None: disabled
+	compact_arrays: None | int = None
+
+	#: Number of bodies kept per document: older bodies of re-processed documents are discarded
+	#: (whereas meta records are kept). None: all bodies are kept
+	max_bodies: None | int = None
+
 	tier: ClassVar[Literal[1, 2]]
 
 	#: For later
@@ -96,6 +133,8 @@ class AbsWorker(Generic[T], AbsEventUnit, abstract=True):
 		self.col_t0 = self._ampel_db.get_collection('t0')
 		self.col_t1 = self._ampel_db.get_collection('t1')
 		self.col = self._ampel_db.get_collection(f't{self.tier}')
+		self._ampel_db.check_claimable(f't{self.tier}')
+		self.col_summary = self._ampel_db.get_collection(self.summary_col) if self.summary_col else None
 
 		if self.send_beacon:
 			self.create_beacon()
@@ -105,9 +144,12 @@ class AbsWorker(Generic[T], AbsEventUnit, abstract=True):
 		signal.signal(signal.SIGTERM, self.sig_exit)
 		signal.signal(signal.SIGINT, self.sig_exit)
 
-		# _instances stores unit instances so that they can be re-used in run()
-		# Key: set(unit name + config), value: unit instance
-		self._instances: JDict = {}
+		# _instances stores unit instances so that they can be re-used across documents and runs
+		# Key: set(unit name + config), value: (unit instance, creation time)
+		self._instances: OrderedDict[str, tuple[LogicalUnit, float]] = OrderedDict()
+
+		# ids of documents deferred during the current run (see defer())
+		self._deferred_ids: list[Any] = []
 
 
 	@abstractmethod
@@ -155,20 +197,46 @@ class AbsWorker(Generic[T], AbsEventUnit, abstract=True):
 		garbage_collect = self.garbage_collect
 		doc_limit = self.doc_limit
 
+		self._deferred_ids.clear()
+		progress = False
+
+		scheduler = UnitClaimScheduler(
+			self.col, self.query, self.tier, self.unit_weights, self.default_unit_weight,
+			prio_code = DocumentCode.T2_NEW_PRIO if self.tier == 2 else DocumentCode.T1_NEW_PRIO,
+			refresh_interval = self.unit_backlog_refresh
+		) if self.unit_weights is not None else None
+
 		# Process docs until next() returns None (breaks condition below)
 		self._run = True
 		while self._run:
 
 			# get t1/t2 document (code is usually NEW or NEW_PRIO)
-			doc = self.col.find_one_and_update(self.query, update)
+			if scheduler:
+				doc = scheduler.claim(update, self._deferred_ids)
+			else:
+				doc = self.col.find_one_and_update(
+					self.query | {'_id': {'$nin': self._deferred_ids}} if self._deferred_ids else self.query,
+					update
+				)
 
 			# Cursor exhausted
 			if doc is None:
+
+				# Give deferred documents another chance if other documents were processed meanwhile
+				if self._deferred_ids and progress:
+					self._deferred_ids.clear()
+					progress = False
+					continue
+
 				break
+
 			elif logger.verbose > 1:
 				logger.debug(f'T{self.tier} doc to process: {doc}')
 
-			self.process_doc(doc, stock_updr, logger)
+			deferred = len(self._deferred_ids)
+			self.process_doc(cast(T, doc), stock_updr, logger)
+			if len(self._deferred_ids) == deferred:
+				progress = True
 
 			# Check possibly defined doc_limit
 			if doc_limit and self._doc_counter >= doc_limit:
@@ -177,13 +245,36 @@ class AbsWorker(Generic[T], AbsEventUnit, abstract=True):
 			if garbage_collect:
 				gc.collect()
 
+		self.on_run_end(event_hdlr, logger)
 		event_hdlr.update(logger, _overwrite=True, docs=self._doc_counter, run=run_id)
 
 		logger.flush()
-		self._instances.clear()
+		self._deferred_ids.clear()
+
+		# Unit instances are kept for the next run, buffered log records are not
+		for unit, _ in self._instances.values():
+			unit._buf_hdlr.buffer.clear() # type: ignore[attr-defined]
 		return self._doc_counter
 
 
+	def defer(self, doc: T) -> None:
+		"""
+		Excludes the provided document from subsequent claims during the current run,
+		until other documents have been processed.
+		Typically used for documents whose requirements (ex: dependencies) are not fulfilled yet.
+		"""
+		self._deferred_ids.append(doc['_id']) # type: ignore[typeddict-item]
+
+
+	def on_run_end(self, event_hdlr: EventHandler, logger: AmpelLogger) -> None:
+		"""
+		Called once all documents of a run were processed, before the event document is updated.
+		Subclasses can override this method to release run-bound resources
+		or to add run statistics to the event document (using event_hdlr.add_extra)
+		"""
+		pass
+
+
 	def _processing_error(self,
 		logger: AmpelLogger, doc: T, body: UBson,
 		meta: MetaRecord, msg: None | str = None,
@@ -219,7 +310,7 @@ class AbsWorker(Generic[T], AbsEventUnit, abstract=True):
 
 		meta['extra']['msg'] = msg
 
-		self.commit_update({'_id': doc['_id']}, meta, logger, code=DocumentCode.EXCEPTION) # type: ignore[typeddict-item]
+		self.commit_update({'_id': doc['_id']}, meta, logger, code=DocumentCode.EXCEPTION, doc=doc) # type: ignore[typeddict-item]
 
 		info: JDict = (extra or {}) | meta | {'stock': doc['stock'], 'doc': doc}
 		if exception:
@@ -235,10 +326,12 @@ class AbsWorker(Generic[T], AbsEventUnit, abstract=True):
 		payload_op: Literal['$push', '$set'] = '$push',
 		body: UBson = None,
 		tag: None | OneOrMany[Tag] = None,
-		code: int = 0
+		code: int = 0,
+		doc: None | T = None
 	) -> None:
 		"""
 		Insert/upsert tier docs into DB.
+		:param doc: the processed document, required to update the summary collection (see summary_col)
 		"""
 
 		if logger.verbose:
@@ -274,11 +367,30 @@ class AbsWorker(Generic[T], AbsEventUnit, abstract=True):
 			}
 
 		if body is not None:
-			upd[payload_op]['body'] = body
+			stored = body if self.compact_arrays is None else encode_arrays(body, self.compact_arrays)
+			if payload_op == '$push' and self.max_bodies:
+				upd['$push']['body'] = {'$each': [stored], '$slice': -self.max_bodies}
+			else:
+				upd[payload_op]['body'] = stored
 
 		# Update document
 		self.col.update_one(match, upd)
 
+		# Update latest result of this unit for the associated stock
+		if self.col_summary is not None and doc:
+			if code == 0 and body is not None and payload_op == '$push':
+				self.col_summary.update_one(
+					{'_id': doc['stock']},
+					{
+						'$set': {doc['unit']: body},
+						'$addToSet': {'channel': maybe_use_each(doc['channel'])}
+					},
+					upsert = True
+				)
+			# Consistent with the t2 collection, where latest results are only considered if code is 0
+			elif code != 0:
+				self.col_summary.update_one({'_id': doc['stock']}, {'$unset': {doc['unit']: ''}})
+
 
 	def gen_meta(self,
 		run_id: int,
@@ -342,29 +454,49 @@ class AbsWorker(Generic[T], AbsEventUnit, abstract=True):
 
 		k = f'{doc["unit"]}_{doc["config"]}'
 
-		# Check if T2 instance exists in this run
-		if k not in self._instances:
+		if k in self._instances:
 
-			# Create channel (buffering) logger
-			buf_hdlr = DefaultRecordBufferingHandler(level=logger.level)
-			buf_logger = AmpelLogger.get_logger(
-				name = k,
-				base_flag = (getattr(logger, 'base_flag', 0) & ~LogFlag.CORE) | LogFlag.UNIT,
-				console = False,
-				handlers = [buf_hdlr]
-			)
+			unit_instance, created = self._instances[k]
+			if self.unit_cache_ttl is None or monotonic() - created < self.unit_cache_ttl:
+				self._instances.move_to_end(k)
+				return unit_instance
 
-			# Instantiate unit
-			unit_instance = self._loader.new_logical_unit(
-				model = UnitModel(unit = doc['unit'], config = doc['config']),
-				logger = buf_logger
-			)
+			self._evict_unit_instance(k)
+
+		start = monotonic()
+
+		# Create channel (buffering) logger
+		buf_hdlr = DefaultRecordBufferingHandler(level=logger.level)
+		buf_logger = AmpelLogger.get_logger(
+			name = k,
+			base_flag = (getattr(logger, 'base_flag', 0) & ~LogFlag.CORE) | LogFlag.UNIT,
+			console = False,
+			handlers = [buf_hdlr],
+			force_refresh = True
+		)
+
+		# Instantiate unit
+		unit_instance = self._loader.new_logical_unit(
+			model = UnitModel(unit = doc['unit'], config = doc['config']),
+			logger = buf_logger
+		)
 
-			# Shortcut to avoid unit_instance.logger.handlers[?]
-			setattr(unit_instance, '_buf_hdlr', buf_hdlr)
-			self._instances[k] = unit_instance
+		# Shortcut to avoid unit_instance.logger.handlers[?]
+		setattr(unit_instance, '_buf_hdlr', buf_hdlr)
 
-		return self._instances[k]
+		now = monotonic()
+		get_instantiation_stats(self.tier).labels(doc['unit']).observe(now - start)
+		self._instances[k] = unit_instance, now
+
+		while len(self._instances) > self.unit_cache_size:
+			self._evict_unit_instance(next(iter(self._instances)))
+
+		return unit_instance
+
+
+	def _evict_unit_instance(self, k: str) -> None:
+		del self._instances[k]
+		AmpelLogger.loggers.pop(k, None)
 
 
 def register_stats(tier: int) -> tuple[Histogram, Counter]:
@@ -385,3 +517,20 @@ def register_stats(tier: int) -> tuple[Histogram, Counter]:
 	)
 
 	return hist, counter
+
+
+_instantiation_stats: dict[int, Histogram] = {}
+
+
+def get_instantiation_stats(tier: int) -> Histogram:
+
+	if tier not in _instantiation_stats:
+		_instantiation_stats[tier] = AmpelMetricsRegistry.histogram(
+			'unit_instantiation',
+			f'Time required to instantiate T{tier} units',
+			subsystem=f't{tier}',
+			unit='seconds',
+			labelnames=('unit', ),
+		)
+
+	return _instantiation_stats[tier]
@@ -4,13 +4,15 @@
 # License:             BSD-3-Clause
 # Author:              valery brinnel <firstname.lastname@gmail.com>
 # Date:                18.03.2021
-# Last Modified Date:  11.11.2021
+# Last Modified Date:  19.10.2026
 # Last Modified By:    valery brinnel <firstname.lastname@gmail.com>
 
 import re
 from typing import Any, TypeVar, Tuple
 from collections.abc import Sequence, Iterator
 from ampel.core.AmpelDB import AmpelDB
+from ampel.cli.ArgParserBuilder import ArgParserBuilder
+from ampel.mongo.model.ReadPreferenceModel import ReadPreferenceModel
 from ampel.config.AmpelConfig import AmpelConfig
 from ampel.secret.AmpelVault import AmpelVault
 from ampel.abstract.AbsCLIOperation import AbsCLIOperation
@@ -121,6 +123,14 @@ class AbsCoreCommand(AbsCLIOperation, abstract=True):
 
 		vault = self.get_vault(args)
 		db = self.get_db(config, vault, require_existing_db, one_db)
+
+		# See add_read_preference_args
+		if args.get('read_preference'):
+			db.read_preference = ReadPreferenceModel(
+				mode = args['read_preference'],
+				max_staleness = args.get('max_staleness') or -1
+			)
+
 		return ContextClass(
 			config = config,
 			db = db,
@@ -129,6 +139,21 @@ class AbsCoreCommand(AbsCLIOperation, abstract=True):
 		)
 
 
+	def get_read_preference_args_help(self) -> dict[str, str]:
+		return {
+			'read-preference': 'Route queries to replica set members according to the provided read preference mode\n' +
+				'(primary, primaryPreferred, secondary, secondaryPreferred, nearest)',
+			'max-staleness': 'Max replication lag in seconds of secondaries to read from (at least 90)'
+		}
+
+
+	def add_read_preference_args(self, builder: ArgParserBuilder, group: str) -> None:
+		""" Read-only commands can offload their queries from the primary (replica sets) """
+		builder.add_arg(group, 'read-preference', type=str,
+			choices=['primary', 'primaryPreferred', 'secondary', 'secondaryPreferred', 'nearest'])
+		builder.add_arg(group, 'max-staleness', type=int)
+
+
 	def convert_logical_args(self, name: str, args: dict[str, Any]) -> None:
 
 		for k in (f"with_{name}", f"with_{name}s_and", f"with_{name}s_or"):
@@ -4,7 +4,7 @@
 # License:             BSD-3-Clause
 # Author:              valery brinnel <firstname.lastname@gmail.com>
 # Date:                25.03.2021
-# Last Modified Date:  17.07.2021
+# Last Modified Date:  19.10.2026
 # Last Modified By:    valery brinnel <firstname.lastname@gmail.com>
 
 import sys
@@ -56,6 +56,7 @@ class BufferCommand(AbsStockCommand, AbsLoadCommand):
 		builder = ArgParserBuilder("buffer")
 		hlp.update(self.get_select_args_help())
 		hlp.update(self.get_load_args_help())
+		hlp.update(self.get_read_preference_args_help())
 		builder.add_parsers(sub_ops, hlp)
 
 		# Required args
@@ -70,6 +71,7 @@ class BufferCommand(AbsStockCommand, AbsLoadCommand):
 		builder.add_arg("save.optional", "binary", action="store_true")
 		builder.add_arg("show.optional", "pretty", action="store_true")
 		builder.add_arg("show.optional", "getch", action="store_true")
+		self.add_read_preference_args(builder, "optional")
 
 		# Selection args
 		self.add_selection_args(builder)
@@ -4,9 +4,10 @@
 # License:             BSD-3-Clause
 # Author:              valery brinnel <firstname.lastname@gmail.com>
 # Date:                14.03.2021
-# Last Modified Date:  06.10.2021
+# Last Modified Date:  19.10.2026
 # Last Modified By:    valery brinnel <firstname.lastname@gmail.com>
 
+import sys, yaml
 from typing import Any
 from collections.abc import Sequence
 from argparse import ArgumentParser # type: ignore[import]
@@ -17,6 +18,7 @@ from ampel.cli.ArgParserBuilder import ArgParserBuilder
 from ampel.cli.main import AmpelArgumentParser
 from ampel.log.AmpelLogger import AmpelLogger
 from ampel.log.LogFlag import LogFlag
+from ampel.mongo.instrument.IndexAdvisor import IndexAdvisor
 
 
 # Help parameter descriptions
@@ -29,7 +31,16 @@ hlp = {
 	"secrets": "Path to a YAML secrets store in sops format",
 	"log-profile": "One of: default, compact, headerless, verbose, debug",
 	"debug": "debug",
-	"force": "Delete potententially existing view before view creation",
+	"force": "Delete potententially existing view (or index) before view (or index) creation",
+	"materialize": "Write view results into regular (indexed) collections, refreshed using -refresh",
+	"refresh": "Refresh materialized view (documents of stocks updated since last refresh). " +
+		"Incremental refreshes never remove stocks or documents that left the view or were deleted: " +
+		"use -full periodically",
+	"full": "Rebuild materialized view entirely during refresh",
+	"index": "Update indexes of existing collections according to the selected index profile(s)",
+	"profile": "Index profile(s) to apply on top of base indexes (ex: ingest, t2, t3). Base indexes only if omitted",
+	"advise": "Analyze sampled queries (config: mongo.query_sampling) and propose indexes",
+	"top": "Number of query shapes (with highest cumulated latency) to analyze",
 }
 
 class DBCommand(AbsCoreCommand):
@@ -44,7 +55,7 @@ class DBCommand(AbsCoreCommand):
 		if sub_op in self.parsers:
 			return self.parsers[sub_op]
 
-		sub_ops = ["import", "export", "delete", "view"]
+		sub_ops = ["import", "export", "delete", "view", "index", "advise"]
 		if sub_op is None or sub_op not in sub_ops:
 			return AmpelArgumentParser.build_choice_help(
 				"db", sub_ops, hlp, description = 'Import, export or delete ampel databases. Create or remove views.'
@@ -61,7 +72,12 @@ class DBCommand(AbsCoreCommand):
 		builder.add_arg("export.required", "out")
 
 		builder.add_group('view', 'View arguments')
-		builder.add_x_args('view', {'name': 'create', 'action': 'store_true'}, {'name': 'discard', 'action': 'store_true'})
+		builder.add_x_args(
+			'view',
+			{'name': 'create', 'action': 'store_true'},
+			{'name': 'discard', 'action': 'store_true'},
+			{'name': 'refresh', 'action': 'store_true'}
+		)
 		builder.add_x_args(
 			'view.required',
 			{'name': 'channel'},
@@ -73,6 +89,11 @@ class DBCommand(AbsCoreCommand):
 		builder.add_arg("optional", "secrets")
 		builder.add_arg('optional', 'debug', action="store_true")
 		builder.add_arg('view.optional', 'force', action="store_true")
+		builder.add_arg('view.optional', 'materialize', action="store_true")
+		builder.add_arg('view.optional', 'full', action="store_true")
+		builder.add_arg('index.optional', 'profile', nargs='+')
+		builder.add_arg('index.optional', 'force', action="store_true")
+		builder.add_arg('advise.optional', 'top', type=int, default=10)
 
 		builder.add_example("import", "-in /path/to/file")
 		builder.add_example("export", "-out /path/to/file")
@@ -80,6 +101,10 @@ class DBCommand(AbsCoreCommand):
 		builder.add_example("view", "-create -channel CHAN1")
 		builder.add_example("view", "-create -channels-or CHAN1 CHAN2")
 		builder.add_example("view", "-discard -channel CHAN1")
+		builder.add_example("view", "-create -materialize -channel CHAN1")
+		builder.add_example("view", "-refresh -channel CHAN1")
+		builder.add_example("index", "-profile t2")
+		builder.add_example("advise", "-top 5")
 
 		self.parsers.update(
 			builder.get()
@@ -110,20 +135,32 @@ class DBCommand(AbsCoreCommand):
 
 		elif sub_op == "view":
 
-			if 'create' not in args and 'discard' not in args:
-				logger.error("Either provide 'create' or 'discard' in combination with view command")
+			if not (args.get('create') or args.get('discard') or args.get('refresh')):
+				logger.error("Either provide 'create', 'discard' or 'refresh' in combination with view command")
 				return
 
+			if args.get('refresh'):
+				if x := args.get("channel"):
+					db.refresh_materialized_view(str(x), logger, args['full'])
+				elif x := (args.get("channels_or") or args.get("channels_and")):
+					db.refresh_materialized_view(
+						("_OR_" if args.get("channels_or") else "_AND_").join(map(str, x)),
+						logger, args['full']
+					)
+				logger.info("Done")
+				return
+
+			mat = args['materialize']
 			try:
 				if x := args.get("channel"):
 					logger.info(f"{'Creating' if args['create'] else 'Removing'} view for channel {x}")
-					db.create_one_view(x, logger, args['force']) if args['create'] else db.delete_one_view(x, logger)
+					db.create_one_view(x, logger, args['force'], mat) if args['create'] else db.delete_one_view(x, logger)
 				elif x := args.get("channels_or"):
 					logger.info(f"{'Creating' if args['create'] else 'Removing'} view for channels {x}")
-					db.create_or_view(x, logger, args['force']) if args['create'] else db.delete_or_view(x, logger)
+					db.create_or_view(x, logger, args['force'], mat) if args['create'] else db.delete_or_view(x, logger)
 				elif x := args.get("channels_and"):
 					logger.info(f"{'Creating' if args['create'] else 'Removing'} view for channels {x}")
-					db.create_and_view(x, logger, args['force']) if args['create'] else db.delete_and_view(x, logger)
+					db.create_and_view(x, logger, args['force'], mat) if args['create'] else db.delete_and_view(x, logger)
 				else:
 					logger.error("Channel(s) required\n")
 					return
@@ -135,6 +172,27 @@ class DBCommand(AbsCoreCommand):
 				else:
 					raise e
 
+		elif sub_op == "index":
+
+			logger.info(f"Applying index profile(s): {args.get('profile') or 'none (base indexes)'}")
+			db.apply_index_profile(args.get('profile'), logger, args.get('force', False))
+			logger.info("Done")
+
+		elif sub_op == "advise":
+
+			db.flush_query_samples()
+			advisor = IndexAdvisor(
+				db.get_collection('querystats'),
+				lambda name: getattr(c := db.get_collection(name), '_col', c), # unsampled collection
+				top = args['top']
+			)
+
+			if not (res := advisor.advise()):
+				logger.info("No query samples available (see config parameter mongo.query_sampling)")
+				return
+
+			yaml.dump(res, sys.stdout, sort_keys=False)
+
 		elif sub_op == "export":
 			raise NotImplementedError()
 
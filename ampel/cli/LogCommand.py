@@ -4,7 +4,7 @@
 # License:             BSD-3-Clause
 # Author:              valery brinnel <firstname.lastname@gmail.com>
 # Date:                15.03.2021
-# Last Modified Date:  23.03.2021
+# Last Modified Date:  19.10.2026
 # Last Modified By:    valery brinnel <firstname.lastname@gmail.com>
 
 from argparse import ArgumentParser
@@ -20,6 +20,7 @@ from ampel.cli.MaybeIntAction import MaybeIntAction
 from ampel.cli.LoadJSONAction import LoadJSONAction
 from ampel.mongo.query.var.LogsLoader import LogsLoader
 from ampel.mongo.query.var.LogsMatcher import LogsMatcher
+from ampel.mongo.utils import get_oid_time_range
 from ampel.log.LogsDumper import LogsDumper
 
 
@@ -74,7 +75,7 @@ class LogCommand(AbsCoreCommand):
 			)
 
 		builder = ArgParserBuilder("log")
-		builder.add_parsers(sub_ops, hlp)
+		builder.add_parsers(sub_ops, hlp | self.get_read_preference_args_help())
 
 		builder.notation_add_note_references()
 		builder.notation_add_example_references()
@@ -90,6 +91,7 @@ class LogCommand(AbsCoreCommand):
 		#parser.add_arg(g, 'tail', action='store', metavar='#', default=None, const=1.0, type=float, nargs='?')
 		builder.add_arg('optional', 'verbose', action='count', default=0)
 		builder.add_arg('optional', 'debug', action='count', default=0, help='Debug')
+		self.add_read_preference_args(builder, 'optional')
 		builder.add_arg('tail.optional', 'refresh-rate', action='store', metavar='#', const=1.0, nargs='?', type=float, default=1.0)
 		
 
@@ -176,7 +178,6 @@ class LogCommand(AbsCoreCommand):
 			args['id_mapper'] = None
 
 		ld = LogsDumper(**args)
-		col = ctx.db.get_collection('logs')
 		match = matcher.get_match_criteria()
 
 		if sub_op == "tail":
@@ -188,7 +189,8 @@ class LogCommand(AbsCoreCommand):
 			loader.datetime_key = 'date'
 
 			while True:
-				log_entries = loader.fetch_logs(col, match)
+				# Partition set may change while tailing (log partitioning)
+				log_entries = loader.fetch_logs(ctx.db.get_log_collections(*get_oid_time_range(match), read_only=True), match)
 				if log_entries:
 					next_match = log_entries[-1]['_id']
 					ld.process(log_entries) # type: ignore
@@ -196,5 +198,5 @@ class LogCommand(AbsCoreCommand):
 				else:
 					time.sleep(args['refresh_rate'])
 
-		log_entries = loader.fetch_logs(col, match)
+		log_entries = loader.fetch_logs(ctx.db.get_log_collections(*get_oid_time_range(match), read_only=True), match)
 		ld.process(log_entries) # type: ignore
@@ -4,7 +4,7 @@
 # License:             BSD-3-Clause
 # Author:              valery brinnel <firstname.lastname@gmail.com>
 # Date:                16.03.2021
-# Last Modified Date:  13.12.2021
+# Last Modified Date:  19.10.2026
 # Last Modified By:    valery brinnel <firstname.lastname@gmail.com>
 
 from datetime import datetime
@@ -18,6 +18,7 @@ from ampel.log.AmpelLogger import AmpelLogger
 from ampel.log.LogFlag import LogFlag
 from ampel.t2.T2Utils import T2Utils
 from ampel.util.pretty import prettyjson
+from ampel.util.compact import decode_arrays
 from ampel.content.T2Document import T2Document
 from ampel.cli.utils import maybe_load_idmapper
 from ampel.cli.AbsCoreCommand import AbsCoreCommand
@@ -68,7 +69,7 @@ class T2Command(AbsCoreCommand):
 			)
 
 		builder = ArgParserBuilder("t2")
-		builder.add_parsers(sub_ops, hlp)
+		builder.add_parsers(sub_ops, hlp | self.get_read_preference_args_help())
 
 		builder.notation_add_note_references()
 		builder.notation_add_example_references()
@@ -83,6 +84,7 @@ class T2Command(AbsCoreCommand):
 		builder.add_arg('optional', 'debug', action='count', default=0, help='Debug')
 		builder.add_arg('optional', 'dry-run', action='store_true')
 		builder.add_arg('optional', 'limit', action='store_true')
+		self.add_read_preference_args(builder, 'show|save.optional')
 
 		# Optional match criteria
 		builder.add_group('match', 'Optional T2 documents matching criteria')
@@ -137,7 +139,7 @@ class T2Command(AbsCoreCommand):
 		args['config'] = args.pop('unit_config')
 
 		t2_utils = T2Utils(logger)
-		col = ctx.db.get_collection('t2', mode='r')
+		col = ctx.db.get_read_collection('t2', mode='r')
 
 		maybe_load_idmapper(args)
 		self.convert_logical_args('tag', args)
@@ -169,7 +171,7 @@ class T2Command(AbsCoreCommand):
 					self.morph_ret(ctx, el, resolve_config, human_times, id_mapper)
 					print(prettyjson(el))
 			else:
-				print(prettyjson(list(c)))
+				print(prettyjson([self.morph_ret(ctx, el) for el in c]))
 
 		elif sub_op == 'save':
 
@@ -212,6 +214,10 @@ class T2Command(AbsCoreCommand):
 		id_mapper: None | AbsIdMapper = None
 	) -> T2Document:
 
+		# Compact arrays (see AbsWorker.compact_arrays) are displayed as regular lists
+		if doc.get('body'):
+			doc['body'] = decode_arrays(doc['body'])
+
 		if resolve_config and doc['config']:
 			doc['config'] = ctx.config._config['confid'].get(doc['config'])
 
@@ -4,7 +4,7 @@
 # License:             BSD-3-Clause
 # Author:              valery brinnel <firstname.lastname@gmail.com>
 # Date:                16.10.2019
-# Last Modified Date:  06.02.2020
+# Last Modified Date:  19.10.2026
 # Last Modified By:    valery brinnel <firstname.lastname@gmail.com>
 
 from typing import Any
@@ -33,6 +33,12 @@ class DBConfigCollector(AbsDictConfigCollector):
 			self.__setitem__('ingest', arg['ingest'])
 			return
 
+		# Allow single-key settings such as 'mongo': {'index_profile': ...} in general ampel.conf
+		for k in ('index_profile', 'query_sampling', 'log_partition', 'read_preference', 'run_id_block'):
+			if len(arg) == 1 and k in arg:
+				self.__setitem__(k, arg[k])
+				return
+
 		# At this point, arg usually contains content of files
 		# contained in pyampel-core/conf/ampel-core/mongo/*
 
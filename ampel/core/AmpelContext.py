@@ -4,9 +4,11 @@
 # License:             BSD-3-Clause
 # Author:              valery brinnel <firstname.lastname@gmail.com>
 # Date:                18.02.2020
-# Last Modified Date:  09.01.2022
+# Last Modified Date:  19.10.2026
 # Last Modified By:    valery brinnel <firstname.lastname@gmail.com>
 
+import os
+from threading import Lock
 from typing import Any, Literal, TYPE_CHECKING
 from collections.abc import Iterable
 from ampel.config.AmpelConfig import AmpelConfig
@@ -19,6 +21,8 @@ if TYPE_CHECKING:
 	from ampel.core.AmpelDB import AmpelDB
 	from ampel.core.UnitLoader import UnitLoader # noqa
 
+_run_id_lock = Lock()
+
 
 class AmpelContext:
 	"""
@@ -46,7 +50,10 @@ class AmpelContext:
 		self.loader = loader
 		self.admin_msg = admin_msg
 		self.resource = resource
-		
+
+		# Block of reserved run ids: [pid, next id, last id] (see new_run_id)
+		self._run_ids: None | list[int] = None
+
 		# try to register aux units globally
 		try:
 			AuxUnitRegister.initialize(config)
@@ -144,12 +151,35 @@ class AmpelContext:
 		"""
 		Return an identifier that can be used to associate log entries from a
 		single process invocation. This ID is unique and monotonicaly increasing.
+
+		If the database is configured with a run id block size greater than one (mongo.run_id_block),
+		blocks of run ids are reserved at once, sparing one database round trip per run.
+		Run ids are then still unique, but only monotonically increasing within a process
+		(processes draw ids from distinct blocks), and ids reserved by a process but not used
+		before it terminates are never attributed (gaps in the sequence of run ids).
 		"""
+
+		if (n := self.db.run_id_block) <= 1:
+			return self._reserve_run_ids(1)
+
+		with _run_id_lock:
+
+			# Blocks are not inherited by forked processes
+			if not (r := self._run_ids) or r[0] != os.getpid() or r[1] > r[2]:
+				last = self._reserve_run_ids(n)
+				r = self._run_ids = [os.getpid(), last - n + 1, last]
+
+			r[1] += 1
+			return r[1] - 1
+
+
+	def _reserve_run_ids(self, n: int) -> int:
+		""" :returns: last run id of the reserved block """
 		return self.db \
 			.get_collection('counter') \
 			.find_one_and_update(
 				{'_id': 'current_run_id'},
-				{'$inc': {'value': 1}},
+				{'$inc': {'value': n}},
 				new=True, upsert=True
 			) \
 			.get('value')
@@ -4,11 +4,13 @@
 # License           : BSD-3-Clause
 # Author            : vb <vbrinnel@physik.hu-berlin.de>
 # Date              : 16.06.2018
-# Last Modified Date: 28.12.2021
+# Last Modified Date: 19.10.2026
 # Last Modified By  : vb <vbrinnel@physik.hu-berlin.de>
 
+from time import time
+from datetime import datetime, timezone
 from functools import cached_property
-import secrets
+import atexit, secrets, re
 import collections.abc
 from collections import defaultdict  # type: ignore[attr-defined]
 from pymongo import MongoClient
@@ -19,7 +21,7 @@ from typing import Any
 from collections.abc import Sequence
 
 from ampel.types import ChannelId
-from ampel.mongo.utils import get_ids
+from ampel.mongo.utils import get_ids, get_log_partition, get_log_partition_range, LogPartitionPeriod
 from ampel.log.AmpelLogger import AmpelLogger
 from ampel.config.AmpelConfig import AmpelConfig
 from ampel.base.AmpelUnit import AmpelUnit
@@ -34,8 +36,15 @@ from ampel.mongo.model.IndexModel import IndexModel
 from ampel.mongo.model.ShortIndexModel import ShortIndexModel
 from ampel.mongo.model.MongoClientOptionsModel import MongoClientOptionsModel
 from ampel.mongo.model.MongoClientRoleModel import MongoClientRoleModel
+from ampel.mongo.model.ReadPreferenceModel import ReadPreferenceModel
+from ampel.mongo.instrument.QuerySampler import QuerySampler
+from ampel.mongo.MongoClientRegistry import MongoClientRegistry
+from ampel.mongo.instrument.SampledCollection import SampledCollection
 
 intcol = {'t0': 0, 't1': 1, 't2': 2, 't3': 3, 'stock': 4}
+mview_types: dict[str, type[AbsMongoView]] = {
+	'MongoOneView': MongoOneView, 'MongoOrView': MongoOrView, 'MongoAndView': MongoAndView
+}
 
 class AmpelDB(AmpelUnit):
 	"""
@@ -51,6 +60,28 @@ class AmpelDB(AmpelUnit):
 	require_exists: bool = False
 	one_db: bool = False
 
+	#: Index profile(s) (ex: 'ingest', 't2', 't3') whose indexes are created on top of
+	#: the base indexes of each collection (see AmpelColModel.profiles)
+	index_profile: None | str | Sequence[str] = None
+
+	#: Fraction of the queries performed on ampel collections to sample (see QuerySampler).
+	#: Samples are stored in the collection 'querystats' and analyzed by 'ampel db advise'
+	query_sampling: None | float = None
+	query_sampling_flush: int = 100
+
+	#: Write logs into time-partitioned collections (ex: logs_20261019) instead of the collection 'logs'.
+	#: Partitions share the configuration (indexes, args) of the collection 'logs'.
+	#: Retention can then be achieved by dropping partitions (see drop_log_partitions)
+	log_partition: None | LogPartitionPeriod = None
+
+	#: Default read preference of queries tolerating stale data (see get_read_collection),
+	#: allowing to offload T3 loads and read-only CLI commands from the primary (replica sets).
+	#: None: all reads target the primary
+	read_preference: None | ReadPreferenceModel = None
+
+	#: Number of run ids reserved at once by AmpelContext.new_run_id (see its docstring regarding gaps)
+	run_id_block: int = 1
+
 
 	@classmethod
 	def new(cls,
@@ -82,8 +113,17 @@ class AmpelDB(AmpelUnit):
 			for col in db_config.collections
 		}
 
+		if self.index_profile:
+			self.check_index_profile(self.index_profile)
+
 		self.mongo_collections: dict[str, Collection] = {}
 		self.mongo_clients: dict[str, MongoClient] = {} # map role with client
+		self.query_sampler = QuerySampler(self.query_sampling, self.query_sampling_flush) \
+			if self.query_sampling else None
+
+		# Samples buffered below flush size would otherwise be lost at process exit
+		if self.query_sampler:
+			atexit.register(self.query_sampler.flush)
 
 		if self.require_exists and not self._get_pymongo_db("data", role="w").list_collection_names():
 			raise ValueError(f"Database(s) with prefix {self.prefix} do not exist")
@@ -143,7 +183,13 @@ class AmpelDB(AmpelUnit):
 				return self.mongo_collections[col_name][mode]
 		else:
 			if col_name not in self.col_config:
-				raise ValueError(f"Unknown collection: '{col_name}'")
+				if not self._is_log_partition(col_name):
+					raise ValueError(f"Unknown collection: '{col_name}'")
+				self.col_config[col_name] = AmpelColModel(
+					name = col_name,
+					indexes = self.col_config['logs'].indexes,
+					args = self.col_config['logs'].args
+				)
 			self.mongo_collections[col_name] = {}
 
 		db_config = self._get_db_config(col_name)
@@ -151,13 +197,52 @@ class AmpelDB(AmpelUnit):
 		db = self._get_pymongo_db(db_config.name, role=role)
 
 		if 'w' in mode and col_name not in db.list_collection_names():
-			self.mongo_collections[col_name][mode] = self.create_ampel_collection(
+			col = self.create_ampel_collection(
 				self.col_config[col_name], db_config.name, role
 			)
 		else:
-			self.mongo_collections[col_name][mode] = db.get_collection(col_name)
+			col = db.get_collection(col_name)
+
+		if self.query_sampler and col_name != 'querystats':
+			if self.query_sampler.col is None:
+				self.query_sampler.col = self.get_collection('querystats')
+			col = SampledCollection(col, self.query_sampler) # type: ignore[assignment]
+
+		self.mongo_collections[col_name][mode] = col
+		return col
+
+
+	def get_read_collection(self,
+		col_name: int | str,
+		read_preference: None | ReadPreferenceModel = None,
+		mode: str = 'w'
+	) -> Collection:
+		"""
+		:returns: collection to be used for queries tolerating stale data (T3 loads, CLI inspection),
+		routed according to the provided read preference or to the default read preference of this instance
+		"""
+
+		col = self.get_collection(col_name, mode)
+		if (rp := read_preference or self.read_preference) is None:
+			return col
+
+		if isinstance(col, SampledCollection):
+			return SampledCollection(col._col.with_options(read_preference=rp.get()), col._sampler) # type: ignore[return-value]
+
+		return col.with_options(read_preference=rp.get())
+
 
-		return self.mongo_collections[col_name][mode]
+	def flush_query_samples(self) -> None:
+		""" Saves pending query samples into the collection 'querystats' """
+		if self.query_sampler:
+			self.query_sampler.flush()
+
+
+	def close(self) -> None:
+		""" Flushes pending query samples. Mongo clients are shared (see MongoClientRegistry) and left open """
+		if self.query_sampler:
+			self.query_sampler.flush()
+			atexit.unregister(self.query_sampler.flush)
 
 
 	def _get_pymongo_db(self, db_name: str, *, role: str) -> Database:
@@ -173,7 +258,7 @@ class AmpelDB(AmpelUnit):
 				kwargs |= ns.get()
 
 			try:
-				self.mongo_clients[role] = MongoClient(self.mongo_uri, **kwargs)
+				self.mongo_clients[role] = MongoClientRegistry.get(self.mongo_uri, role, **kwargs)
 			except ConfigurationError as exc:
 				# hint at error source
 				raise ConfigurationError(exc.args[0] + f' (from secret {key})', *exc.args[1:])
@@ -184,6 +269,11 @@ class AmpelDB(AmpelUnit):
 
 
 	def _get_db_config(self, col_name: str) -> AmpelDBModel:
+
+		# Log partitions belong to the database of the collection 'logs'
+		if self._is_log_partition(col_name):
+			col_name = 'logs'
+
 		return next(
 			filter(
 				lambda x: self.col_config[col_name] in x.collections,
@@ -192,6 +282,79 @@ class AmpelDB(AmpelUnit):
 		)
 
 
+	def _is_log_partition(self, col_name: str) -> bool:
+		return self.log_partition is not None and re.fullmatch(r'logs_\d{8}', col_name) is not None
+
+
+	def get_log_collection(self, dt: None | datetime | float = None) -> Collection:
+		"""
+		:param dt: time of the log entries to be saved (default: now)
+		:returns: the collection 'logs' or, if logs are partitioned, the partition covering the provided time
+		"""
+		if not self.log_partition:
+			return self.get_collection('logs')
+		return self.get_collection(get_log_partition(time() if dt is None else dt, self.log_partition))
+
+
+	def get_log_collections(self,
+		after: None | datetime = None,
+		before: None | datetime = None,
+		read_only: bool = False,
+		read_preference: None | ReadPreferenceModel = None
+	) -> list[Collection]:
+		"""
+		:param read_only: route queries according to the (provided or default) read preference (see get_read_collection)
+		:returns: existing log collections potentially containing entries created within the provided time range,
+		in chronological order. The non-partitioned collection 'logs' is included first if it exists
+		(it may contain entries created before partitioning was enabled).
+		"""
+
+		def get(name: str) -> Collection:
+			if read_only or read_preference:
+				return self.get_read_collection(name, read_preference)
+			return self.get_collection(name)
+
+		if not self.log_partition:
+			return [get('logs')]
+
+		ret = []
+		names = self._get_pymongo_db(self._get_db_config('logs').name, role=self._get_db_config('logs').role.w) \
+			.list_collection_names()
+
+		if 'logs' in names:
+			ret.append(get('logs'))
+
+		for name in sorted(n for n in names if self._is_log_partition(n)):
+			start, end = get_log_partition_range(name, self.log_partition)
+			if (after and end <= after.replace(tzinfo=after.tzinfo or timezone.utc)) or \
+				(before and start > before.replace(tzinfo=before.tzinfo or timezone.utc)):
+				continue
+			ret.append(get(name))
+
+		return ret
+
+
+	def drop_log_partitions(self, before: datetime, logger: 'None | AmpelLogger' = None) -> list[str]:
+		"""
+		Drops log partitions only containing entries created before the provided time.
+		:returns: names of the dropped partitions
+		"""
+
+		dropped = []
+		for col in self.get_log_collections(before=before):
+			if col.name == 'logs':
+				continue
+			if get_log_partition_range(col.name, self.log_partition)[1] <= before.replace(tzinfo=before.tzinfo or timezone.utc): # type: ignore[arg-type]
+				if logger:
+					logger.info(f"Dropping log partition {col.name}")
+				col.drop()
+				self.mongo_collections.pop(col.name, None)
+				self.col_config.pop(col.name, None)
+				dropped.append(col.name)
+
+		return dropped
+
+
 	def init_db(self) -> None:
 
 		for db_config in self.databases:
@@ -232,32 +395,141 @@ class AmpelDB(AmpelUnit):
 			col = db.get_collection(col_config.name)
 		"""
 
-		if col_config.indexes:
-			for idx in col_config.indexes:
-				self._create_index(col, idx, logger)
-	
+		for idx in col_config.get_indexes(self.index_profile):
+			self._create_index(col, idx, logger)
+
+		if col_config.shard_key and self.is_sharded:
+			self.shard_collection(
+				col, col_config.shard_key, logger,
+				next(el.primary_shard for el in self.databases if el.name == db_name)
+			)
+
 		return col
 
 
+	@cached_property
+	def is_sharded(self) -> bool:
+		""" :returns: whether this instance is connected to a sharded cluster (mongos) """
+		try:
+			return self._get_pymongo_db("data", role="w").client.admin.command('hello').get('msg') == 'isdbgrid'
+		except NotImplementedError: # mongomock
+			return False
+
+
+	def shard_collection(self,
+		col: Collection,
+		key: dict[str, Any],
+		logger: 'AmpelLogger',
+		primary_shard: None | str = None
+	) -> None:
+		"""
+		Enables sharding for the database of the provided collection and shards the collection using the provided key
+		:param primary_shard: shard holding the unsharded collections of the database
+		"""
+
+		admin = col.database.client.admin
+		logger.info(f"   Sharding {col.full_name} with key {key}")
+		admin.command(
+			'enableSharding', col.database.name,
+			**({'primaryShard': primary_shard} if primary_shard else {})
+		)
+
+		# Index supporting the shard key (no-op if shardCollection already created it)
+		col.create_index(list(key.items()))
+		admin.command('shardCollection', col.full_name, key=key)
+
+
+	def check_targetable(self, col_name: str, match_keys: Sequence[str]) -> None:
+		"""
+		Upserts into sharded collections must contain the full shard key in their filter.
+		:param match_keys: fields always included in the upsert filters
+		:raises ValueError: if the shard key of the collection is not covered by the provided fields
+		"""
+		if (key := self.col_config[col_name].shard_key) and (missing := set(key) - set(match_keys)):
+			raise ValueError(
+				f"Upserts into collection '{col_name}' (filter fields: {list(match_keys)}) "
+				f"cannot be routed to a single shard, missing shard key field(s): {missing}"
+			)
+
+
+	def check_claimable(self, col_name: str) -> None:
+		"""
+		Workers claim t1/t2 documents using findAndModify filters not containing the shard key
+		(code and unit only), which sharded clusters accept from MongoDB 7.0 on.
+		:raises ValueError: if the collection is sharded and the cluster runs an older MongoDB version
+		"""
+		if self.col_config[col_name].shard_key and self.is_sharded:
+			version = self._get_pymongo_db("data", role="w").client.server_info()['versionArray']
+			if tuple(version[:2]) < (7, 0):
+				raise ValueError(
+					f"Documents of sharded collection '{col_name}' cannot be claimed by workers: "
+					f"MongoDB >= 7.0 is required (cluster version: {'.'.join(map(str, version[:3]))})"
+				)
+
+
+	def get_index_profiles(self) -> set[str]:
+		""" :returns: names of the index profiles defined in the collections configurations """
+		return {p for col in self.col_config.values() if col.profiles for p in col.profiles}
+
+
+	def check_index_profile(self, profile: str | Sequence[str]) -> None:
+		""" :raises: ValueError if a profile is not defined by any collection """
+		if (unknown := set([profile] if isinstance(profile, str) else profile) - self.get_index_profiles()):
+			raise ValueError(
+				f"Unknown index profile(s): {unknown} (available: {self.get_index_profiles()})"
+			)
+
+
+	def apply_index_profile(self,
+		profile: None | str | Sequence[str],
+		logger: 'AmpelLogger',
+		force_overwrite: bool = False
+	) -> None:
+		"""
+		Updates the indexes of all existing data collections so that they match
+		the base indexes plus those of the provided profile(s).
+		Indexes associated with other profiles are removed.
+		"""
+
+		if profile:
+			self.check_index_profile(profile)
+
+		for db_config in self.databases:
+			db = self._get_pymongo_db(db_config.name, role=db_config.role.w)
+			existing = db.list_collection_names()
+			for col_config in db_config.collections:
+				if col_config.name in existing and (col_config.indexes or col_config.profiles):
+					logger.info(f"Setting indexes of {db.name} -> {col_config.name}")
+					self.set_col_index(
+						db.get_collection(col_config.name), col_config, logger,
+						force_overwrite, profile = profile or []
+					)
+
+
 	def set_col_index(self,
 		col: Collection,
 		config: AmpelColModel,
 		logger: 'AmpelLogger',
-		force_overwrite: bool = False
+		force_overwrite: bool = False,
+		profile: None | str | Sequence[str] = None
 	) -> None:
 		"""
 		:param force_overwrite: delete index if it already exists.
 		This can be useful if you want to change index options (for example: sparse=True/False)
+		:param profile: index profile(s) to apply in addition to base indexes
+		(defaults to the profile(s) configured for this instance, use an empty list to apply base indexes only).
+		Existing indexes not part of the resulting index set are removed.
 		"""
 
-		if not config.indexes:
+		indexes = config.get_indexes(self.index_profile if profile is None else profile)
+		if not indexes:
 			logger.info(f"No index data configured for collection {config.name}")
 			return
 
 		col_index_info = col.index_information()
 		flat_indexes = []
 
-		for idx in config.indexes:
+		for idx in indexes:
 
 			idx_id = idx.get_id()
 			flat_indexes.append(idx_id)
@@ -298,18 +570,20 @@ class AmpelDB(AmpelUnit):
 	def create_one_view(self,
 		channel: ChannelId,
 		logger: 'None | AmpelLogger' = None,
-		force: bool = False
+		force: bool = False,
+		materialize: bool = False
 	) -> None:
 		self.create_view(
 			MongoOneView(channel=channel), str(channel),
-			logger, force
+			logger, force, materialize
 		)
 
 
 	def create_or_view(self,
 		channels: Sequence[ChannelId],
 		logger: 'None | AmpelLogger' = None,
-		force: bool = False
+		force: bool = False,
+		materialize: bool = False
 	) -> None:
 
 		if not isinstance(channels, collections.abc.Sequence) or len(channels) == 1:
@@ -318,14 +592,15 @@ class AmpelDB(AmpelUnit):
 		self.create_view(
 			MongoOrView(channel=channels),
 			"_OR_".join(map(str, channels)),
-			logger, force
+			logger, force, materialize
 		)
 
 
 	def create_and_view(self,
 		channels: Sequence[ChannelId],
 		logger: 'None | AmpelLogger' = None,
-		force: bool = False
+		force: bool = False,
+		materialize: bool = False
 	) -> None:
 
 		if not isinstance(channels, collections.abc.Sequence) or len(channels) == 1:
@@ -334,7 +609,7 @@ class AmpelDB(AmpelUnit):
 		self.create_view(
 			MongoAndView(channel=channels),
 			"_AND_".join(map(str, channels)),
-			logger, force
+			logger, force, materialize
 		)
 
 
@@ -342,8 +617,16 @@ class AmpelDB(AmpelUnit):
 		view: AbsMongoView,
 		col_prefix: str,
 		logger: 'None | AmpelLogger' = None,
-		force: bool = False
+		force: bool = False,
+		materialize: bool = False
 	) -> None:
+		"""
+		:param materialize: write view results into regular collections (see create_materialized_view)
+		"""
+
+		if materialize:
+			self.create_materialized_view(view, col_prefix, logger, force)
+			return
 
 		db = self._get_pymongo_db("data", role="w")
 		if force:
@@ -390,6 +673,152 @@ class AmpelDB(AmpelUnit):
 		for el in ("stock", "t0", "t1", "t2", "t3"):
 			db.drop_collection(f'{view_prefix}_{el}')
 
+		# Materialized view
+		self.get_collection('mview').delete_one({'_id': view_prefix})
+
+
+	def create_materialized_view(self,
+		view: AbsMongoView,
+		col_prefix: str,
+		logger: 'None | AmpelLogger' = None,
+		force: bool = False
+	) -> None:
+		"""
+		Materialized variant of :func:`create_view`: view results are written into regular collections
+		(<col_prefix>_stock, <col_prefix>_t0, ...) using $merge. These collections are indexed like
+		their source collections, minus the 'channel' field which views project out.
+		Materialized views are registered in the collection 'mview' and can be refreshed
+		incrementally with :func:`refresh_materialized_view`.
+		"""
+
+		col_mview = self.get_collection('mview')
+		if col_mview.find_one({'_id': col_prefix}):
+			if not force:
+				raise ValueError(f"Materialized view {col_prefix} already exists")
+			self.delete_view(col_prefix, logger)
+
+		col_mview.insert_one(
+			{'_id': col_prefix, 'view': type(view).__name__, 'config': view.dict(), 'upd': None}
+		)
+
+		self.refresh_materialized_view(col_prefix, logger, full=True)
+
+
+	def refresh_materialized_view(self,
+		col_prefix: str,
+		logger: 'None | AmpelLogger' = None,
+		full: bool = False
+	) -> None:
+		"""
+		Updates the documents of a materialized view.
+		Unless 'full' is requested, only documents associated with stocks updated
+		(timestamps ts.<channel>.upd) since the last refresh are re-computed.
+		t3 documents being immutable, only those created since the last refresh are added.
+		A full refresh re-creates the view collections from scratch.
+		Incremental refreshes never remove stocks or documents that left the view
+		or were deleted from the source collections: run a full refresh periodically for that.
+		"""
+
+		col_mview = self.get_collection('mview')
+		if not (entry := col_mview.find_one({'_id': col_prefix})):
+			raise ValueError(f"Unknown materialized view: {col_prefix}")
+
+		view: AbsMongoView = mview_types[entry['view']](**entry['config'])
+		channels = [view.channel] if isinstance(view, MongoOneView) else view.channel # type: ignore[attr-defined]
+		since = None if full else entry['upd']
+		# ts.<channel>.upd values are integer seconds: floor the watermark so that stocks
+		# updated later within the same second are still matched by the next refresh
+		now = int(time())
+		db = self._get_pymongo_db("data", role="w")
+
+		if since is None:
+
+			if logger:
+				logger.info(f"Building materialized view {col_prefix}")
+
+			for el in ("stock", "t0", "t1", "t2", "t3"):
+				db.drop_collection(f'{col_prefix}_{el}')
+				self._copy_indexes(db.get_collection(el), db.create_collection(f'{col_prefix}_{el}'))
+
+			self._merge_view(db, view, col_prefix, ("stock", "t0", "t1", "t2", "t3"), [])
+
+		else:
+
+			if logger:
+				logger.info(f"Refreshing materialized view {col_prefix} (updates since {since})")
+
+			self._merge_view(
+				db, view, col_prefix, ("stock", ),
+				[{'$match': {'$or': [{f'ts.{chan}.upd': {'$gte': since}} for chan in channels]}}]
+			)
+
+			# Stocks updated since last refresh (processed in batches to bound query sizes)
+			stocks = db.get_collection('stock').distinct(
+				'stock', {'$or': [{f'ts.{chan}.upd': {'$gte': since}} for chan in channels]}
+			)
+
+			for i in range(0, len(stocks), 10000):
+				self._merge_view(
+					db, view, col_prefix, ("t0", "t1", "t2"),
+					[{'$match': {'stock': {'$in': stocks[i:i+10000]}}}]
+				)
+
+			self._merge_view(
+				db, view, col_prefix, ("t3", ),
+				# Creation timestamp rather than _id, which is a string for t3 documents using human_id
+				[{'$match': {'meta.ts': {'$gte': since}}}]
+			)
+
+		col_mview.update_one({'_id': col_prefix}, {'$set': {'upd': now}})
+
+
+	def refresh_materialized_views(self, logger: 'None | AmpelLogger' = None, full: bool = False) -> None:
+		""" Refreshes all registered materialized views """
+		for entry in self.get_collection('mview').find({}, {'_id': 1}):
+			self.refresh_materialized_view(entry['_id'], logger, full)
+
+
+	def _merge_view(self,
+		db: Database,
+		view: AbsMongoView,
+		col_prefix: str,
+		cols: Sequence[str],
+		stages: list[dict[str, Any]]
+	) -> None:
+		for el in cols:
+			db.get_collection(el).aggregate(
+				stages + getattr(view, el)() + [
+					{
+						'$merge': {
+							'into': f'{col_prefix}_{el}',
+							'on': '_id',
+							'whenMatched': 'replace',
+							'whenNotMatched': 'insert'
+						}
+					}
+				]
+			)
+
+
+	@staticmethod
+	def _copy_indexes(source: Collection, target: Collection) -> None:
+		""" Copies indexes of source, ignoring 'channel' keys (projected out by views) """
+
+		for name, info in source.index_information().items():
+
+			if name == '_id_':
+				continue
+
+			keys = [(k, d) for k, d in info['key'] if k != 'channel']
+			if not keys:
+				continue
+
+			args = {k: v for k, v in info.items() if k in ('sparse', 'unique', 'partialFilterExpression')}
+			if len(keys) != len(info['key']):
+				args.pop('unique', None)
+
+			target.create_index(keys, **args)
+
 
 	def __repr__(self) -> str:
 		return "<AmpelDB>"
@@ -402,7 +831,7 @@ class AmpelDB(AmpelUnit):
 		self.mongo_collections.clear()
 		self.mongo_clients.clear()
 		# deleting the attribute resets cached_property
-		for attr in ("col_trace_ids", "col_conf_ids", "trace_ids", "conf_ids"):
+		for attr in ("col_trace_ids", "col_conf_ids", "trace_ids", "conf_ids", "is_sharded"):
 			try:
 				delattr(self, attr)
 			except AttributeError:
@@ -445,7 +874,7 @@ def provision_accounts(ampel_db: AmpelDB, auth: dict[str, str] = {}) -> dict[str
 		roles[db.role.r].append({"db": name, "role": "read"})
 		roles[db.role.w].append({"db": name, "role": "readWrite"})
 	users = dict()
-	admin = MongoClient(ampel_db.mongo_uri, **auth).get_database("admin")
+	admin = MongoClientRegistry.get(ampel_db.mongo_uri, "admin", **auth).get_database("admin")
 	tag = secrets.token_hex(8)
 	for name, all_roles in roles.items():
 		username = f"{name}-{tag}"
@@ -459,7 +888,7 @@ def revoke_accounts(ampel_db: AmpelDB, auth: dict[str, str] = {}) -> None:
 	"""Delete accounts previously created with "provision"."""
 	if ampel_db.vault is None:
 		raise ValueError("No secrets vault configured")
-	admin = MongoClient(ampel_db.mongo_uri, **auth).get_database("admin")
+	admin = MongoClientRegistry.get(ampel_db.mongo_uri, "admin", **auth).get_database("admin")
 	roles = {role for db in ampel_db.databases for role in db.role.dict().values()}
 	for role in roles:
 		if secret := ampel_db.vault.get_named_secret(f"mongo/{role}", dict):
@@ -470,7 +899,7 @@ def revoke_accounts(ampel_db: AmpelDB, auth: dict[str, str] = {}) -> None:
 
 def list_accounts(ampel_db: AmpelDB, auth: dict[str, str] = {}) -> dict[str, Any]:
 	"""List configured accounts and roles."""
-	admin = MongoClient(ampel_db.mongo_uri, **auth).get_database("admin")
+	admin = MongoClientRegistry.get(ampel_db.mongo_uri, "admin", **auth).get_database("admin")
 	return admin.command("usersInfo")
 
 
@@ -481,7 +910,7 @@ def init_db(ampel_db: AmpelDB, auth: dict[str, str] = {}) -> None:
 		print("DANGEROUS THINGS ARE ABOUT TO HAPPEN!")
 		print("="*40)
 		if input(f"Do you really want to reinitialize databases {[ampel_db.prefix+'_'+db.name for db in ampel_db.databases]} on {ampel_db.mongo_uri}? All data will be lost. Type 'yessir' to proceed: ") == "yessir":
-			mc = MongoClient(ampel_db.mongo_uri, **auth)
+			mc = MongoClientRegistry.get(ampel_db.mongo_uri, "admin", **auth)
 			for db in ampel_db.databases:
 				name = f"{ampel_db.prefix}_{db.name}"
 				mc.drop_database(name)
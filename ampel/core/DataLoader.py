@@ -4,7 +4,7 @@
 # License:             BSD-3-Clause
 # Author:              valery brinnel <firstname.lastname@gmail.com>
 # Date:                13.01.2018
-# Last Modified Date:  02.12.2021
+# Last Modified Date:  19.10.2026
 # Last Modified By:    valery brinnel <firstname.lastname@gmail.com>
 
 from bson.codec_options import CodecOptions
@@ -22,6 +22,7 @@ from ampel.log.utils import safe_query_dict
 from ampel.log.AmpelLogger import AmpelLogger
 from ampel.struct.AmpelBuffer import AmpelBuffer
 from ampel.util.collections import ampel_iter
+from ampel.util.compact import decode_arrays
 from ampel.core.AmpelContext import AmpelContext
 from ampel.metrics.AmpelMetricsRegistry import AmpelMetricsRegistry
 
@@ -100,11 +101,13 @@ class DataLoader:
 					}
 				)
 
-			# Retrieve pymongo cursor
-			col = self.ctx.db.get_collection(directive.col)
+			# Retrieve pymongo cursor (loads tolerate stale data and can be routed to secondaries)
+			col = self.ctx.db.get_read_collection(directive.col, directive.read_preference)
 
 			if codec_options:
-				col = col.database.get_collection(col.name, codec_options=codec_options)
+				col = col.database.get_collection(
+					col.name, codec_options=codec_options, read_preference=col.read_preference
+				)
 
 			# Note: codec_options freezes structures in dicts with depth level > 1
 			cursor = col.find(
@@ -162,6 +165,11 @@ class DataLoader:
 						#: init config integer hash with 'resolved' config dict
 						dict.__setitem__(el, 'config', el[config_keys[el['config']]]) # type: ignore[index]
 
+				# Restore numeric arrays stored as compact binaries (see AbsWorker.compact_arrays)
+				for el in res:
+					if el.get('body'):
+						dict.__setitem__(el, 'body', decode_arrays(el['body'], frozen=codec_options is not None))
+
 				inc(len(res))
 
 				if directive.excluding_query:
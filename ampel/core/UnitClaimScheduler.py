@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# File:                Ampel-core/ampel/core/UnitClaimScheduler.py
+# License:             BSD-3-Clause
+# Author:              valery brinnel <firstname.lastname@gmail.com>
+# Date:                19.10.2026
+# Last Modified Date:  19.10.2026
+# Last Modified By:    valery brinnel <firstname.lastname@gmail.com>
+
+from time import time
+from collections import deque
+from typing import Any
+from pymongo.collection import Collection
+
+from ampel.types import JDict, UnitId
+from ampel.metrics.AmpelMetricsRegistry import AmpelMetricsRegistry, Gauge
+
+_backlog_gauges: dict[int, Gauge] = {}
+
+
+def get_backlog_gauge(tier: int) -> Gauge:
+
+	if tier not in _backlog_gauges:
+		_backlog_gauges[tier] = AmpelMetricsRegistry.gauge(
+			'unit_backlog',
+			f'Number of T{tier} documents awaiting processing as observed by workers',
+			subsystem=f't{tier}',
+			labelnames=('unit', 'prio'),
+			multiprocess_mode='max'
+		)
+
+	return _backlog_gauges[tier]
+
+
+class UnitClaimScheduler:
+	"""
+	Weighted fair claiming of t1/t2 documents across units.
+
+	Documents are claimed in cycles. At the beginning of each cycle, every unit with pending
+	documents is granted a number of claims equal to its weight (quota).
+	Claims of different units are interleaved so that a burst of documents
+	associated with one (possibly expensive) unit cannot starve the others.
+
+	The number of claimable documents per unit (backlog) is counted by an aggregation
+	at most every 'refresh_interval' seconds. In between, cycles are planned from the last
+	counts minus the claims performed since then. Counts are refreshed earlier when
+	no unit has pending documents anymore according to the last counts.
+
+	Documents with the priority code (ex: T2_NEW_PRIO) form a priority class:
+	as long as prioritized documents are pending, cycles are built exclusively
+	from these (fairness applies within the class).
+	"""
+
+	def __init__(self,
+		col: Collection,
+		query: JDict,
+		tier: int,
+		weights: dict[UnitId, int],
+		default_weight: int = 1,
+		prio_code: None | int = None,
+		refresh_interval: float = 10
+	) -> None:
+		"""
+		:param query: base claim query (typically matching 'code' and possibly 'unit')
+		:param weights: number of claims per cycle for the given units
+		:param default_weight: number of claims per cycle for units not listed in weights
+		:param prio_code: document code defining the priority class
+		:param refresh_interval: min number of seconds between two backlog counts.
+		Newly added documents of units without pending documents (or prioritized documents)
+		may thus be claimed with this delay.
+		"""
+
+		self.col = col
+		self.tier = tier
+		self.weights = weights
+		self.default_weight = default_weight
+		self.prio_code = prio_code
+		self.refresh_interval = refresh_interval
+
+		# Last observed number of claimable documents per unit and class
+		self.backlog: dict[UnitId, int] = {}
+		self.prio_backlog: dict[UnitId, int] = {}
+
+		self._query = query
+		self._prio_query: None | JDict = None
+		self._regular_query: JDict = query
+
+		if prio_code is not None:
+			codes = query['code']['$in'] if isinstance(query['code'], dict) else [query['code']]
+			if prio_code in codes:
+				self._prio_query = query | {'code': prio_code}
+				self._regular_query = query | {
+					'code': {'$in': [c for c in codes if c != prio_code]}
+				}
+
+		self._slots: deque[UnitId] = deque()
+		self._exhausted: set[UnitId] = set()
+		self._cycle_query: JDict = self._regular_query
+
+		# Estimated number of claimable documents per unit of the current class
+		self._remaining: dict[UnitId, int] = {}
+		self._last_count: float = 0
+		self._gauge = get_backlog_gauge(tier)
+
+
+	def claim(self, update: JDict, exclude: None | list[Any] = None) -> None | JDict:
+		"""
+		:param update: update applied to the claimed document (ex: code RUNNING)
+		:param exclude: ids of documents which should not be claimed
+		:returns: claimed document or None if no document is claimable
+		"""
+
+		excl = {'_id': {'$nin': exclude}} if exclude else {}
+		planned = False
+		counted = False
+
+		while True:
+
+			if not self._slots:
+
+				# A full cycle based on fresh counts was planned during this call without any successful claim
+				if counted:
+					return None
+
+				# Cycles planned from estimates which did not yield any claim trigger a count
+				counted = self._plan(excl, force_count=planned)
+				planned = True
+				continue
+
+			unit = self._slots.popleft()
+			if unit in self._exhausted:
+				continue
+
+			if (doc := self.col.find_one_and_update(self._cycle_query | excl | {'unit': unit}, update)):
+				self._remaining[unit] -= 1
+				return doc
+
+			self._exhausted.add(unit)
+			self._remaining[unit] = 0
+
+
+	def _plan(self, excl: JDict, force_count: bool = False) -> bool:
+		"""
+		Builds the claim sequence of the next cycle
+		:returns: whether the backlog was counted
+		"""
+
+		self._exhausted.clear()
+		count = force_count or not any(n > 0 for n in self._remaining.values()) or \
+			time() - self._last_count >= self.refresh_interval
+
+		if count:
+			self._count(excl)
+
+		# Number of claims granted to each unit during this cycle
+		quotas = {
+			unit: min(n, self.weights.get(unit, self.default_weight))
+			for unit, n in sorted(self._remaining.items(), key=lambda x: str(x[0]))
+			if n > 0
+		}
+
+		# Interleave claims (ex: weights a=3, b=1 -> a, b, a, a)
+		for i in range(max(quotas.values(), default=0)):
+			for unit, quota in quotas.items():
+				if quota > i:
+					self._slots.append(unit)
+
+		return count
+
+
+	def _count(self, excl: JDict) -> None:
+		""" Counts claimable documents per unit and selects the class of the next cycles """
+
+		self._last_count = time()
+		previous = set(self.backlog)
+		self.backlog.clear()
+		self.prio_backlog.clear()
+
+		group: JDict = {'_id': '$unit', 'n': {'$sum': 1}}
+		if self._prio_query:
+			group['prio'] = {'$sum': {'$cond': [{'$eq': ['$code', self.prio_code]}, 1, 0]}}
+
+		for el in self.col.aggregate([{'$match': self._query | excl}, {'$group': group}]):
+			prio = el.get('prio', 0)
+			self.prio_backlog[el['_id']] = prio
+			self.backlog[el['_id']] = el['n'] - prio
+
+		for unit in previous | set(self.backlog):
+			self._gauge.labels(unit, 'false').set(self.backlog.get(unit, 0))
+			self._gauge.labels(unit, 'true').set(self.prio_backlog.get(unit, 0))
+
+		if self._prio_query and sum(self.prio_backlog.values()):
+			self._remaining = dict(self.prio_backlog)
+			self._cycle_query = self._prio_query
+		else:
+			self._remaining = dict(self.backlog)
+			self._cycle_query = self._regular_query
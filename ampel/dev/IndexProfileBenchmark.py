@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# File:                Ampel-core/ampel/dev/IndexProfileBenchmark.py
+# License:             BSD-3-Clause
+# Author:              valery brinnel <firstname.lastname@gmail.com>
+# Date:                19.10.2026
+# Last Modified Date:  19.10.2026
+# Last Modified By:    valery brinnel <firstname.lastname@gmail.com>
+
+import random
+from time import perf_counter
+from pathlib import Path
+from typing import Any
+from collections.abc import Sequence
+
+import yaml
+from pymongo.database import Database
+from ampel.mongo.model.AmpelDBModel import AmpelDBModel
+from ampel.mongo.MongoClientRegistry import MongoClientRegistry
+
+
+class IndexProfileBenchmark:
+	"""
+	Compares the query plans and execution times of the hot data collection queries
+	(t2 claim, tied t2 dependencies, t2 ingestion upsert match, state t1 load, channel selection)
+	using the index profiles defined in conf/ampel-core/mongo/data.yaml, on a synthetic dataset.
+	Requires a running mongod instance (query plans cannot be evaluated with mongomock).
+
+	Example:
+	python -m ampel.dev.IndexProfileBenchmark mongodb://localhost:27017 --stocks 100000
+	"""
+
+	def __init__(self,
+		mongo_uri: str,
+		db_name: str = 'AmpelBench_data',
+		nstock: int = 10000,
+		nunit: int = 5,
+		nchan: int = 4,
+		repeat: int = 20,
+		conf_path: None | str = None
+	) -> None:
+
+		self.db: Database = MongoClientRegistry.get(mongo_uri).get_database(db_name)
+		self.nstock = nstock
+		self.nunit = nunit
+		self.nchan = nchan
+		self.repeat = repeat
+
+		with open(conf_path or Path(__file__).parents[2] / 'conf' / 'ampel-core' / 'mongo' / 'data.yaml') as f:
+			self.db_model = AmpelDBModel(**yaml.safe_load(f))
+
+
+	def populate(self) -> None:
+		""" Creates nstock stocks, each with one t1 document and nunit t2 documents """
+
+		for col in ('stock', 't1', 't2'):
+			self.db.drop_collection(col)
+
+		stocks: list[dict[str, Any]] = []
+		t1s: list[dict[str, Any]] = []
+		t2s: list[dict[str, Any]] = []
+		for i in range(self.nstock):
+			chans = random.sample(range(self.nchan), k=random.randint(1, self.nchan))
+			stocks.append({'stock': i, 'channel': chans})
+			t1s.append({'stock': i, 'link': i, 'channel': chans, 'dps': list(range(i, i + 10))})
+			t2s.extend(
+				{
+					'stock': i, 'unit': f'T2Unit{u}', 'config': u, 'link': i,
+					'channel': chans, 'code': random.choice((-1, 0, 0, 0)), 'meta': []
+				}
+				for u in range(self.nunit)
+			)
+
+		self.db.stock.insert_many(stocks)
+		self.db.t1.insert_many(t1s)
+		self.db.t2.insert_many(t2s)
+
+
+	def get_queries(self) -> list[tuple[str, str, dict[str, Any]]]:
+		""" :returns: (label, collection name, query) """
+		s = random.randrange(self.nstock)
+		return [
+			('t2 claim', 't2', {'code': -1, 'unit': 'T2Unit0'}),
+			('t2 tied', 't2', {'unit': 'T2Unit1', 'config': 1, 'channel': 0, 'stock': s, 'link': s}),
+			('t2 ingest', 't2', {'stock': s, 'unit': 'T2Unit2', 'config': 2, 'link': s}),
+			('t1 state', 't1', {'link': s}),
+			('t3 select', 'stock', {'channel': 1}),
+		]
+
+
+	def set_profile(self, profile: None | str) -> None:
+		for col_config in self.db_model.collections:
+			if col_config.name not in ('stock', 't1', 't2'):
+				continue
+			col = self.db.get_collection(col_config.name)
+			col.drop_indexes()
+			for idx in col_config.get_indexes(profile):
+				params = idx.dict(exclude_unset=True)
+				col.create_index(params['index'], **(params.get('args') or {}))
+
+
+	def run(self, profiles: Sequence[None | str] = (None, 'ingest', 't2', 't3')) -> list[dict[str, Any]]:
+
+		ret = []
+		for profile in profiles:
+
+			self.set_profile(profile)
+
+			for label, col_name, query in self.get_queries():
+
+				col = self.db.get_collection(col_name)
+				stats = col.find(query).explain()['executionStats']
+
+				t = perf_counter()
+				for _ in range(self.repeat):
+					list(col.find(query).limit(1))
+
+				ret.append({
+					'profile': profile or 'base',
+					'query': label,
+					'stage': self._get_stage(stats['executionStages']),
+					'examined': stats['totalDocsExamined'],
+					'ms': round((perf_counter() - t) * 1000 / self.repeat, 3)
+				})
+
+		return ret
+
+
+	@staticmethod
+	def _get_stage(stage: dict[str, Any]) -> str:
+		""" :returns: innermost stage of a plan (COLLSCAN or IXSCAN) """
+		while 'inputStage' in stage:
+			stage = stage['inputStage']
+		return stage['stage'] + (f" {stage['indexName']}" if 'indexName' in stage else '')
+
+
+	def drop(self) -> None:
+		self.db.client.drop_database(self.db.name)
+
+
+def main() -> None:
+
+	from argparse import ArgumentParser
+	parser = ArgumentParser(description=IndexProfileBenchmark.__doc__)
+	parser.add_argument('mongo_uri')
+	parser.add_argument('--stocks', type=int, default=10000)
+	parser.add_argument('--repeat', type=int, default=20)
+	parser.add_argument('--conf', type=str, default=None, help='Path to a mongo data db config file')
+	parser.add_argument('--keep', action='store_true', help='Do not drop the benchmark database')
+	args = parser.parse_args()
+
+	bench = IndexProfileBenchmark(args.mongo_uri, nstock=args.stocks, repeat=args.repeat, conf_path=args.conf)
+	bench.populate()
+
+	try:
+		print(f"{'profile':<8} {'query':<10} {'examined':>9} {'ms':>9}  plan")
+		for r in bench.run():
+			print(f"{r['profile']:<8} {r['query']:<10} {r['examined']:>9} {r['ms']:>9}  {r['stage']}")
+	finally:
+		if not args.keep:
+			bench.drop()
+
+
+if __name__ == '__main__':
+	main()
@@ -4,7 +4,7 @@
 # License:             BSD-3-Clause
 # Author:              valery brinnel <firstname.lastname@gmail.com>
 # Date:                01.05.2020
-# Last Modified Date:  24.11.2021
+# Last Modified Date:  19.10.2026
 # Last Modified By:    valery brinnel <firstname.lastname@gmail.com>
 
 from time import time
@@ -207,6 +207,15 @@ class ChainedIngestionHandler:
 			updates_buffer = updates_buffer
 		)
 
+		# Upserts into sharded collections must be routable to a single shard
+		ingesters: tuple[tuple[str, AbsDocIngester], ...] = (
+			('t0', self.t0_ingester), ('t1', self.t1_ingester),
+			('t2', self.t2_ingester), ('stock', self.stock_ingester)
+		)
+		for col, ingester in ingesters:
+			if ingester.match_keys is not None:
+				self.context.db.check_targetable(col, ingester.match_keys)
+
 		for directive in directives:
 			self.iblocks.append(
 				self._new_ingest_blocks(directive, updates_buffer, logger)
@@ -4,7 +4,7 @@
 # License:             BSD-3-Clause
 # Author:              valery brinnel <firstname.lastname@gmail.com>
 # Date:                09.10.2019
-# Last Modified Date:  18.06.2020
+# Last Modified Date:  19.10.2026
 # Last Modified By:    valery brinnel <firstname.lastname@gmail.com>
 
 from typing import Any
@@ -18,10 +18,9 @@ class ChannelModel(AmpelBaseModel):
 
 	channel: int | str
 	version: int | float | str
-	#purge: PurgeModel = PurgeModel(
-	#	content={'delay': 100, 'format': 'json', 'unify': True},
-	#	logs={'delay': 50, 'format': 'csv'}
-	#)
+	#: Archival and deletion of inactive stocks (see AmpelPurger).
+	#: Ex: {'content': {'delay': 100, 'format': 'json', 'unify': True}, 'logs': {'delay': 50, 'format': 'csv'}}
+	purge: None | PurgeModel = None
 	# view: str = "MongoChannelView"
 	active: bool = True
 	hash: None | int
@@ -4,7 +4,7 @@
 # License:             BSD-3-Clause
 # Author:              valery brinnel <firstname.lastname@gmail.com>
 # Date:                09.12.2019
-# Last Modified Date:  02.12.2021
+# Last Modified Date:  19.10.2026
 # Last Modified By:    valery brinnel <firstname.lastname@gmail.com>
 
 from typing import Any, Literal
@@ -13,6 +13,7 @@ from ampel.content.DataPoint import DataPoint
 from ampel.content.T1Document import T1Document
 from ampel.content.T2Document import T2Document
 from ampel.model.t3.AliasableModel import AliasableModel
+from ampel.mongo.model.ReadPreferenceModel import ReadPreferenceModel
 
 
 models = {
@@ -39,6 +40,9 @@ class LoaderDirective(AliasableModel):
 	#: whether an emtpy find() result should discard entirely the associated stock for further processing
 	excluding_query: bool = False
 
+	#: Read preference overriding the default of AmpelDB (ex: {'mode': 'secondary', 'max_staleness': 120})
+	read_preference: None | ReadPreferenceModel = None
+
 	def __init__(self, **kwargs):
 		super().__init__(**kwargs)
 		if not self.model and self.col in models:
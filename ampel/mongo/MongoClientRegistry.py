@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# File:                Ampel-core/ampel/mongo/MongoClientRegistry.py
+# License:             BSD-3-Clause
+# Author:              valery brinnel <firstname.lastname@gmail.com>
+# Date:                19.10.2026
+# Last Modified Date:  19.10.2026
+# Last Modified By:    valery brinnel <firstname.lastname@gmail.com>
+
+import os
+from threading import Lock
+from typing import Any, ClassVar
+from pymongo import MongoClient
+from ampel.metrics.AmpelMetricsRegistry import AmpelMetricsRegistry
+
+stat_requests = AmpelMetricsRegistry.counter(
+	'client_requests',
+	'Number of mongo client requests, by outcome (hit: existing client re-used, miss: client created)',
+	subsystem='mongo',
+	labelnames=('outcome', )
+)
+
+stat_clients = AmpelMetricsRegistry.gauge(
+	'clients',
+	'Number of mongo clients (i.e. connection pools) held by the process',
+	subsystem='mongo'
+)
+
+
+class MongoClientRegistry:
+	"""
+	Process-wide registry of MongoClient instances, keyed by (uri, role, options).
+	Components connecting to the same cluster with the same credentials and options
+	(AmpelDB roles, complements, helpers) thereby share one connection pool.
+
+	Pool sizes and idle timeouts are regular client options
+	(see :class:`~ampel.mongo.model.MongoClientOptionsModel.MongoClientOptionsModel`).
+	As pymongo clients are not fork-safe, the registry is reset in child processes.
+	"""
+
+	_clients: ClassVar[dict[tuple, MongoClient]] = {}
+	_stats: ClassVar[dict[str, int]] = {'hits': 0, 'misses': 0}
+	_pid: ClassVar[int] = os.getpid()
+	_lock: ClassVar[Lock] = Lock()
+
+
+	@classmethod
+	def get(cls, uri: None | str, role: None | str = None, **options: Any) -> MongoClient:
+		"""
+		:param role: label allowing to separate pools of clients otherwise sharing uri and options
+		:param options: MongoClient keyword arguments (ex: maxPoolSize, maxIdleTimeMS, username, password)
+		"""
+
+		key = (uri, role, tuple(sorted((k, repr(v)) for k, v in options.items())))
+
+		with cls._lock:
+
+			if os.getpid() != cls._pid:
+				cls.reset()
+
+			if (mc := cls._clients.get(key)) is not None:
+				cls._stats['hits'] += 1
+				stat_requests.labels('hit').inc()
+				return mc
+
+			cls._clients[key] = mc = MongoClient(uri, **options)
+			cls._stats['misses'] += 1
+			stat_requests.labels('miss').inc()
+			stat_clients.set(len(cls._clients))
+			return mc
+
+
+	@classmethod
+	def stats(cls) -> dict[str, int]:
+		""" :returns: number of clients held and number of client requests served by existing (hits) or new (misses) clients """
+		return {'clients': len(cls._clients)} | cls._stats
+
+
+	@classmethod
+	def reset(cls) -> None:
+		""" Forgets registered clients without closing them (ex: clients inherited from a parent process) """
+		cls._clients = {}
+		cls._stats = {'hits': 0, 'misses': 0}
+		cls._pid = os.getpid()
+		stat_clients.set(0)
+
+
+	@classmethod
+	def close_all(cls) -> None:
+		for mc in cls._clients.values():
+			mc.close()
+		cls.reset()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# File:                Ampel-core/ampel/mongo/instrument/IndexAdvisor.py
+# License:             BSD-3-Clause
+# Author:              valery brinnel <firstname.lastname@gmail.com>
+# Date:                19.10.2026
+# Last Modified Date:  19.10.2026
+# Last Modified By:    valery brinnel <firstname.lastname@gmail.com>
+
+from bson import decode
+from typing import Any
+from collections.abc import Callable
+from pymongo.collection import Collection
+
+# Conditions considered as range conditions (ESR rule: equality, sort, range)
+range_ops = {'$gt', '$gte', '$lt', '$lte', '$ne', '$nin', '$exists', '$not', '$regex', '$elemMatch', '$type'}
+
+
+class IndexAdvisor:
+	"""
+	Analyzes the query samples collected by :class:`~ampel.mongo.instrument.QuerySampler.QuerySampler`:
+
+	- samples are aggregated per collection and query shape (call sites are merged)
+	- the shapes with the highest cumulated latency are checked against the existing indexes,
+	  using the winning plan of 'explain' when available (real mongod)
+	  or the existing index keys otherwise (mongomock)
+	- for shapes not supported by an index, an index is proposed
+	  following the equality - sort - range rule
+	"""
+
+	def __init__(self, stats: Collection, get_collection: Callable[[str], Collection], top: int = 10) -> None:
+		"""
+		:param stats: collection containing query samples ('querystats')
+		:param get_collection: returns the (unsampled) collection associated with a name
+		:param top: number of shapes to analyze
+		"""
+		self.stats = stats
+		self.get_collection = get_collection
+		self.top = top
+
+
+	def get_worst_shapes(self) -> list[dict[str, Any]]:
+		""" :returns: aggregated samples sorted by decreasing cumulated latency """
+
+		shapes: dict[str, dict[str, Any]] = {}
+		for s in self.stats.find({}):
+
+			# Update ops and finds sharing a shape use the same index
+			key = str((s['col'], s['shape'], s['sort']))
+			if key not in shapes:
+				shapes[key] = {
+					'col': s['col'], 'shape': s['shape'], 'sort': s['sort'],
+					'n': 0, 'time': 0., 'max': 0., 'sites': [], 'example': s.get('example')
+				}
+
+			agg = shapes[key]
+			agg['n'] += s['n']
+			agg['time'] += s['time']
+			agg['max'] = max(agg['max'], s['max'])
+			agg['sites'].append(f"{s['site']} ({s['op']})")
+
+		return sorted(shapes.values(), key=lambda x: x['time'], reverse=True)[:self.top]
+
+
+	def advise(self) -> list[dict[str, Any]]:
+		"""
+		:returns: analyzed shapes with keys col, shape, sort, calls, total_ms, mean_ms, max_ms,
+		sites, plan (COLLSCAN, IXSCAN <index name> or None if unavailable), index (name of an existing supporting index)
+		and propose (proposed index keys or None)
+		"""
+
+		ret = []
+		for s in self.get_worst_shapes():
+
+			col = self.get_collection(s['col'])
+			keys = self.get_index_keys(s['shape'], s['sort'])
+			plan = self.explain(col, s) if s['example'] else None
+			index = self.find_index(col, keys) if keys else None
+
+			ret.append({
+				'col': s['col'],
+				'shape': {k: v for k, v in s['shape']},
+				'sort': s['sort'] or None,
+				'calls': s['n'],
+				'total_ms': round(s['time'] * 1000, 3),
+				'mean_ms': round(s['time'] * 1000 / s['n'], 3),
+				'max_ms': round(s['max'] * 1000, 3),
+				'sites': s['sites'],
+				'plan': plan,
+				'index': index,
+				'propose': keys if keys and (
+					(plan is not None and plan.startswith('COLLSCAN')) or (plan is None and index is None)
+				) else None
+			})
+
+		return ret
+
+
+	@staticmethod
+	def get_index_keys(shape: list[list[str]], sort: list[list[Any]]) -> list[list[Any]]:
+		"""
+		:returns: index keys following the equality - sort - range rule.
+		Fields of logical sub-conditions ($or, $and, $nor) are ignored.
+		"""
+
+		eq, rng = [], []
+		for field, op in shape:
+			if field.startswith('$'):
+				continue
+			if set(op.split(',')) & range_ops:
+				rng.append([field, 1])
+			else:
+				eq.append([field, 1])
+
+		seen = {k for k, _ in eq}
+		ret = eq + [[k, d] for k, d in sort if k not in seen]
+		seen |= {k for k, _ in sort}
+		return ret + [el for el in rng if el[0] not in seen]
+
+
+	@staticmethod
+	def find_index(col: Collection, keys: list[list[Any]]) -> None | str:
+		"""
+		:returns: name of an existing index with the same leading field as the proposed keys
+		(rough estimate of index support used when query plans are not available)
+		"""
+		for name, info in col.index_information().items():
+			if info['key'][0][0] == keys[0][0]:
+				return name
+		return None
+
+
+	@staticmethod
+	def explain(col: Collection, s: dict[str, Any]) -> None | str:
+		""" :returns: innermost stage of the winning plan or None if explain is not supported (mongomock) """
+
+		cursor = col.find(decode(s['example']))
+		if s['sort']:
+			cursor = cursor.sort([tuple(el) for el in s['sort']])
+
+		if not hasattr(cursor, 'explain'):
+			return None
+
+		stage = cursor.explain()['queryPlanner']['winningPlan']
+		while 'inputStage' in stage:
+			stage = stage['inputStage']
+
+		return stage['stage'] + (f" {stage['indexName']}" if 'indexName' in stage else '')
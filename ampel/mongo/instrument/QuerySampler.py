@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# File:                Ampel-core/ampel/mongo/instrument/QuerySampler.py
+# License:             BSD-3-Clause
+# Author:              valery brinnel <firstname.lastname@gmail.com>
+# Date:                19.10.2026
+# Last Modified Date:  19.10.2026
+# Last Modified By:    valery brinnel <firstname.lastname@gmail.com>
+
+import sys, random
+from bson import encode, Binary
+from threading import Lock
+from typing import Any
+from collections.abc import Mapping
+from pymongo import UpdateOne
+from pymongo.collection import Collection
+
+def get_query_shape(query: None | Mapping[str, Any], prefix: str = '') -> dict[str, str]:
+	"""
+	:returns: query fields associated with the kind of condition applied to them ('eq', '$in', '$gt', ...).
+	Values are discarded, nested logical operators are flattened.
+	Ex: {'code': {'$in': [0, -1]}, 'unit': 'T2X', '$or': [{'a': 1}, {'b': {'$gt': 2}}]}
+	-> {'code': '$in', 'unit': 'eq', '$or.a': 'eq', '$or.b': '$gt'}
+	"""
+
+	if not query:
+		return {}
+
+	ret: dict[str, str] = {}
+	for k, v in query.items():
+		if k in ('$or', '$and', '$nor'):
+			for el in v:
+				ret |= get_query_shape(el, prefix + k + '.')
+		elif isinstance(v, Mapping) and v and all(kk.startswith('$') for kk in v):
+			ret[prefix + k] = ','.join(sorted(v))
+		else:
+			ret[prefix + k] = 'eq'
+
+	return ret
+
+
+def get_call_site(skip: tuple[str, ...]) -> str:
+	""" :returns: 'module:line' of the first frame whose file path does not contain any of the provided strings """
+	f = sys._getframe(1)
+	while f is not None:
+		if not any(s in f.f_code.co_filename for s in skip):
+			return f"{f.f_globals.get('__name__', '?')}:{f.f_lineno}"
+		f = f.f_back # type: ignore[assignment]
+	return '?'
+
+
+class QuerySampler:
+	"""
+	Collects samples of the queries performed on ampel collections (see :class:`SampledCollection`).
+	Samples are aggregated in memory per query shape (collection, operation, filter shape, sort, projection)
+	and call site, and periodically flushed into the 'querystats' collection,
+	where they can be analyzed by :class:`~ampel.mongo.instrument.IndexAdvisor.IndexAdvisor`.
+	"""
+
+	def __init__(self, rate: float = 1., flush_size: int = 100, col: None | Collection = None) -> None:
+		"""
+		:param rate: fraction of the queries to sample
+		:param flush_size: number of samples after which aggregated samples are flushed into 'col'
+		:param col: collection receiving aggregated samples (can be set later)
+		"""
+		self.rate = rate
+		self.flush_size = flush_size
+		self.col = col
+		self.samples: dict[tuple[str, ...], dict[str, Any]] = {}
+		self.count = 0
+		self._lock = Lock()
+
+
+	def sample(self) -> bool:
+		""" :returns: whether the next query should be sampled """
+		return self.rate >= 1 or random.random() < self.rate
+
+
+	def add(self,
+		col_name: str,
+		op: str,
+		query: None | Mapping[str, Any],
+		latency: float,
+		sort: None | Any = None,
+		projection: None | Any = None
+	) -> None:
+		"""
+		:param latency: in seconds
+		"""
+
+		site = get_call_site(('/pymongo/', '/mongomock/', '/ampel/mongo/instrument/'))
+		shape = get_query_shape(query)
+		key = (
+			col_name, op, site, str(shape),
+			str(list(sort.items()) if isinstance(sort, Mapping) else sort or ''),
+			str(sorted(projection) if projection else '')
+		)
+
+		with self._lock:
+
+			if key not in self.samples:
+				try:
+					example = Binary(encode(query or {}))
+				except Exception: # non-bson values
+					example = None
+				self.samples[key] = {
+					# stored as list since field names can contain '$' and '.'
+					'col': col_name, 'op': op, 'site': site, 'shape': [list(el) for el in shape.items()],
+					'sort': [list(el) for el in (sort.items() if isinstance(sort, Mapping) else sort or [])],
+					'projection': sorted(projection) if projection else None,
+					'example': example,
+					'n': 0, 'time': 0., 'max': 0.
+				}
+
+			s = self.samples[key]
+			s['n'] += 1
+			s['time'] += latency
+			if latency > s['max']:
+				s['max'] = latency
+
+			self.count += 1
+			if self.col is not None and self.count >= self.flush_size:
+				self._flush()
+
+
+	def flush(self) -> None:
+		with self._lock:
+			self._flush()
+
+
+	def _flush(self) -> None:
+
+		self.count = 0
+		if not self.samples or self.col is None:
+			return
+
+		self.col.bulk_write(
+			[
+				UpdateOne(
+					{
+						'col': s['col'], 'op': s['op'], 'site': s['site'],
+						'shape': s['shape'], 'sort': s['sort'], 'projection': s['projection']
+					},
+					{
+						'$inc': {'n': s['n'], 'time': s['time']},
+						'$max': {'max': s['max']},
+						'$set': {'example': s['example']}
+					},
+					upsert=True
+				)
+				for s in self.samples.values()
+			],
+			ordered=False
+		)
+
+		self.samples.clear()
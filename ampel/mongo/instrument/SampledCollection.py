@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# File:                Ampel-core/ampel/mongo/instrument/SampledCollection.py
+# License:             BSD-3-Clause
+# Author:              valery brinnel <firstname.lastname@gmail.com>
+# Date:                19.10.2026
+# Last Modified Date:  19.10.2026
+# Last Modified By:    valery brinnel <firstname.lastname@gmail.com>
+
+from time import perf_counter
+from typing import Any
+from pymongo.collection import Collection
+from ampel.mongo.instrument.QuerySampler import QuerySampler
+from ampel.mongo.instrument.SampledCursor import SampledCursor
+
+# Collection methods accepting a filter (first argument, second for distinct)
+filter_ops = (
+	'find_one', 'find_one_and_update', 'find_one_and_replace', 'find_one_and_delete',
+	'update_one', 'update_many', 'replace_one', 'delete_one', 'delete_many',
+	'count_documents', 'distinct'
+)
+
+
+class SampledCollection:
+	"""
+	Proxy of a pymongo collection sampling the queries performed through it (see :class:`QuerySampler`).
+	Attributes and methods not related to queries are forwarded unchanged.
+	"""
+
+	def __init__(self, col: Collection, sampler: QuerySampler) -> None:
+		self._col = col
+		self._sampler = sampler
+
+
+	def find(self, *args, **kwargs) -> Any:
+
+		cursor = self._col.find(*args, **kwargs)
+		if not self._sampler.sample():
+			return cursor
+
+		return SampledCursor(
+			cursor, self._sampler, self._col.name,
+			args[0] if args else kwargs.get('filter'),
+			kwargs.get('sort'),
+			args[1] if len(args) > 1 else kwargs.get('projection')
+		)
+
+
+	def aggregate(self, pipeline: list[dict[str, Any]], *args, **kwargs) -> Any:
+
+		if not self._sampler.sample():
+			return self._col.aggregate(pipeline, *args, **kwargs)
+
+		t = perf_counter()
+		ret = self._col.aggregate(pipeline, *args, **kwargs)
+
+		# Only the leading $match and $sort stages can make use of indexes
+		match, sort = None, None
+		for stage in pipeline[:2]:
+			if '$match' in stage and match is None and sort is None:
+				match = stage['$match']
+			elif '$sort' in stage and sort is None:
+				sort = stage['$sort']
+			else:
+				break
+
+		self._sampler.add(self._col.name, 'aggregate', match, perf_counter() - t, sort)
+		return ret
+
+
+	def __getattr__(self, k: str) -> Any:
+
+		attr = getattr(self._col, k)
+		if k not in filter_ops or not self._sampler.sample():
+			return attr
+
+		# distinct(key, filter, ...)
+		pos = 1 if k == 'distinct' else 0
+
+		def f(*args, **kwargs):
+			t = perf_counter()
+			ret = attr(*args, **kwargs)
+			self._sampler.add(
+				self._col.name, k,
+				args[pos] if len(args) > pos else kwargs.get('filter'),
+				perf_counter() - t,
+				kwargs.get('sort'),
+				kwargs.get('projection')
+			)
+			return ret
+
+		return f
+
+
+	def __eq__(self, other: Any) -> bool:
+		return self._col == (other._col if isinstance(other, SampledCollection) else other)
+
+
+	def __hash__(self) -> int:
+		return hash(self._col)
+
+
+	def __repr__(self) -> str:
+		return f"SampledCollection({self._col!r})"
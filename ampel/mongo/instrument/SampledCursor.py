@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# File:                Ampel-core/ampel/mongo/instrument/SampledCursor.py
+# License:             BSD-3-Clause
+# Author:              valery brinnel <firstname.lastname@gmail.com>
+# Date:                19.10.2026
+# Last Modified Date:  19.10.2026
+# Last Modified By:    valery brinnel <firstname.lastname@gmail.com>
+
+from time import perf_counter
+from typing import Any
+from ampel.mongo.instrument.QuerySampler import QuerySampler
+
+
+class SampledCursor:
+	"""
+	Cursor proxy recording the query when the first result is requested, i.e. when the query is executed.
+	Sort criteria applied to the cursor before iteration are included in the sample.
+	"""
+
+	def __init__(self, cursor: Any, sampler: QuerySampler, col_name: str, query: Any, sort: Any, projection: Any) -> None:
+		self._cursor = cursor
+		self._sampler = sampler
+		self._args = [col_name, query, sort, projection]
+		self._sampled = False
+
+
+	def __iter__(self) -> 'SampledCursor':
+		return self
+
+
+	def __next__(self) -> Any:
+
+		if self._sampled:
+			return next(self._cursor)
+
+		self._sampled = True
+		t = perf_counter()
+		try:
+			return next(self._cursor)
+		finally:
+			col_name, query, sort, projection = self._args
+			self._sampler.add(col_name, 'find', query, perf_counter() - t, sort, projection)
+
+
+	def sort(self, key_or_list: Any, direction: None | int = None) -> 'SampledCursor':
+		self._cursor = self._cursor.sort(key_or_list, direction) if direction else self._cursor.sort(key_or_list)
+		self._args[2] = [(key_or_list, direction)] if direction else key_or_list
+		return self
+
+
+	def __getattr__(self, k: str) -> Any:
+
+		attr = getattr(self._cursor, k)
+		if not callable(attr):
+			return attr
+
+		def f(*args, **kwargs):
+			# Keep proxying chained calls (limit, skip, batch_size, ...)
+			if (ret := attr(*args, **kwargs)) is self._cursor:
+				return self
+			return ret
+
+		return f
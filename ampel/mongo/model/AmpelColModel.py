@@ -4,15 +4,65 @@
 # License:             BSD-3-Clause
 # Author:              valery brinnel <firstname.lastname@gmail.com>
 # Date:                19.10.2019
-# Last Modified Date:  11.11.2021
+# Last Modified Date:  19.10.2026
 # Last Modified By:    valery brinnel <firstname.lastname@gmail.com>
 
+from typing import Literal
 from collections.abc import Sequence
 from ampel.mongo.model.IndexModel import IndexModel
 from ampel.mongo.model.ShortIndexModel import ShortIndexModel
 from ampel.base.AmpelBaseModel import AmpelBaseModel
 
 class AmpelColModel(AmpelBaseModel):
+
 	name: str
 	indexes: None | Sequence[ShortIndexModel | IndexModel] = None
 	args: dict = {}
+
+	#: Additional indexes tailored to specific workloads (key: profile name, ex: 't2').
+	#: Profiles are selected by AmpelDB (parameter index_profile) and complement the base indexes
+	profiles: None | dict[str, Sequence[ShortIndexModel | IndexModel]] = None
+
+	#: Shard key (ex: {'stock': 'hashed'}), applied if the collection is created through a mongos.
+	#: Unique indexes must be prefixed by the shard key fields.
+	#: Sharding the t1/t2 collections requires MongoDB >= 7.0 (workers claim documents without the shard key)
+	shard_key: None | dict[str, Literal[1, 'hashed']] = None
+
+
+	def __init__(self, **kwargs) -> None:
+
+		super().__init__(**kwargs)
+
+		if not self.shard_key:
+			return
+
+		for idx in self.get_indexes(list(self.profiles) if self.profiles else None):
+			if idx.args and idx.args.get('unique'):
+				fields = [idx.field] if isinstance(idx, ShortIndexModel) else [f.field for f in idx.index]
+				if fields[:len(self.shard_key)] != list(self.shard_key):
+					raise ValueError(
+						f"Unique index {idx.get_id()} of collection {self.name} "
+						f"is not prefixed by the shard key {self.shard_key}"
+					)
+
+
+	def get_indexes(self, profiles: None | str | Sequence[str] = None) -> list[ShortIndexModel | IndexModel]:
+		"""
+		:param profiles: name(s) of the index profile(s) to apply on top of base indexes
+		(profiles not defined for this collection are ignored)
+		"""
+
+		ret = list(self.indexes) if self.indexes else []
+		if not profiles:
+			return ret
+
+		ids = {idx.get_id() for idx in ret}
+		for p in ([profiles] if isinstance(profiles, str) else profiles):
+			if not self.profiles or p not in self.profiles:
+				continue
+			for idx in self.profiles[p]:
+				if idx.get_id() not in ids:
+					ids.add(idx.get_id())
+					ret.append(idx)
+
+		return ret
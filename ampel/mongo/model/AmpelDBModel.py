@@ -4,7 +4,7 @@
 # License:             BSD-3-Clause
 # Author:              valery brinnel <firstname.lastname@gmail.com>
 # Date:                19.10.2019
-# Last Modified Date:  08.03.2020
+# Last Modified Date:  19.10.2026
 # Last Modified By:    valery brinnel <firstname.lastname@gmail.com>
 
 from typing import Sequence
@@ -16,3 +16,6 @@ class AmpelDBModel(AmpelBaseModel):
 	name: str
 	collections: Sequence[AmpelColModel]
 	role: MongoClientRoleModel
+
+	#: Shard holding the unsharded collections of this database (sharded clusters only)
+	primary_shard: None | str = None
@@ -4,8 +4,8 @@
 # License:             BSD-3-Clause
 # Author:              Jakob van Santen <jakob.van.santen@desy.de>
 # Date:                08.11.2020
-# Last Modified Date:  08.11.2020
-# Last Modified By:    Jakob van Santen <jakob.van.santen@desy.de>
+# Last Modified Date:  19.10.2026
+# Last Modified By:    valery brinnel <firstname.lastname@gmail.com>
 
 from ampel.base.AmpelBaseModel import AmpelBaseModel
 
@@ -19,3 +19,10 @@ class MongoClientOptionsModel(AmpelBaseModel):
 
 	# https://github.com/mongodb/specifications/blob/master/source/server-selection/server-selection.rst#serverselectiontimeoutms
 	serverSelectionTimeoutMS: int = 30000 # default is 30,000 (milliseconds)
+
+	# Connection pool (shared process-wide by clients with identical uri, role and options, see MongoClientRegistry)
+	maxPoolSize: int = 100
+	minPoolSize: int = 0
+
+	# Idle connections are closed after this many milliseconds (None: never)
+	maxIdleTimeMS: None | int = None
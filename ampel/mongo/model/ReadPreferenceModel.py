@@ -0,0 +1,35 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# File:                Ampel-core/ampel/mongo/model/ReadPreferenceModel.py
+# License:             BSD-3-Clause
+# Author:              valery brinnel <firstname.lastname@gmail.com>
+# Date:                19.10.2026
+# Last Modified Date:  19.10.2026
+# Last Modified By:    valery brinnel <firstname.lastname@gmail.com>
+
+from typing import Literal
+from pymongo.read_preferences import make_read_preference, read_pref_mode_from_name, _ServerMode
+from ampel.base.AmpelBaseModel import AmpelBaseModel
+
+
+class ReadPreferenceModel(AmpelBaseModel):
+	"""
+	Read preference of queries tolerating stale data (T3 loads, CLI inspection).
+	Ex: {'mode': 'secondaryPreferred', 'max_staleness': 120}
+	"""
+
+	mode: Literal['primary', 'primaryPreferred', 'secondary', 'secondaryPreferred', 'nearest'] = 'secondaryPreferred'
+
+	#: Max replication lag in seconds of the secondaries to read from (-1: no limit, mongodb requires at least 90)
+	max_staleness: int = -1
+
+	#: Restricts reads to members with matching tags (ex: [{'workload': 'analytics'}])
+	tag_sets: None | list[dict[str, str]] = None
+
+
+	def get(self) -> _ServerMode:
+		return make_read_preference(
+			read_pref_mode_from_name(self.mode),
+			self.tag_sets, # type: ignore[arg-type]
+			self.max_staleness
+		)
@@ -4,11 +4,16 @@
 # License:             BSD-3-Clause
 # Author:              valery brinnel <firstname.lastname@gmail.com>
 # Date:                29.11.2018
-# Last Modified Date:  16.03.2021
+# Last Modified Date:  19.10.2026
 # Last Modified By:    valery brinnel <firstname.lastname@gmail.com>
 
-from typing import Literal, Any
-from collections.abc import Sequence
+from heapq import merge
+from datetime import datetime
+from functools import cmp_to_key
+from itertools import chain
+from typing import Literal, Any, cast
+from collections.abc import Sequence, Iterator, Iterable
+from bson import ObjectId
 from pymongo.collection import Collection
 from ampel.base.AmpelFlexModel import AmpelFlexModel
 from ampel.view.ReadOnlyDict import ReadOnlyDict
@@ -49,7 +54,7 @@ class LogsLoader(AmpelFlexModel):
 
 
 	def fetch_logs(self,
-		col: Collection,
+		col: Collection | Sequence[Collection],
 		match: None | dict[str, Any] = None,
 		channel: None | dict[str, Any] = None
 	) -> Sequence[LogDocument]:
@@ -58,13 +63,141 @@ class LogsLoader(AmpelFlexModel):
 		:param channel: The $unwind aggregagtion pipeline stage requires to re-apply channel match criteria.
 			These are not necessarily fetchable using match.get('channel') since complex match logic can use the $or operator.
 			(No need to use this argument if match['channel'] exists, it is used automatically in this case)
+		:param col: logs collection or chronologically ordered logs collection partitions
+			(see AmpelDB.get_log_collections)
 		"""
 
-		stages = [
+		log_entries = list(cast(Iterable[LogDocument], self._aggregate(col, self.build_pipeline(match, channel))))
+
+		if self.resolve_flag:
+			for el in log_entries:
+				el["f"] = LogFlag(el["f"])
+
+		if self.simplify:
+			for el in log_entries:
+				print("%r %s" % (el["_id"], el['m']))
+			return []
+
+		# if hexify:
+		#	for el in log_entries:
+		#		if 'e' in el:
+		#			el['e']['comp'] = el['e']['comp'].hex()
+
+		if self.read_only:
+			return tuple(ReadOnlyDict(el) for el in log_entries) # type: ignore
+
+		return log_entries
+
+
+	def iter_logs(self,
+		col: Collection | Sequence[Collection],
+		match: None | dict[str, Any] = None,
+		channel: None | dict[str, Any] = None,
+		sort: None | dict[str, int] = None
+	) -> Iterator[LogDocument]:
+		"""
+		Streaming version of :func:`fetch_logs` (option 'simplify' is ignored)
+		:param sort: sort stage applied right after matching (ex: {'s': 1, '_id': 1})
+		"""
+
+		for el in self._aggregate(col, self.build_pipeline(match, channel, sort), sort):
+			if self.resolve_flag:
+				el["f"] = LogFlag(el["f"])
+			yield ReadOnlyDict(el) if self.read_only else el # type: ignore[misc]
+
+
+	@staticmethod
+	def _aggregate(
+		col: Collection | Sequence[Collection],
+		pipeline: list[dict[str, Any]],
+		sort: None | dict[str, int] = None
+	) -> Iterable[dict[str, Any]]:
+		"""
+		Runs the pipeline against each provided collection (log partitions).
+		Results sorted by keys other than _id are merged so that the global sort order is preserved,
+		partitions being chronologically ordered, results are otherwise concatenated.
+		"""
+
+		# Collection proxies (sampling, mongomock) are not Collection instances
+		if not isinstance(col, (list, tuple)):
+			return col.aggregate(pipeline) # type: ignore[union-attr]
+
+		if len(col) == 1:
+			return col[0].aggregate(pipeline)
+
+		if not sort:
+			return chain.from_iterable(c.aggregate(pipeline) for c in col)
+
+		if next(iter(sort)) == '_id':
+			parts = reversed(col) if sort['_id'] < 0 else col
+			return chain.from_iterable(c.aggregate(pipeline) for c in parts)
+
+		keys = list(sort.items())
+
+		def cmp(a: dict[str, Any], b: dict[str, Any]) -> int:
+			for k, direction in keys:
+				ka = LogsLoader._bson_key(a.get(k), direction)
+				kb = LogsLoader._bson_key(b.get(k), direction)
+				if ka != kb:
+					try:
+						return direction if ka > kb else -direction
+					except TypeError: # values of the same bson type not comparable in python
+						return 0
+			return 0
+
+		return merge(*(c.aggregate(pipeline) for c in col), key=cmp_to_key(cmp))
+
+
+	@staticmethod
+	def _bson_key(v: Any, direction: int) -> tuple[int, Any]:
+		"""
+		Approximates the mongodb sort order of mixed types (null < numbers < strings < objects < ...),
+		which python cannot compare natively (ex: int and str stock ids in different partitions).
+		Like with mongodb, arrays are compared using their smallest (ascending sort)
+		or largest (descending sort) element, empty arrays coming first.
+		"""
+		if isinstance(v, (list, tuple)):
+			if not v:
+				return (0, None)
+			ks = [LogsLoader._bson_key(el, direction) for el in v]
+			try:
+				return min(ks) if direction > 0 else max(ks)
+			except TypeError:
+				return ks[0]
+		if v is None:
+			return (1, None)
+		if isinstance(v, bool):
+			return (8, v)
+		if isinstance(v, (int, float)):
+			return (2, v)
+		if isinstance(v, str):
+			return (3, v)
+		if isinstance(v, dict):
+			return (4, v)
+		if isinstance(v, bytes):
+			return (6, v)
+		if isinstance(v, ObjectId):
+			return (7, v)
+		if isinstance(v, datetime):
+			return (9, v)
+		return (10, v)
+
+
+	def build_pipeline(self,
+		match: None | dict[str, Any] = None,
+		channel: None | dict[str, Any] = None,
+		sort: None | dict[str, int] = None
+	) -> list[dict[str, Any]]:
+
+		stages: list[dict[str, Any]] = [
 			# Matching criteria (can contain nested dicts in case of complex criteria)
 			{'$match': match or {}}
 		]
 
+		# Sorting directly after matching allows the use of indexes
+		if sort:
+			stages.append({'$sort': sort})
+
 		# Extract datetime from objectid and add it as 'date' field
 		if self.datetime_ouput:
 			stages.append(
@@ -183,23 +316,4 @@ class LogsLoader(AmpelFlexModel):
 		if self.debug:
 			print("Using aggregation: %s" % stages)
 
-		log_entries: list[LogDocument] = list(col.aggregate(stages))
-
-		if self.resolve_flag:
-			for el in log_entries:
-				el["f"] = LogFlag(el["f"])
-
-		if self.simplify:
-			for el in log_entries:
-				print("%r %s" % (el["_id"], el['m']))
-			return []
-
-		# if hexify:
-		#	for el in log_entries:
-		#		if 'e' in el:
-		#			el['e']['comp'] = el['e']['comp'].hex()
-
-		if self.read_only:
-			return tuple(ReadOnlyDict(el) for el in log_entries) # type: ignore
-
-		return log_entries
+		return stages
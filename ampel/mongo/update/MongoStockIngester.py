@@ -4,10 +4,10 @@
 # License:             BSD-3-Clause
 # Author:              valery brinnel <firstname.lastname@gmail.com>
 # Date:                14.12.2017
-# Last Modified Date:  21.11.2021
+# Last Modified Date:  19.10.2026
 # Last Modified By:    valery brinnel <firstname.lastname@gmail.com>
 
-from typing import Any
+from typing import Any, ClassVar
 from pymongo import UpdateOne
 from ampel.abstract.AbsDocIngester import AbsDocIngester
 from ampel.content.StockDocument import StockDocument
@@ -17,6 +17,8 @@ from ampel.util.collections import try_reduce
 
 class MongoStockIngester(AbsDocIngester[StockDocument]):
 
+	match_keys: ClassVar[tuple[str, ...]] = ('stock', )
+
 	def ingest(self, doc: StockDocument) -> None:
 
 		now = doc['journal'][-1]['ts']
@@ -4,11 +4,11 @@
 # License:             BSD-3-Clause
 # Author:              valery brinnel <firstname.lastname@gmail.com>
 # Date:                23.05.2021
-# Last Modified Date:  14.12.2021
+# Last Modified Date:  19.10.2026
 # Last Modified By:    valery brinnel <firstname.lastname@gmail.com>
 
 from pymongo import UpdateOne
-from typing import Any, Literal
+from typing import Any, ClassVar, Literal
 from ampel.mongo.utils import maybe_use_each
 from ampel.content.DataPoint import DataPoint
 from ampel.abstract.AbsDocIngester import AbsDocIngester
@@ -22,6 +22,8 @@ class MongoT0Ingester(AbsDocIngester[DataPoint]):
 	#: 2: strict check is performed
 	extended_match: Literal[0, 1, 2] = 0
 
+	match_keys: ClassVar[tuple[str, ...]] = ('id', )
+
 	def ingest(self, doc: DataPoint) -> None:
 
 		match: dict[str, Any] = {'id': doc['id']}
@@ -4,11 +4,11 @@
 # License:             BSD-3-Clause
 # Author:              valery brinnel <firstname.lastname@gmail.com>
 # Date:                24.04.2021
-# Last Modified Date:  09.10.2021
+# Last Modified Date:  19.10.2026
 # Last Modified By:    valery brinnel <firstname.lastname@gmail.com>
 
 from pymongo import UpdateOne
-from typing import Any
+from typing import Any, ClassVar
 from ampel.mongo.utils import maybe_use_each
 from ampel.content.T1Document import T1Document
 from ampel.abstract.AbsDocIngester import AbsDocIngester
@@ -16,6 +16,8 @@ from ampel.abstract.AbsDocIngester import AbsDocIngester
 
 class MongoT1Ingester(AbsDocIngester[T1Document]):
 
+	match_keys: ClassVar[tuple[str, ...]] = ('stock', 'link')
+
 	def ingest(self, doc: T1Document) -> None:
 
 		# Note: $setOnInsert does not retain key order
@@ -4,11 +4,11 @@
 # License:             BSD-3-Clause
 # Author:              valery brinnel <firstname.lastname@gmail.com>
 # Date:                14.12.2017
-# Last Modified Date:  08.10.2021
+# Last Modified Date:  19.10.2026
 # Last Modified By:    valery brinnel <firstname.lastname@gmail.com>
 
 from pymongo import UpdateOne
-from typing import Any
+from typing import Any, ClassVar
 from ampel.enum.DocumentCode import DocumentCode
 from ampel.content.T2Document import T2Document
 from ampel.mongo.utils import maybe_use_each
@@ -17,6 +17,8 @@ from ampel.abstract.AbsDocIngester import AbsDocIngester
 
 class MongoT2Ingester(AbsDocIngester[T2Document]):
 
+	match_keys: ClassVar[tuple[str, ...]] = ('stock', 'unit', 'config', 'link')
+
 	def ingest(self, doc: T2Document) -> None:
 
 		# Note: mongodb $setOnInsert does not retain key order
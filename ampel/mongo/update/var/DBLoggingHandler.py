@@ -4,10 +4,12 @@
 # License:             BSD-3-Clause
 # Author:              valery brinnel <firstname.lastname@gmail.com>
 # Date:                14.12.2017
-# Last Modified Date:  29.03.2021
+# Last Modified Date:  19.10.2026
 # Last Modified By:    valery brinnel <firstname.lastname@gmail.com>
 
 import struct, socket
+from itertools import groupby
+from functools import partial
 from bson import ObjectId
 from typing import TYPE_CHECKING
 from logging import LogRecord
@@ -20,6 +22,7 @@ from ampel.log.LightLogRecord import LightLogRecord
 from ampel.log.AmpelLoggingError import AmpelLoggingError
 from ampel.log.LogFlag import LogFlag
 from ampel.log.utils import log_exception, report_exception
+from ampel.mongo.utils import get_log_partition
 
 if TYPE_CHECKING:
 	from ampel.core.AmpelDB import AmpelDB
@@ -71,6 +74,9 @@ class DBLoggingHandler(AmpelUnit):
 		*aggregate_interval* is the max interval of time in seconds during which log aggregation takes place. \
 		Beyond this value, a new log document is created no matter what. This parameter thus impacts logging time granularity.
 		:param flush_len: How many log documents should be kept in memory before attempting a database bulk_write operation.
+
+		If the ampel db is configured with a log partition period (see AmpelDB.log_partition),
+		log documents are saved into the partition (ex: logs_20261019) covering their creation time.
 		"""
 
 		super().__init__(**kwargs)
@@ -83,7 +89,7 @@ class DBLoggingHandler(AmpelUnit):
 		self.warn_lvl = LogFlag.WARNING
 
 		# Get reference to pymongo collection
-		self.col = ampel_db.get_collection(self.col_name)
+		self.col = ampel_db.get_log_collection() if self.col_name == 'logs' else ampel_db.get_collection(self.col_name)
 
 		# ObjectID middle: 3 bytes machine + 2 bytes encoding the last 4 digits of run_id (unique)
 		# NB: pid is not always unique if running in a jail or container
@@ -237,6 +243,18 @@ class DBLoggingHandler(AmpelUnit):
 		self.log_dicts = []
 		self.prev_record = None
 
+		# Log entries are time-sorted, a flush spanning two partitions results in two groups
+		if self.col_name == 'logs' and (period := self._ampel_db.log_partition):
+			partition = partial(get_log_partition, period=period)
+			for name, group in groupby(dicts, key=lambda d: partition(d['_id'].generation_time)):
+				self.col = self._ampel_db.get_collection(name)
+				self._insert(list(group))
+		else:
+			self._insert(dicts)
+
+
+	def _insert(self, dicts: list[dict]) -> None:
+
 		try:
 			# pymongo drops the GIL while sending and receiving data over the network
 			self.col.insert_many(dicts, ordered=False)
@@ -4,13 +4,17 @@
 # License:             BSD-3-Clause
 # Author:              valery brinnel <firstname.lastname@gmail.com>
 # Date:                31.10.2018
-# Last Modified Date:  09.10.2021
+# Last Modified Date:  19.10.2026
 # Last Modified By:    valery brinnel <firstname.lastname@gmail.com>
 
-from typing import Any
+from typing import Any, Literal
 from collections.abc import Sequence
+from datetime import datetime, timedelta, timezone
+from bson import ObjectId
 from ampel.types import StrictIterable, strict_iterable
 
+LogPartitionPeriod = Literal['day', 'week', 'month']
+
 
 def add_or(query: dict[str, Any], arg: dict[str, Any]) -> None:
 
@@ -77,3 +81,57 @@ def get_ids(col: Any, *, filter_stage: None | dict = None) -> set[Any]:
 	if res := next(col.aggregate(agg), None):
 		return set(res['ids'])
 	return set()
+
+
+def get_log_partition(dt: datetime | float, period: LogPartitionPeriod) -> str:
+	"""
+	:param dt: datetime or unix timestamp
+	:returns: name of the logs collection partition covering the provided time.
+	Ex: 'logs_20261019' (day), 'logs_20261019' (week starting on Monday 19.10.2026), 'logs_20261001' (month)
+	"""
+
+	if not isinstance(dt, datetime):
+		dt = datetime.fromtimestamp(dt, timezone.utc)
+	elif dt.tzinfo:
+		dt = dt.astimezone(timezone.utc)
+
+	if period == 'week':
+		dt -= timedelta(days=dt.weekday())
+	elif period == 'month':
+		dt = dt.replace(day=1)
+
+	return f"logs_{dt:%Y%m%d}"
+
+
+def get_log_partition_range(name: str, period: LogPartitionPeriod) -> tuple[datetime, datetime]:
+	""" :returns: start (included) and end (excluded) utc datetimes covered by a logs collection partition """
+
+	start = datetime.strptime(name[5:], '%Y%m%d').replace(tzinfo=timezone.utc)
+
+	if period == 'day':
+		return start, start + timedelta(days=1)
+
+	if period == 'week':
+		return start, start + timedelta(days=7)
+
+	return start, (start + timedelta(days=32)).replace(day=1)
+
+
+def get_oid_time_range(match: None | dict[str, Any]) -> tuple[None | datetime, None | datetime]:
+	"""
+	:returns: time range covered by the ObjectId criteria of the provided query
+	(ex: {'_id': {'$gte': ObjectId(...)}}), boundaries are None if unconstrained
+	"""
+
+	if not match or not isinstance(oid := match.get('_id'), dict):
+		return None, None
+
+	after, before = None, None
+	for op, v in oid.items():
+		if isinstance(v, ObjectId):
+			if op in ('$gt', '$gte'):
+				after = v.generation_time
+			elif op in ('$lt', '$lte'):
+				before = v.generation_time
+
+	return after, before
@@ -0,0 +1,242 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# File:                Ampel-core/ampel/ops/AmpelPurger.py
+# License:             BSD-3-Clause
+# Author:              valery brinnel <firstname.lastname@gmail.com>
+# Date:                19.10.2026
+# Last Modified Date:  19.10.2026
+# Last Modified By:    valery brinnel <firstname.lastname@gmail.com>
+
+import os
+from time import time, sleep
+from datetime import datetime, timezone
+from typing import Any
+from collections.abc import Sequence
+from bson import ObjectId
+from ampel.types import ChannelId
+from ampel.abstract.AbsOpsUnit import AbsOpsUnit
+from ampel.model.purge.PurgeContentModel import PurgeContentModel
+from ampel.model.purge.PurgeLogsModel import PurgeLogsModel
+from ampel.ops.ArchiveWriter import ArchiveWriter
+from ampel.mongo.utils import get_log_partition_range
+
+
+class AmpelPurger(AbsOpsUnit):
+    """
+    Archives and deletes the documents of inactive stocks, as well as old log entries.
+
+    Content: stocks whose channels have not been updated (timestamps ts.<channel>.upd)
+    for longer than the purge delay of the channel are selected, their stock, t0, t1 and t2 documents
+    are streamed into archive files (see :class:`~ampel.model.purge.PurgeContentModel.PurgeContentModel`)
+    and then deleted. A stock associated with several channels is only purged if it is inactive
+    wrt all of them (channels without purge configuration are never considered inactive).
+    Documents shared with stocks not being purged (ex: datapoints) are archived and kept,
+    the ids of the purged stocks being pulled from their 'stock' array.
+
+    Stocks are processed in batches of 'batch_size' stocks (keyset pagination on _id).
+    Progress is stored in the beacon returned by run(), so that a run interrupted or
+    throttled by 'max_stocks' resumes where the previous one stopped.
+    """
+
+    #: Channels to purge. Purge configurations are read from the channel configurations ('purge' key)
+    channel: ChannelId | Sequence[ChannelId]
+
+    #: Overrides the content purge configuration of the channels listed above
+    content: None | PurgeContentModel = None
+
+    #: Purge of log entries (independent of channels)
+    logs: None | PurgeLogsModel = None
+
+    #: Directory where archive files are written
+    path: str
+
+    #: Number of stocks archived and deleted at once
+    batch_size: int = 500
+
+    #: Maximum number of stocks purged per run (throttling)
+    max_stocks: None | int = None
+
+    #: Pause in seconds between two batches (throttling)
+    pause: float = 0
+
+    #: Summary collection maintained by T2 workers (see AbsWorker.summary_col).
+    #: Entries of purged stocks are deleted (not archived, summaries being derived from t2 documents)
+    summary_col: None | str = None
+
+    #: Archive documents without deleting them (the progress stored in the beacon is left unchanged)
+    dry_run: bool = False
+
+
+    def __init__(self, **kwargs) -> None:
+
+        super().__init__(**kwargs)
+
+        self.channels: list[ChannelId] = [self.channel] if isinstance(self.channel, (int, str)) else list(self.channel)
+        self.models: dict[ChannelId, PurgeContentModel] = {}
+
+        for chan in self.channels:
+            if (m := self.content or self.get_channel_model(chan)) is None:
+                raise ValueError(f"No purge configuration available for channel {chan}")
+            self.models[chan] = m
+
+        self.db = self.context.db
+        os.makedirs(self.path, exist_ok=True)
+
+
+    def get_channel_model(self, chan: ChannelId) -> None | PurgeContentModel:
+        if (conf := self.context.config.get(f'channel.{chan}.purge.content', dict)):
+            return PurgeContentModel(**conf)
+        return None
+
+
+    def get_delay(self, chan: ChannelId) -> None | int:
+        """ :returns: purge delay in days of the provided channel or None if the channel is not purged """
+        if chan in self.models:
+            return self.models[chan].delay
+        return m.delay if (m := self.get_channel_model(chan)) else None
+
+
+    def run(self, beacon: None | dict[str, Any] = None) -> None | dict[str, Any]:
+
+        now = time()
+        last: dict[str, Any] = dict(beacon.get('last', {})) if beacon else {}
+        budget = self.max_stocks
+        stats = {'stocks': 0, 'logs': 0}
+
+        # Dry runs must not shift where the next actual run resumes
+        progress = dict(last) if self.dry_run else last
+
+        for chan in self.channels:
+
+            n = self.purge_content(chan, now, progress, budget)
+            stats['stocks'] += n
+
+            if budget is not None:
+                if (budget := budget - n) <= 0:
+                    break
+
+        if self.logs:
+            stats['logs'] = self.purge_logs(now)
+
+        self.logger.info(f"Purged {stats['stocks']} stocks and {stats['logs']} log entries")
+        return {'last': last, 'purged': stats, 'ts': now}
+
+
+    def purge_content(self, chan: ChannelId, now: float, last: dict[str, Any], budget: None | int) -> int:
+        """
+        :param last: key: channel (as str), value: _id of the last stock document processed (updated by this method)
+        :returns: number of purged stocks
+        """
+
+        model = self.models[chan]
+        match = {'channel': chan, f'ts.{chan}.upd': {'$lt': now - model.delay * 86400}}
+        col_stock = self.db.get_collection('stock')
+        writer = ArchiveWriter(self.path, f'{chan}_{int(now)}', model.format, model.compress, model.unify)
+        count = 0
+
+        try:
+
+            while budget is None or count < budget:
+
+                query = match | {'_id': {'$gt': last[str(chan)]}} if last.get(str(chan)) else match
+                stocks = list(
+                    col_stock.find(query) \
+                        .sort('_id', 1) \
+                        .limit(self.batch_size if budget is None else min(self.batch_size, budget - count))
+                )
+
+                if not stocks:
+                    # Done, next run starts again from the beginning
+                    last.pop(str(chan), None)
+                    break
+
+                last[str(chan)] = stocks[-1]['_id']
+
+                # Stocks must be inactive wrt all their channels
+                docs = {'stock': [s for s in stocks if self.is_inactive(s, now)]}
+                if not (ids := [s['stock'] for s in docs['stock']]):
+                    continue
+
+                for col in ('t0', 't1', 't2'):
+                    docs[col] = list(self.db.get_collection(col).find({'stock': {'$in': ids}}))
+
+                writer.write(docs)
+
+                if not self.dry_run:
+
+                    # Documents referencing stocks not purged are kept. Purged ids are pulled from
+                    # their 'stock' array so that a document shared by inactive stocks processed
+                    # in different batches is deleted along with the last of them
+                    match_del = {'stock': {'$in': ids, '$not': {'$elemMatch': {'$nin': ids}}}}
+                    for col in ('t0', 't1', 't2'):
+                        c = self.db.get_collection(col)
+                        c.delete_many(match_del)
+                        c.update_many({'stock': {'$in': ids}}, {'$pull': {'stock': {'$in': ids}}})
+                    col_stock.delete_many({'_id': {'$in': [s['_id'] for s in docs['stock']]}})
+                    if self.summary_col:
+                        self.db.get_collection(self.summary_col).delete_many({'_id': {'$in': ids}})
+
+                count += len(ids)
+                if self.pause:
+                    sleep(self.pause)
+
+        finally:
+            writer.close()
+
+        return count
+
+
+    def is_inactive(self, stock: dict[str, Any], now: float) -> bool:
+
+        chans = stock['channel']
+        for chan in ([chans] if isinstance(chans, (int, str)) else chans):
+            if (delay := self.get_delay(chan)) is None:
+                return False
+            if stock.get('ts', {}).get(str(chan), {}).get('upd', 0) >= now - delay * 86400:
+                return False
+
+        return True
+
+
+    def purge_logs(self, now: float) -> int:
+        """
+        Log partitions (see AmpelDB.log_partition) entirely older than the purge delay
+        are archived and dropped, other log collections are purged entry-wise.
+        :returns: number of purged log entries
+        """
+
+        assert self.logs is not None
+        cutoff = datetime.fromtimestamp(now - self.logs.delay * 86400, timezone.utc)
+        oid = ObjectId.from_datetime(cutoff)
+        writer = ArchiveWriter(self.path, f'logs_{int(now)}', self.logs.format, self.logs.compress, header=self.logs.header)
+        count = 0
+
+        try:
+            for col in self.db.get_log_collections(before=cutoff):
+
+                drop = col.name != 'logs' and \
+                    get_log_partition_range(col.name, self.db.log_partition)[1] <= cutoff # type: ignore[arg-type]
+                match: dict[str, Any] = {'_id': {'$lt': oid}}
+
+                while (docs := list(col.find(match).sort('_id', 1).limit(self.batch_size * 10))):
+
+                    writer.write({'logs': docs})
+                    count += len(docs)
+
+                    # Partitions are dropped as a whole, dry runs delete nothing: advance keyset cursor
+                    if drop or self.dry_run:
+                        match = {'_id': {'$gt': docs[-1]['_id'], '$lt': oid}}
+                        continue
+
+                    col.delete_many({'_id': {'$gte': docs[0]['_id'], '$lte': docs[-1]['_id']}})
+                    if self.pause:
+                        sleep(self.pause)
+
+        finally:
+            writer.close()
+
+        # Archived partitions are dropped once the archive file is complete
+        if self.db.log_partition and not self.dry_run:
+            self.db.drop_log_partitions(cutoff, self.logger)
+
+        return count
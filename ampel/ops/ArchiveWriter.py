@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# File:                Ampel-core/ampel/ops/ArchiveWriter.py
+# License:             BSD-3-Clause
+# Author:              valery brinnel <firstname.lastname@gmail.com>
+# Date:                19.10.2026
+# Last Modified Date:  19.10.2026
+# Last Modified By:    valery brinnel <firstname.lastname@gmail.com>
+
+import csv, gzip, io, os
+from typing import Any, IO, cast
+from collections.abc import Mapping, Sequence
+from bson import encode
+from bson.json_util import dumps
+
+
+class ArchiveWriter:
+    """
+    Writes documents into archive files <path>/<name>_<collection>.<format>[.gz]
+    or, if 'unify' is set, into a single file <path>/<name>.json[.gz] containing
+    one json document per stock with the keys stock, t0, t1 and t2.
+    """
+
+    def __init__(self,
+        path: str, name: str, format: str,
+        compress: bool = True, unify: bool = False, header: bool = False
+    ) -> None:
+        self.path = path
+        self.name = name
+        self.format = format
+        self.compress = compress
+        self.unify = unify
+        self.header = header
+        self.files: dict[str, IO] = {}
+
+
+    def get_file(self, key: str) -> IO:
+
+        if key not in self.files:
+
+            fname = os.path.join(
+                self.path, f"{self.name}.{self.format}" if self.unify else f"{self.name}_{key}.{self.format}"
+            )
+
+            binary = self.format == 'bson'
+            if self.compress:
+                f = cast(IO, gzip.open(fname + '.gz', 'ab' if binary else 'at'))
+            else:
+                f = open(fname, 'ab' if binary else 'at')
+
+            self.files[key] = f
+
+        return self.files[key]
+
+
+    def write(self, docs: Mapping[str, Sequence[dict[str, Any]]]) -> None:
+
+        if self.unify:
+            f = self.get_file('all')
+            for s in docs['stock']:
+                f.write(
+                    dumps({
+                        'stock': s,
+                        **{
+                            col: [d for d in docs[col] if self.has_stock(d, s['stock'])]
+                            for col in ('t0', 't1', 't2')
+                        }
+                    }) + '\n'
+                )
+            return
+
+        for col, col_docs in docs.items():
+            if not col_docs:
+                continue
+            f = self.get_file(col)
+            if self.format == 'bson':
+                for d in col_docs:
+                    f.write(encode(d))
+            elif self.format == 'json':
+                for d in col_docs:
+                    if col == 'logs': # replace ObjectId with embedded timestamp
+                        d = d | {'_id': d['_id'].generation_time.isoformat()}
+                    f.write(dumps(d) + '\n')
+            else: # csv (logs)
+                self.write_csv(f, col_docs)
+
+
+    def write_csv(self, f: IO, docs: Sequence[dict[str, Any]]) -> None:
+
+        buf = io.StringIO()
+        w = csv.writer(buf)
+
+        if self.header:
+            w.writerow(['date', 'r', 'f', 's', 'c', 'm', 'e'])
+            self.header = False
+
+        for d in docs:
+            w.writerow([
+                d['_id'].generation_time.isoformat(), d.get('r'), d.get('f'), d.get('s'),
+                d.get('c'), d.get('m'), dumps(d['e']) if 'e' in d else ''
+            ])
+
+        f.write(buf.getvalue())
+
+
+    @staticmethod
+    def has_stock(doc: dict[str, Any], stock: Any) -> bool:
+        s = doc.get('stock')
+        return s == stock or (isinstance(s, (list, tuple)) and stock in s)
+
+
+    def close(self) -> None:
+        for f in self.files.values():
+            f.close()
+        self.files.clear()
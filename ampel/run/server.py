@@ -43,6 +43,7 @@ from ampel.base.AmpelBaseModel import AmpelBaseModel
 from ampel.core.AmpelDB import AmpelDB
 from ampel.enum.DocumentCode import DocumentCode
 from ampel.util.hash import build_unsafe_dict_id
+from ampel.util.compact import decode_arrays
 
 if TYPE_CHECKING:
     from ampel.protocol.LoggerProtocol import LoggerProtocol
@@ -530,6 +531,8 @@ def stock_summary():
 
 
 def transform_doc(doc: dict[str, Any], tier: int) -> dict[str, Any]:
+    if tier == 2 and "body" in doc:
+        doc["body"] = decode_arrays(doc["body"])
     doc = json_util._json_convert(doc, json_util.RELAXED_JSON_OPTIONS)
     if tier == 1:
         doc["added"] = datetime.fromtimestamp(doc["added"])
@@ -668,7 +671,14 @@ def get_logs(
                 operator.or_, [LogFlag.__members__[k.name] for k in flags]
             )
         }
-    cursor = context.db.get_collection("logs").find(query, {"r": 0})
+    # restrict partitioned logs to the lifetime of the run
+    after, before = None, None
+    if context.db.log_partition and (
+        event := context.db.get_collection("events").find_one({"run": run_id})
+    ):
+        after = event["_id"].generation_time
+        if "duration" in event:
+            before = after + timedelta(seconds=event["duration"] + 1)
     translate_keys = {"_id", "f"}
     return {
         "logs": [
@@ -683,7 +693,8 @@ def get_logs(
                     if k not in translate_keys
                 },
             }
-            for doc in cursor
+            for col in context.db.get_log_collections(after, before)
+            for doc in col.find(query, {"r": 0})
         ]
     }
 
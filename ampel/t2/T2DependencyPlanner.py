@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# File:                Ampel-core/ampel/t2/T2DependencyPlanner.py
+# License:             BSD-3-Clause
+# Author:              valery brinnel <firstname.lastname@gmail.com>
+# Date:                19.10.2026
+# Last Modified Date:  19.10.2026
+# Last Modified By:    valery brinnel <firstname.lastname@gmail.com>
+
+from typing import Any, Literal
+from collections.abc import Sequence
+
+from ampel.types import UnitId
+from ampel.config.AmpelConfig import AmpelConfig
+from ampel.content.DataPoint import DataPoint
+from ampel.content.T2Document import T2Document
+from ampel.base.BadConfig import BadConfig
+from ampel.log.AmpelLogger import AmpelLogger
+from ampel.abstract.AbsTiedT2Unit import AbsTiedT2Unit
+from ampel.abstract.AbsTiedPointT2Unit import AbsTiedPointT2Unit
+from ampel.abstract.AbsTiedStateT2Unit import AbsTiedStateT2Unit
+from ampel.abstract.AbsTiedStockT2Unit import AbsTiedStockT2Unit
+from ampel.abstract.AbsTiedCustomStateT2Unit import AbsTiedCustomStateT2Unit
+from ampel.model.UnitModel import UnitModel
+from ampel.model.StateT2Dependency import StateT2Dependency
+from ampel.mongo.utils import maybe_match_array
+
+# Origin of the 'link' value to match for a given dependency:
+# - 'link': link of the tied t2 doc
+# - 'stock': stock id of the tied t2 doc
+# - 'dps': datapoint ids of the state (possibly modified by link_override)
+LinkSource = Literal['link', 'stock', 'dps']
+DependencyPlan = list[tuple[UnitModel, LinkSource]]
+
+
+class T2DependencyPlanner:
+	"""
+	Resolves the dependencies of tied T2 units.
+
+	Unit metadata of dependencies (which determines how links are matched) is looked up
+	in the ampel config only once per (tied unit, config) combination.
+	All dependencies of a tied T2 document are gathered by a single query
+	(see :func:`build_query`), as opposed to one query per dependency.
+	"""
+
+	def __init__(self, config: AmpelConfig) -> None:
+		self.config = config
+		self._plans: dict[tuple[UnitId, Any], DependencyPlan] = {}
+
+
+	def get_plan(self, t2_unit: AbsTiedT2Unit, t2_doc: T2Document) -> DependencyPlan:
+		"""
+		:raises:
+			- ValueError if functionality is not implemented yet or dependency is unknown
+			- BadConfig if what's requested is not possible (a point T2 cannot be linked with a state t2)
+		"""
+
+		k = (t2_doc['unit'], t2_doc['config'])
+		if k not in self._plans:
+			self._plans[k] = [
+				(tied_model, self._get_link_source(t2_unit, tied_model))
+				for tied_model in t2_unit.t2_dependency
+			]
+
+		return self._plans[k]
+
+
+	def _get_link_source(self, t2_unit: AbsTiedT2Unit, tied_model: UnitModel) -> LinkSource:
+
+		t2_unit_info = self.config.get(f'unit.{tied_model.unit}', dict)
+
+		if not t2_unit_info:
+			raise ValueError(f'Unknown T2 unit {tied_model.unit}')
+
+		base = t2_unit_info['base']
+
+		if isinstance(t2_unit, AbsTiedPointT2Unit):
+
+			if 'AbsPointT2Unit' in base:
+				return 'link'
+
+			elif 'AbsStockT2Unit' in base:
+				raise ValueError('Not implemented yet')
+
+			else: # State T2
+				raise BadConfig('Tied point T2 cannot be linked with state T2s')
+
+		elif isinstance(t2_unit, AbsTiedStockT2Unit):
+
+			if 'AbsPointT2Unit' in base:
+				raise BadConfig('Tied stock T2 cannot be linked with point T2s')
+
+			elif 'AbsStockT2Unit' in base:
+				return 'stock'
+
+			else: # State T2
+				raise BadConfig('Tied stock T2 cannot be linked with state T2s')
+
+		elif isinstance(t2_unit, (AbsTiedStateT2Unit, AbsTiedCustomStateT2Unit)):
+
+			if 'AbsPointT2Unit' in base:
+				return 'dps' # Further checks required (link_override check)
+
+			elif 'AbsStockT2Unit' in base:
+				return 'stock'
+
+			else: # State T2
+				return 'link'
+
+		raise ValueError(f'Unsupported tied unit: {t2_unit.__class__.__name__}')
+
+
+	def build_query(self,
+		t2_unit: AbsTiedT2Unit,
+		t2_doc: T2Document,
+		logger: AmpelLogger,
+		dps: None | Sequence[DataPoint] = None
+	) -> None | dict[str, Any]:
+		"""
+		:param dps: datapoints associated with the state of tied state t2s
+		:returns: a single query matching all dependencies of the provided t2 document,
+		None if the unit declares no dependency (mongodb rejects empty $or arrays)
+		"""
+
+		clauses: list[dict[str, Any]] = []
+		link: Any
+
+		for tied_model, link_source in self.get_plan(t2_unit, t2_doc):
+
+			if link_source == 'link':
+				link = t2_doc['link']
+
+			elif link_source == 'stock':
+				link = t2_doc['stock']
+
+			else:
+
+				if dps is None:
+					raise ValueError('Datapoints are required to match point t2 dependencies')
+
+				# Without link_override, all datapoints of the state are matched.
+				# dps contains exactly the datapoints referenced by the t1 doc (in the same order),
+				# it is thus equivalent to the 'dps' array of the t1 doc
+				l = list(dps)
+				if isinstance(tied_model, StateT2Dependency) and tied_model.link_override:
+
+					filtr, sort, slc = tied_model.link_override.tools()
+
+					if filtr:
+						l = filtr.apply(l)
+
+					# Sort (ex: by body.jd)
+					if sort:
+						l = sort(l)
+
+					# Slice (ex: first datapoint)
+					if slc:
+						l = l[slc]
+
+				link = maybe_match_array([el['id'] for el in l])
+
+				if logger.verbose > 1:
+					logger.debug(
+						f"Point dependencies matching criteria: {link!r}",
+						extra={'unit': t2_doc['unit'], 'stock': t2_doc['stock']}
+					)
+
+			clauses.append(
+				{'unit': tied_model.unit, 'config': tied_model.config, 'link': link}
+			)
+
+		if not clauses:
+			return None
+
+		query: dict[str, Any] = {
+			'channel': {'$in': t2_doc['channel']},
+			'stock': t2_doc['stock']
+		}
+
+		if len(clauses) == 1:
+			query |= clauses[0]
+		else:
+			query['$or'] = clauses
+
+		return query
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# File:                Ampel-core/ampel/t2/T2StateCache.py
+# License:             BSD-3-Clause
+# Author:              valery brinnel <firstname.lastname@gmail.com>
+# Date:                19.10.2026
+# Last Modified Date:  19.10.2026
+# Last Modified By:    valery brinnel <firstname.lastname@gmail.com>
+
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Any
+
+
+class T2StateCache:
+	"""
+	Size-bounded (LRU) cache for objects built by custom state T2 units,
+	keyed by (build implementation, T1 link).
+
+	Units sharing the same :func:`build` implementation (for example all subclasses
+	of AbsLightCurveT2Unit) and processing the same state thereby share a single
+	instance of the built object (ex: a LightCurve).
+	Cached objects are shared between units and must hence be treated as read-only.
+	"""
+
+	def __init__(self, max_size: int) -> None:
+		self.max_size = max_size
+		self.hits = 0
+		self.misses = 0
+		self._data: OrderedDict[tuple[Callable, Any], Any] = OrderedDict()
+
+
+	def get(self, build: Callable, link: Any) -> Any:
+		""" :returns: the cached object or None if not available """
+
+		k = (build, link)
+		if k in self._data:
+			self.hits += 1
+			self._data.move_to_end(k)
+			return self._data[k]
+
+		self.misses += 1
+		return None
+
+
+	def add(self, build: Callable, link: Any, state: Any) -> None:
+
+		if self.max_size <= 0:
+			return
+
+		self._data[(build, link)] = state
+		self._data.move_to_end((build, link))
+
+		while len(self._data) > self.max_size:
+			self._data.popitem(last=False)
+
+
+	def get_stats(self) -> dict[str, int]:
+		return {'hits': self.hits, 'misses': self.misses, 'size': len(self._data)}
+
+
+	def clear(self) -> None:
+		self._data.clear()
+		self.hits = 0
+		self.misses = 0
+
+
+	def __len__(self) -> int:
+		return len(self._data)
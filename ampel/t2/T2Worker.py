@@ -4,7 +4,7 @@
 # License:             BSD-3-Clause
 # Author:              valery brinnel <firstname.lastname@gmail.com>
 # Date:                24.05.2019
-# Last Modified Date:  29.10.2021
+# Last Modified Date:  19.10.2026
 # Last Modified By:    valery brinnel <firstname.lastname@gmail.com>
 
 from time import time
@@ -21,8 +21,7 @@ from ampel.content.StockDocument import StockDocument
 from ampel.content.DataPoint import DataPoint
 from ampel.content.T1Document import T1Document
 from ampel.content.T2Document import T2Document
-from ampel.base.BadConfig import BadConfig
-from ampel.log import AmpelLogger
+from ampel.log import AmpelLogger, VERBOSE
 from ampel.log.utils import convert_dollars
 from ampel.log.utils import report_exception, report_error
 from ampel.abstract.AbsStockT2Unit import AbsStockT2Unit
@@ -35,11 +34,15 @@ from ampel.abstract.AbsTiedStateT2Unit import AbsTiedStateT2Unit
 from ampel.abstract.AbsTiedStockT2Unit import AbsTiedStockT2Unit
 from ampel.abstract.AbsTiedCustomStateT2Unit import AbsTiedCustomStateT2Unit, U
 from ampel.abstract.AbsWorker import AbsWorker, register_stats
-from ampel.model.UnitModel import UnitModel
-from ampel.model.StateT2Dependency import StateT2Dependency
-from ampel.mongo.utils import maybe_match_array
+from ampel.core.EventHandler import EventHandler
+from ampel.metrics.AmpelMetricsRegistry import AmpelMetricsRegistry
 from ampel.mongo.update.MongoStockUpdater import MongoStockUpdater
 from ampel.view.T2DocView import T2DocView
+from ampel.t2.T2StateCache import T2StateCache
+from ampel.t2.T2DependencyPlanner import T2DependencyPlanner
+from ampel.t2.isolation import run_unit, get_unit_init_config, to_log_record, time_limit
+from ampel.util.concurrent import ReusableProcess, TimeBudgetExceeded
+from ampel.util.compact import decode_arrays
 
 AbsT2 = Union[
 	AbsStockT2Unit, AbsPointT2Unit, AbsStateT2Unit, AbsTiedPointT2Unit,
@@ -53,6 +56,17 @@ abs_t2 = (
 
 stat_latency, stat_count = register_stats(tier=2)
 
+#: Code of T2 documents whose unit exceeded its time budget (not yet part of DocumentCode).
+#: Included in the default code_match of T2Worker: such documents are retried up to max_try times.
+T2_UNIT_TIMEOUT = -2010
+
+stat_state_cache = AmpelMetricsRegistry.counter(
+	'state_cache_lookups',
+	'Number of lookups in the custom state cache',
+	subsystem='t2',
+	labelnames=('result', )
+)
+
 
 class T2Worker(AbsWorker[T2Document]):
 	"""
@@ -65,12 +79,84 @@ class T2Worker(AbsWorker[T2Document]):
 		DocumentCode.NEW,
 		DocumentCode.RERUN_REQUESTED,
 		DocumentCode.T2_NEW_PRIO,
-		DocumentCode.T2_PENDING_DEPENDENCY
+		DocumentCode.T2_PENDING_DEPENDENCY,
+		T2_UNIT_TIMEOUT
 	]
 
 	run_dependent_t2s: bool = True
+
+	#: T2 documents whose dependencies are still pending are not claimed again
+	#: before other documents were processed (rather than being re-polled immediately)
+	defer_pending_dependency: bool = True
+
+	#: max number of objects (ex: LightCurve instances) built by custom state units
+	#: to be cached during a run. Units sharing the same build implementation and
+	#: processing the same state will then share a single (read-only) instance.
+	#: A value of 0 disables caching.
+	state_cache_size: int = 0
+
+	#: Wall-clock time budget in seconds per unit execution. Key: unit name.
+	#: Units exceeding their budget are interrupted and the associated document gets the code T2_UNIT_TIMEOUT.
+	#: Note that non-isolated units can only be interrupted while executing python code
+	#: (a unit blocked in a C extension is only interruptible if isolated)
+	unit_timeout: dict[str, float] = {}
+
+	#: Time budget for units not listed in unit_timeout (None: unlimited)
+	default_unit_timeout: None | float = None
+
+	#: Units to be executed in a reusable child process (which is killed and respawned
+	#: when the unit time budget is exceeded). The process is kept across runs and stopped
+	#: upon worker termination (SIGTERM/SIGINT) or close(). Input documents and results must be pickleable.
+	#: Units cannot access secrets or the database from the child process.
+	isolated_units: list[str] = []
+
 	tier: ClassVar[Literal[2]] = 2
 
+
+	def __init__(self, **kwargs) -> None:
+
+		super().__init__(**kwargs)
+
+		self._state_cache: None | T2StateCache = (
+			T2StateCache(self.state_cache_size) if self.state_cache_size > 0 else None
+		)
+
+		self._dep_planner = T2DependencyPlanner(self.context.config)
+		self._isolated_proc: None | ReusableProcess = None
+
+
+	def __del__(self) -> None:
+		self.close()
+
+
+	def close(self) -> None:
+		""" Stops the process running isolated units (if any) """
+		if getattr(self, '_isolated_proc', None) is not None:
+			self._isolated_proc.stop() # type: ignore[union-attr]
+			self._isolated_proc = None
+
+
+	def on_run_end(self, event_hdlr: EventHandler, logger: AmpelLogger) -> None:
+
+		# The isolated process (and the unit instances it caches) is kept across runs,
+		# unless the worker is shutting down (SIGTERM/SIGINT)
+		if not self._run:
+			self.close()
+
+		if self._state_cache is None:
+			return
+
+		stats = self._state_cache.get_stats()
+		stat_state_cache.labels('hit').inc(stats['hits'])
+		stat_state_cache.labels('miss').inc(stats['misses'])
+		event_hdlr.add_extra(overwrite=True, state_cache=stats)
+
+		if logger.verbose:
+			logger.log(VERBOSE, 'Custom state cache stats', extra=stats)
+
+		self._state_cache.clear()
+
+
 	def process_doc(self,
 		doc: T2Document,
 		stock_updr: MongoStockUpdater,
@@ -89,6 +175,12 @@ class T2Worker(AbsWorker[T2Document]):
 		else:
 			ret = UnitResult(code=DocumentCode.TOO_MANY_TRIALS)
 
+		if isinstance(ret, UnitResult) and (
+			ret.code == T2_UNIT_TIMEOUT or
+			(self.defer_pending_dependency and ret.code == DocumentCode.T2_PENDING_DEPENDENCY)
+		):
+			self.defer(doc)
+
 		# Used as timestamp and to compute duration below (using before_run)
 		now = time()
 
@@ -176,7 +268,7 @@ class T2Worker(AbsWorker[T2Document]):
 			meta['code'] = code
 			self.commit_update(
 				{'_id': doc['_id']}, # type: ignore[typeddict-item]
-				meta, logger, body=body, tag=tag, code=code
+				meta, logger, body=body, tag=tag, code=code, doc=doc
 			)
 
 			# Update stock document
@@ -235,6 +327,12 @@ class T2Worker(AbsWorker[T2Document]):
 				AbsTiedCustomStateT2Unit
 			)
 		):
+
+			# Built state possibly available from another unit sharing the same build implementation
+			if self._state_cache is not None and isinstance(t2_unit, AbsCustomStateT2Unit):
+				if (state := self._state_cache.get(type(t2_unit).build, t2_doc['link'])) is not None:
+					return (state, )
+
 			dps: list[DataPoint] = []
 			t1_doc: None | T1Document = next(self.col_t1.find({'link': t2_doc['link']}), None)
 
@@ -280,46 +378,10 @@ class T2Worker(AbsWorker[T2Document]):
 
 			if isinstance(t2_unit, AbsTiedT2Unit):
 
-				queries: list[dict[str, Any]] = []
-
-				if isinstance(t2_unit, AbsTiedCustomStateT2Unit):
-					# A LightCurve instance for example
-					custom_state = t2_unit.build(t1_doc, dps)
-
-				for tied_model in t2_unit.t2_dependency:
-
-					d = self.build_tied_t2_query(t2_unit, tied_model, t2_doc)
-					if d['link'] is None:
-
-						if isinstance(tied_model, StateT2Dependency) and tied_model.link_override:
-
-							filtr, sort, slc = tied_model.link_override.tools()
-							l = dps
-
-							if filtr:
-								l = filtr.apply(l)
-
-							# Sort (ex: by body.jd)
-							if sort:
-								l = sort(l)
-
-							# Slice (ex: first datapoint)
-							if slc:
-								l = l[slc]
-
-							d['link'] = maybe_match_array([el['id'] for el in l])
-
-							if logger.verbose > 1:
-								logger.debug(
-									f"link_override resulting matching criteria: {d['link']}",
-									extra={'unit': t2_doc['unit'], 'stock': t2_doc['stock']}
-								)
-						else:
-							d['link'] = maybe_match_array(t1_dps_ids)
-
-					queries.append(d)
-
-				qres = self.run_tied_queries(queries, t2_doc, stock_updr, logger)
+				qres = self.run_tied_query(
+					self._dep_planner.build_query(t2_unit, t2_doc, logger, dps),
+					t2_doc, stock_updr, logger
+				)
 
 				# Dependency missing
 				if isinstance(qres, UnitResult):
@@ -328,16 +390,22 @@ class T2Worker(AbsWorker[T2Document]):
 				if isinstance(t2_unit, AbsTiedStateT2Unit):
 					return t1_doc, dps, qres
 
-				# instance of AbsTiedCustomStateT2Unit
-				return custom_state, qres
+				# Custom state is a LightCurve instance for example
+				if isinstance(t2_unit, AbsTiedCustomStateT2Unit):
+					custom_state = None
+					if self._state_cache is not None:
+						custom_state = self._state_cache.get(type(t2_unit).build, t2_doc['link'])
+					if custom_state is None:
+						custom_state = self.build_state(t2_unit, t1_doc, dps, t2_doc)
+					return custom_state, qres
 
 			else:
 
 				if isinstance(t2_unit, AbsStateT2Unit):
 					return t1_doc, dps
 
-				else: # instance of AbsCustomStateT2Unit
-					return (t2_unit.build(t1_doc, dps), )
+				if isinstance(t2_unit, AbsCustomStateT2Unit):
+					return (self.build_state(t2_unit, t1_doc, dps, t2_doc), )
 
 		elif isinstance(t2_unit, AbsStockT2Unit):
 
@@ -354,11 +422,8 @@ class T2Worker(AbsWorker[T2Document]):
 			if doc := next(self.col_t0.find({'id': t2_doc['link']}), None):
 				if isinstance(t2_unit, AbsTiedPointT2Unit):
 
-					qres = self.run_tied_queries(
-						[
-							self.build_tied_t2_query(t2_unit, tied_model, t2_doc)
-							for tied_model in t2_unit.t2_dependency
-						],
+					qres = self.run_tied_query(
+						self._dep_planner.build_query(t2_unit, t2_doc, logger),
 						t2_doc, stock_updr, logger
 					)
 
@@ -384,151 +449,110 @@ class T2Worker(AbsWorker[T2Document]):
 		return None
 
 
-	def run_tied_queries(self,
-		queries: list[dict[str, Any]],
-		t2_doc: T2Document,
-		stock_updr: MongoStockUpdater,
-		logger: AmpelLogger
-	) -> UnitResult | list[T2DocView]:
-
-		t2_views: list[T2DocView] = []
-
-		for query in queries:
-
-			if self.run_dependent_t2s:
-
-				processed_ids: list[ObjectId] = []
-
-				# run pending dependencies
-				while (
-					dep_t2_doc := self.col.find_one_and_update(
-						{
-							'code': self.code_match if isinstance(self.code_match, DocumentCode)
-							else maybe_match_array(self.code_match) # type: ignore[arg-type]
-						} | query,
-						{'$set': {'code': DocumentCode.RUNNING}}
-					)
-				):
-
-					if logger.verbose > 1:
-						logger.debug(
-							'Processing tied t2 docs',
-							extra={'unit': dep_t2_doc['unit'], 'stock': dep_t2_doc['stock']}
-						)
-
-					if not dep_t2_doc.get('body'):
-						dep_t2_doc['body'] = []
-
-					body, code = self.process_doc(dep_t2_doc, stock_updr, logger)
-					dep_t2_doc['body'].append(body)
-					dep_t2_doc['meta'].append({'code': code, 'tier': 2})
-
-					# suppress channel info
-					dep_t2_doc.pop('channel')
-					t2_views.append(T2DocView.of(dep_t2_doc, self.context.config))
-					processed_ids.append(dep_t2_doc['_id'])
-
-				if len(processed_ids) > 0:
-					query['_id'] = {'$nin': processed_ids}
-
-			if logger.verbose > 1:
-				logger.debug(
-					'Running tied t2 query',
-					extra={
-						'unit': t2_doc['unit'],
-						'stock': t2_doc['stock'],
-						'query': convert_dollars(query)
-					}
-				)
-
-			# collect dependencies
-			for dep_t2_doc in self.col.find(query):
-				# suppress channel info
-				dep_t2_doc.pop('channel')
-				t2_views.append(T2DocView.of(dep_t2_doc, self.context.config))
+	def build_state(self,
+		t2_unit: AbsCustomStateT2Unit[T] | AbsTiedCustomStateT2Unit[T, U],
+		t1_doc: T1Document, dps: Sequence[DataPoint], t2_doc: T2Document
+	) -> T:
+		"""
+		Builds the custom state required by the provided unit and
+		adds it to the run-bound state cache if enabled
+		"""
 
-			for view in t2_views:
-				if view.get_payload() is None:
-					if logger.verbose > 1:
-						logger.debug(
-							'Dependent T2 unit not run yet',
-							extra={
-								'unit': dep_t2_doc['unit'],
-								'stock': dep_t2_doc['stock'],
-								't2_oid': t2_doc['_id'] # type: ignore[typeddict-item] # implicit mongodb dependency here
-							}
-						)
-					return UnitResult(code=DocumentCode.T2_PENDING_DEPENDENCY)
+		state = t2_unit.build(t1_doc, dps)
 
-		if not t2_views:
-			return UnitResult(code=DocumentCode.T2_MISSING_DEPENDENCY)
+		if self._state_cache is not None:
+			self._state_cache.add(type(t2_unit).build, t2_doc['link'], state)
 
-		return t2_views
+		return state
 
 
-	def build_tied_t2_query(self,
-		t2_unit: AbsT2, tied_model: UnitModel, t2_doc: T2Document
-	) -> dict[str, Any]:
+	def run_tied_query(self,
+		query: None | dict[str, Any],
+		t2_doc: T2Document,
+		stock_updr: MongoStockUpdater,
+		logger: AmpelLogger
+	) -> UnitResult | list[T2DocView]:
 		"""
-		This method handles 'default' situations.
-		Callers must check returned 'link'.
-		If None (state t2 linked with point t2), further handling is required
-
-		:raises:
-			- ValueError if functionality is not implemented yet
-			- BadConfig if what's requested is not possible (a point T2 cannot be linked with a state t2)
-	
-		:returns: link value to match or None if further handling is required (state t2 linked with point t2)
+		Gathers the dependencies of a tied t2 doc using a single query,
+		possibly running pending dependencies beforehand (see run_dependent_t2s).
+		:param query: None if the unit declares no dependency (see T2DependencyPlanner.build_query)
 		"""
 
-		t2_unit_info = self.context.config.get(
-			f'unit.{tied_model.unit}', dict
-		)
-
-		if not t2_unit_info:
-			raise ValueError(f'Unknown T2 unit {tied_model.unit}')
-
-		d: dict[str, Any] = {
-			'unit': tied_model.unit,
-			'config': tied_model.config,
-			'channel': {'$in': t2_doc['channel']},
-			'stock': t2_doc['stock'],
-		}
+		if query is None:
+			return UnitResult(code=DocumentCode.T2_MISSING_DEPENDENCY)
 
-		if isinstance(t2_unit, AbsTiedPointT2Unit):
+		t2_views: list[T2DocView] = []
 
-			if 'AbsPointT2Unit' in t2_unit_info['base']:
-				d['link'] = t2_doc['link']
+		if self.run_dependent_t2s:
 
-			elif 'AbsStockT2Unit' in t2_unit_info['base']:
-				raise ValueError('Not implemented yet')
+			processed_ids: list[ObjectId] = []
 
-			else: # State T2
-				raise BadConfig('Tied point T2 cannot be linked with state T2s')
+			# run pending dependencies
+			while (
+				dep_t2_doc := self.col.find_one_and_update(
+					{'code': self.query['code']} | query,
+					{'$set': {'code': DocumentCode.RUNNING}}
+				)
+			):
 
-		elif isinstance(t2_unit, AbsTiedStockT2Unit):
+				if logger.verbose > 1:
+					logger.debug(
+						'Processing tied t2 docs',
+						extra={'unit': dep_t2_doc['unit'], 'stock': dep_t2_doc['stock']}
+					)
 
-			if 'AbsPointT2Unit' in t2_unit_info['base']:
-				raise BadConfig('Tied stock T2 cannot be linked with point T2s')
+				if not dep_t2_doc.get('body'):
+					dep_t2_doc['body'] = []
+				else:
+					dep_t2_doc['body'] = decode_arrays(dep_t2_doc['body'])
 
-			elif 'AbsStockT2Unit' in t2_unit_info['base']:
-				d['link'] = t2_doc['stock']
+				body, code = self.process_doc(dep_t2_doc, stock_updr, logger)
+				dep_t2_doc['body'].append(body)
+				dep_t2_doc['meta'].append({'code': code, 'tier': 2})
 
-			else: # State T2
-				raise BadConfig('Tied stock T2 cannot be linked with state T2s')
+				# suppress channel info
+				dep_t2_doc.pop('channel')
+				t2_views.append(T2DocView.of(dep_t2_doc, self.context.config))
+				processed_ids.append(dep_t2_doc['_id'])
 
-		if isinstance(t2_unit, (AbsTiedStateT2Unit, AbsTiedCustomStateT2Unit)):
+			if len(processed_ids) > 0:
+				query = query | {'_id': {'$nin': processed_ids}}
 
-			if 'AbsPointT2Unit' in t2_unit_info['base']:
-				d['link'] = None # Further checks required (link_override check)
+		if logger.verbose > 1:
+			logger.debug(
+				'Running tied t2 query',
+				extra={
+					'unit': t2_doc['unit'],
+					'stock': t2_doc['stock'],
+					'query': convert_dollars(query)
+				}
+			)
 
-			elif 'AbsStockT2Unit' in t2_unit_info['base']:
-				d['link'] = t2_doc['stock']
+		# collect dependencies
+		for dep_t2_doc in self.col.find(query):
+			# suppress channel info
+			dep_t2_doc.pop('channel')
+			if dep_t2_doc.get('body'):
+				dep_t2_doc['body'] = decode_arrays(dep_t2_doc['body'])
+			t2_views.append(T2DocView.of(dep_t2_doc, self.context.config))
+
+		for view in t2_views:
+			if view.get_payload() is None:
+				if logger.verbose > 1:
+					logger.debug(
+						'Dependent T2 unit not run yet',
+						extra={
+							'unit': view.unit,
+							'stock': view.stock,
+							't2_oid': t2_doc['_id'] # type: ignore[typeddict-item] # implicit mongodb dependency here
+						}
+					)
+				return UnitResult(code=DocumentCode.T2_PENDING_DEPENDENCY)
 
-			else: # State T2
-				d['link'] = t2_doc['link']
+		if not t2_views:
+			return UnitResult(code=DocumentCode.T2_MISSING_DEPENDENCY)
 
-		return d
+		return t2_views
 
 
 	def run_t2_unit(self,
@@ -549,7 +573,33 @@ class T2Worker(AbsWorker[T2Document]):
 
 		try:
 
-			ret = t2_unit.process(*args)
+			budget = self.unit_timeout.get(t2_doc['unit'], self.default_unit_timeout)
+
+			if t2_doc['unit'] in self.isolated_units:
+
+				if self._isolated_proc is None:
+					self._isolated_proc = ReusableProcess(name=f'{self.process_name}.isolated')
+
+				ret, records = self._isolated_proc.call(
+					run_unit,
+					f"{t2_doc['unit']}_{t2_doc['config']}",
+					type(t2_unit).__module__,
+					type(t2_unit).__name__,
+					get_unit_init_config(t2_unit),
+					args,
+					logger.level,
+					self.unit_cache_size,
+					self.unit_cache_ttl,
+					timeout = budget
+				)
+
+				t2_unit._buf_hdlr.buffer.extend( # type: ignore[union-attr]
+					to_log_record(el) for el in records
+				)
+
+			else:
+				with time_limit(budget):
+					ret = t2_unit.process(*args)
 
 			if t2_unit._buf_hdlr.buffer: # type: ignore[union-attr]
 				t2_unit._buf_hdlr.forward( # type: ignore[union-attr]
@@ -558,6 +608,26 @@ class T2Worker(AbsWorker[T2Document]):
 
 			return ret
 
+		except TimeBudgetExceeded as e:
+
+			if t2_unit._buf_hdlr.buffer: # type: ignore[union-attr]
+				t2_unit._buf_hdlr.forward( # type: ignore[union-attr]
+					logger, stock=t2_doc['stock']
+				)
+
+			report_error(
+				self._ampel_db, msg=str(e), logger=logger, info={
+					'_id': t2_doc['_id'], # type: ignore
+					'unit': t2_doc['unit'],
+					'config': t2_doc['config'],
+					'stock': t2_doc['stock'],
+					'link': t2_doc['link'],
+					'channel': t2_doc['channel'],
+				}
+			)
+
+			return UnitResult(code=T2_UNIT_TIMEOUT)
+
 		except Exception as e:
 
 			if self.raise_exc:
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# File:                Ampel-core/ampel/t2/isolation.py
+# License:             BSD-3-Clause
+# Author:              valery brinnel <firstname.lastname@gmail.com>
+# Date:                19.10.2026
+# Last Modified Date:  19.10.2026
+# Last Modified By:    valery brinnel <firstname.lastname@gmail.com>
+
+import signal, threading
+from time import monotonic
+from collections import OrderedDict
+from importlib import import_module
+from contextlib import contextmanager
+from typing import Any
+from collections.abc import Iterator
+
+from ampel.base.LogicalUnit import LogicalUnit
+from ampel.log.AmpelLogger import AmpelLogger
+from ampel.log.LightLogRecord import LightLogRecord
+from ampel.log.handlers.DefaultRecordBufferingHandler import DefaultRecordBufferingHandler
+from ampel.util.concurrent import TimeBudgetExceeded
+
+# Unit instances living in isolated (child) processes (value: instance, buffering handler, creation time)
+_instances: OrderedDict[str, tuple[LogicalUnit, DefaultRecordBufferingHandler, float]] = OrderedDict()
+
+
+def get_unit_init_config(unit: LogicalUnit) -> dict[str, Any]:
+	""" :returns: values required to re-create the provided unit in another process """
+	return {k: getattr(unit, k) for k in unit._annots if k != 'logger' and hasattr(unit, k)}
+
+
+def run_unit(
+	k: str, module: str, name: str, init_config: dict[str, Any],
+	args: tuple, log_level: int, cache_size: int = 128, cache_ttl: None | float = None
+) -> tuple[Any, list[dict[str, Any]]]:
+	"""
+	Executed in isolated processes: instantiates (or re-uses) the unit
+	and runs its process() method with the provided arguments.
+
+	:param k: key identifying the unit instance (unit name and config)
+	:param cache_size: max number of unit instances kept by the process (least recently used are discarded first)
+	:param cache_ttl: max lifetime in seconds of unit instances
+	:returns: unit result and buffered log records (as dicts, records are not pickleable)
+	"""
+
+	if k in _instances and cache_ttl is not None and monotonic() - _instances[k][2] >= cache_ttl:
+		del _instances[k]
+
+	if k not in _instances:
+		buf_hdlr = DefaultRecordBufferingHandler(level=log_level)
+		unit = getattr(import_module(module), name)(
+			# loggers are cached by name: key them by instance and refresh them so that
+			# instances re-created after eviction do not inherit stale handlers
+			logger = AmpelLogger.get_logger(name=k, console=False, handlers=[buf_hdlr], force_refresh=True),
+			**init_config
+		)
+		if hasattr(unit, 'post_init'):
+			unit.post_init()
+		_instances[k] = unit, buf_hdlr, monotonic()
+		while len(_instances) > cache_size:
+			_instances.popitem(last=False)
+
+	_instances.move_to_end(k)
+	unit, buf_hdlr, _ = _instances[k]
+	try:
+		return unit.process(*args), [rec.__dict__ for rec in buf_hdlr.buffer] # type: ignore[attr-defined]
+	finally:
+		buf_hdlr.buffer.clear()
+
+
+def to_log_record(d: dict[str, Any]) -> LightLogRecord:
+	rec = LightLogRecord(name=d['name'], levelno=d['levelno'])
+	rec.__dict__.update(d)
+	return rec
+
+
+@contextmanager
+def time_limit(seconds: None | float) -> Iterator[None]:
+	"""
+	Raises TimeBudgetExceeded in the current (main) thread if the enclosed block does not complete
+	within the given number of seconds. Note that code blocking in C extensions
+	cannot be interrupted this way (use isolated processes instead).
+	No-op if seconds is None or if not called from the main thread.
+	"""
+
+	if seconds is None or threading.current_thread() is not threading.main_thread():
+		yield
+		return
+
+	def handler(signum, frame):
+		raise TimeBudgetExceeded(f"Time budget exceeded ({seconds}s)")
+
+	prev = signal.signal(signal.SIGALRM, handler)
+	signal.setitimer(signal.ITIMER_REAL, seconds)
+	try:
+		yield
+	finally:
+		signal.setitimer(signal.ITIMER_REAL, 0)
+		signal.signal(signal.SIGALRM, prev)
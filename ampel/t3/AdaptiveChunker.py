@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# File:                Ampel-core/ampel/t3/AdaptiveChunker.py
+# License:             BSD-3-Clause
+# Author:              valery brinnel <firstname.lastname@gmail.com>
+# Date:                19.10.2026
+# Last Modified Date:  19.10.2026
+# Last Modified By:    valery brinnel <firstname.lastname@gmail.com>
+
+from bson import encode
+from itertools import islice
+from typing import Literal, TypeVar
+from collections.abc import Generator, Iterable
+from ampel.struct.AmpelBuffer import AmpelBuffer
+
+T = TypeVar('T')
+VolumeUnit = Literal['docs', 'bytes']
+
+
+def get_buffer_volume(ab: AmpelBuffer, unit: VolumeUnit = 'docs') -> int:
+	"""
+	:param unit: 'docs' (number of documents) or 'bytes' (BSON size of documents)
+	:returns: volume of the database documents contained in the provided buffer
+	"""
+
+	docs: list = [ab['stock']] if ab.get('stock') else []
+	for k in ('t0', 't1', 't2', 'logs'):
+		if (l := ab.get(k)):
+			docs.extend(l) # type: ignore[arg-type]
+
+	if unit == 'docs':
+		return len(docs)
+
+	return sum(len(encode(d)) for d in docs)
+
+
+class AdaptiveChunker:
+	"""
+	Splits an iterable into chunks whose size is adjusted to a volume budget.
+	After a chunk is processed, the measured volume (see :func:`update`) is used to
+	estimate the average volume per element and the size of the next chunk is set
+	so that its expected volume matches the budget.
+	Growth is limited to a factor 2 per chunk to avoid oscillations caused by outliers,
+	shrinking is immediate.
+	"""
+
+	def __init__(self, size: int, budget: int, min_size: int = 1, max_size: None | int = None) -> None:
+		"""
+		:param size: size of the first chunk
+		:param budget: targeted volume per chunk
+		:param max_size: maximum chunk size (defaults to the initial size)
+		"""
+		self.size = size
+		self.budget = budget
+		self.min_size = min_size
+		self.max_size = max_size or size
+		self.sizes: list[int] = []
+
+
+	def chunks(self, seq: Iterable[T]) -> Generator[list[T], None, None]:
+		source = iter(seq)
+		while (chunk := list(islice(source, self.size))):
+			self.sizes.append(len(chunk))
+			yield chunk
+
+
+	def update(self, n: int, volume: int) -> None:
+		"""
+		:param n: number of elements in the last chunk
+		:param volume: volume measured for these elements
+		"""
+		if n <= 0 or volume <= 0:
+			return
+
+		target = int(self.budget * n / volume)
+		self.size = max(self.min_size, min(self.max_size, target, 2 * self.size))
+
+
+	def get_report(self) -> list[list[int]]:
+		""" :returns: run-length encoded chunk sizes (ex: [[1000, 3], [412, 1]]) """
+		ret: list[list[int]] = []
+		for s in self.sizes:
+			if ret and ret[-1][0] == s:
+				ret[-1][1] += 1
+			else:
+				ret.append([s, 1])
+		return ret
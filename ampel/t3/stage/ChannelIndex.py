@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# File:                Ampel-core/ampel/t3/stage/ChannelIndex.py
+# License:             BSD-3-Clause
+# Author:              valery brinnel <firstname.lastname@gmail.com>
+# Date:                19.10.2026
+# Last Modified Date:  19.10.2026
+# Last Modified By:    valery brinnel <firstname.lastname@gmail.com>
+
+from typing import Any, cast
+from collections.abc import Iterable, Sequence
+from ampel.types import ChannelId
+from ampel.model.operator.AnyOf import AnyOf
+from ampel.model.operator.AllOf import AllOf
+from ampel.struct.AmpelBuffer import AmpelBuffer, BufferKey
+
+
+class ChannelIndex:
+	"""
+	Channel associations of a chunk of ampel buffers, built once per chunk and shared by
+	channel based filters and projectors (see :class:`~ampel.t3.stage.T3AdaptativeStager.T3AdaptativeStager`):
+
+	- channel -> positions of buffers whose stock document is associated with the channel
+	- channel -> positions of t1/t2 documents (within their buffer) associated with the channel
+	"""
+
+	def __init__(self, buffers: Sequence[AmpelBuffer], keys: Iterable[BufferKey] = ('t1', 't2')) -> None:
+
+		self.buffers = buffers
+		self.stock: dict[ChannelId, list[int]] = {}
+
+		# Key: id of document list, value: (document list, {channel: document positions})
+		self.docs: dict[int, tuple[Sequence[dict[str, Any]], dict[ChannelId, list[int]]]] = {}
+
+		for i, ab in enumerate(buffers):
+
+			if (stock := ab.get('stock')) and (chans := stock.get('channel')):
+				for chan in ((chans, ) if isinstance(chans, (int, str)) else chans):
+					self.stock.setdefault(chan, []).append(i)
+
+			for k in keys:
+				if (docs := cast(None | Sequence[dict[str, Any]], ab.get(k))):
+					positions: dict[ChannelId, list[int]] = {}
+					for j, el in enumerate(docs):
+						if (elchan := el.get('channel')) is None:
+							continue
+						for chan in ((elchan, ) if isinstance(elchan, (int, str)) else elchan):
+							positions.setdefault(chan, []).append(j)
+					self.docs[id(docs)] = docs, positions
+
+
+	def select(self, channel: ChannelId | AnyOf[ChannelId] | AllOf[ChannelId]) -> list[AmpelBuffer]:
+		""" :returns: buffers whose stock document matches the provided channel criteria (in chunk order) """
+
+		if isinstance(channel, (AnyOf, AllOf)):
+			pos: Iterable[int] = sorted(self._match(channel))
+		else:
+			pos = self.stock.get(channel, ())
+
+		return [self.buffers[i] for i in pos]
+
+
+	def _match(self, channel: ChannelId | AnyOf[ChannelId] | AllOf[ChannelId]) -> set[int]:
+		""" :returns: positions of buffers matching the provided channel criteria (AnyOf may contain AllOf) """
+
+		if isinstance(channel, AnyOf):
+			return set().union(*[self._match(el) for el in channel.any_of])
+
+		if isinstance(channel, AllOf):
+			return set.intersection(*[self._match(el) for el in channel.all_of])
+
+		return set(self.stock.get(channel, ()))
+
+
+	def get_doc_positions(self, docs: Sequence[dict[str, Any]], channels: set[ChannelId]) -> None | Sequence[int]:
+		"""
+		:param docs: t1/t2 documents of an indexed buffer
+		:returns: positions of documents associated with any of the provided channels
+		or None if the provided document list is not indexed
+		"""
+
+		if (entry := self.docs.get(id(docs))) is None or entry[0] is not docs:
+			return None
+
+		if len(channels) == 1:
+			return entry[1].get(next(iter(channels)), ())
+
+		return sorted({j for chan in channels for j in entry[1].get(chan, ())})
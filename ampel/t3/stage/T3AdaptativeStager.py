@@ -4,7 +4,7 @@
 # License:             BSD-3-Clause
 # Author:              valery brinnel <firstname.lastname@gmail.com>
 # Date:                06.01.2020
-# Last Modified Date:  09.12.2021
+# Last Modified Date:  19.10.2026
 # Last Modified By:    valery brinnel <firstname.lastname@gmail.com>
 
 from time import time
@@ -26,6 +26,7 @@ from ampel.abstract.AbsT3Filter import AbsT3Filter
 from ampel.abstract.AbsT3Projector import AbsT3Projector
 from ampel.t3.stage.T3ThreadedStager import T3ThreadedStager
 from ampel.t3.stage.T3ProjectingStager import RunBlock
+from ampel.t3.stage.ChannelIndex import ChannelIndex
 from ampel.t3.stage.ThreadedViewGenerator import ThreadedViewGenerator
 
 
@@ -111,6 +112,9 @@ class T3AdaptativeStager(T3ThreadedStager):
 					ell for el in data for ell in el['stock']['channel'] # type: ignore[index]
 				})
 
+				# Channel associations of the chunk, shared by the filters and projectors of all channels
+				index = ChannelIndex(data)
+
 				# step 2: spawn T3UnitRunner instances
 				for chan in channels:
 
@@ -161,6 +165,7 @@ class T3AdaptativeStager(T3ThreadedStager):
 					if self.logger.verbose:
 						self.logger.log(VERBOSE, "Applying run-block filter")
 
+					rb.filter.set_channel_index(index) # type: ignore[union-attr, attr-defined]
 					buffers = rb.filter.filter(buffers) # type: ignore[union-attr]
 
 					if self.save_stock_ids:
@@ -169,10 +174,15 @@ class T3AdaptativeStager(T3ThreadedStager):
 					if self.logger.verbose:
 						self.logger.log(VERBOSE, "Applying run-block projection")
 
+					rb.projector.set_channel_index(index) # type: ignore[union-attr, attr-defined]
 					buffers = rb.projector.project(buffers) # type: ignore[union-attr]
 
 					self.put_views(buffers, rb.qdict)
 
+					# Release chunk
+					rb.filter.set_channel_index(None) # type: ignore[union-attr, attr-defined]
+					rb.projector.set_channel_index(None) # type: ignore[union-attr, attr-defined]
+
 			# Send sentinel all threaded generators
 			for q in self.queues.values():
 				q.put(None) # type: ignore[arg-type]
@@ -4,22 +4,22 @@
 # License:             BSD-3-Clause
 # Author:              valery brinnel <firstname.lastname@gmail.com>
 # Date:                08.12.2021
-# Last Modified Date:  16.01.2022
+# Last Modified Date:  19.10.2026
 # Last Modified By:    valery brinnel <firstname.lastname@gmail.com>
 
 from time import time
+from bson import encode
 from ampel.base.AmpelBaseModel import AmpelBaseModel
-from typing import Any
-from collections.abc import Generator, Sequence
+from typing import Any, cast
+from collections.abc import Callable, Generator, Sequence
 
-from ampel.types import UBson, OneOrMany
+from ampel.types import UBson, OneOrMany, StockId
 from ampel.t3.T3DocBuilder import T3DocBuilder
 from ampel.view.T3Store import T3Store
 from ampel.abstract.AbsT3Stager import AbsT3Stager
 from ampel.struct.AmpelBuffer import AmpelBuffer
 from ampel.content.T3Document import T3Document
 from ampel.content.MetaRecord import MetaRecord
-from ampel.util.mappings import get_by_json_path
 
 
 class TargetModel(AmpelBaseModel):
@@ -29,6 +29,45 @@ class TargetModel(AmpelBaseModel):
 	field: OneOrMany[str]
 
 
+JsonPathGetter = Callable[[Any], None | tuple[str, UBson]]
+
+
+def compile_json_path(path: str, delimiter: str = '.') -> JsonPathGetter:
+	"""
+	Parses the provided path once and returns a getter equivalent to
+	:func:`ampel.util.mappings.get_by_json_path` (bracket notation with number only)
+	"""
+
+	steps: list[tuple[str, None | int]] = []
+	els = path.split(delimiter)
+	star = els[-1] == "*"
+
+	for el in els:
+		if el[-1] == ']':
+			k, idx = el.split("[")
+			steps.append((k, int(idx[:-1])))
+		else:
+			steps.append((el, None))
+
+	def get(d: Any) -> None | tuple[str, UBson]:
+		el = ""
+		try:
+			for el, idx in steps:
+				if idx is not None:
+					d = d[el][idx]
+					continue
+				if el == "*" and star:
+					return "*", d
+				if el not in d:
+					return None
+				d = d[el]
+		except Exception:
+			return None
+		return el, d
+
+	return get
+
+
 class T3AggregatingStager(AbsT3Stager, T3DocBuilder):
 	"""
 	Example:
@@ -94,101 +133,164 @@ class T3AggregatingStager(AbsT3Stager, T3DocBuilder):
 	#: Only applies to doc output
 	split_tiers: bool = False
 
+	#: If set, aggregated results are emitted in multiple t3 documents (shards)
+	#: as soon as the (BSON) size of the accumulated results exceeds this value (in bytes).
+	#: Memory usage is thereby bounded and the 16MB BSON document size limit can be avoided.
+	#: None: a single document containing all results is created after all buffers were processed
+	shard_size: None | int = None
+
+	#: Fields are extracted from each datapoint (ex: "body.magpsf"), the values are aggregated
+	#: per field into lists (one element per datapoint containing the field)
 	t0: None | OneOrMany[TargetModel]
+
+	#: Fields are extracted from the last matching t1 document (ex: "dps" or "body[-1].xyz")
 	t1: None | OneOrMany[TargetModel]
+
+	#: Fields are extracted from the last t2 payload associated with a meta code >= 0 (or with the target code)
 	t2: None | OneOrMany[TargetModel]
 
 
+	def __init__(self, **kwargs) -> None:
+
+		super().__init__(**kwargs)
+
+		# Field paths are parsed only once
+		self._targets: dict[str, list[tuple[TargetModel, list[JsonPathGetter]]]] = {
+			tier: [
+				(model, [compile_json_path(f) for f in ([model.field] if isinstance(model.field, str) else model.field or [])])
+				for model in ([models] if isinstance(models, TargetModel) else models)
+			]
+			for tier, models in (('t0', self.t0), ('t1', self.t1), ('t2', self.t2))
+			if models
+		}
+
+
 	def stage(self,
 		gen: Generator[AmpelBuffer, None, None],
 		t3s: T3Store
 	) -> None | Generator[T3Document, None, None]:
+		return self.aggregate(gen, t3s)
 
-		t0 = [self.t0] if isinstance(self.t0, TargetModel) else self.t0
-		t1 = [self.t1] if isinstance(self.t1, TargetModel) else self.t1
-		t2 = [self.t2] if isinstance(self.t2, TargetModel) else self.t2
 
-		if t0:
-			t0d: dict[str, Any] = {}
-
-		if t1:
-			t1d: dict[str, Any] = {}
+	def aggregate(self,
+		gen: Generator[AmpelBuffer, None, None],
+		t3s: T3Store
+	) -> Generator[T3Document, None, None]:
 
-		if t2:
-			t2d: dict[str, Any] = {}
+		ts = time()
+		out: dict[str, Any] = {}
+		stocks: list[StockId] = []
+		size = 0
+		shard = 0
 
 		for ab in gen:
 
+			entry: dict[str, Any] = {}
+			for tier, targets in self._targets.items():
+				if (d := getattr(self, f'_aggregate_{tier}')(ab, targets)):
+					if self.split_tiers:
+						entry[tier] = d
+					else:
+						entry.update(d)
+
+			if not entry:
+				continue
+
 			sid = str(ab['id'])
+			out[sid] = entry
+			stocks.append(ab['id'])
 
-			if t0:
-				raise NotImplementedError("Please implement")
-
-			if t1:
-				raise NotImplementedError("Please implement")
-
-			if t2:
-				for model in t2:
-					for t2doc in ab.get('t2') or []:
-						if t2doc['unit'] != model.unit:
-							continue
-						if model.code is not None and t2doc['code'] != model.code:
-							continue
-						if body := self.get_t2_payload(t2doc['body'], t2doc['meta'], model.code):
-							if model.field:
-								for f in [model.field] if isinstance(model.field, str) else model.field:
-									if (ret := get_by_json_path(body, f)):
-										if sid not in t2d:
-											t2d[sid] = {}
-										if ret[0] == "*":
-											t2d[sid].update(ret[1])
-										else:
-											t2d[sid][ret[0]] = ret[1]
-							else:
-								t2d[sid].update(ret)
-
-		if t0 and not t1 and not t2:
-			return self._craft(t0d, 't0', t3s)
-
-		if t1 and not t0 and not t2:
-			return self._craft(t1d, 't1', t3s)
-
-		if t2 and not t1 and not t0:
-			return self._craft(t2d, 't2', t3s)
+			if self.shard_size:
+				size += len(encode({sid: entry}))
+				if size >= self.shard_size:
+					yield self._craft(out, stocks, t3s, ts, shard)
+					out = {}
+					stocks = []
+					size = 0
+					shard += 1
 
-		out: dict[str, Any] = {}
+		if out or not self.shard_size:
+			yield self._craft(out, stocks, t3s, ts, shard if self.shard_size else None)
 
-		if t0:
-			self._upd(out, t0d, 't0')
-		if t1:
-			self._upd(out, t1d, 't1')
-		if t2:
-			self._upd(out, t2d, 't2')
 
-		return self._craft(out, '', t3s)
+	def _craft(self,
+		d: dict[str, Any], stocks: list[StockId], t3s: T3Store, ts: float, shard: None | int
+	) -> T3Document:
 
+		t3d = self.craft_t3_doc(self, d, t3s, ts, stocks) # type: ignore[arg-type]
 
-	def _craft(self, d: dict[str, Any], s: str, t3s: T3Store) -> Generator[T3Document, None, None]:
-		yield self.craft_t3_doc(
-			self, # type: ignore
-			{k: {s: v} for k, v in d.items()} if self.split_tiers else d,
-			t3s,
-			time(),
-			[int(el) for el in d.keys()]
-		)
+		# Human readable ids would otherwise collide
+		if shard is not None and isinstance(human_id := t3d.get('_id'), str):
+			t3d['_id'] = f"{human_id} [shard {shard}]"
 
+		return t3d
 
-	def _upd(self, out: dict[str, Any], d: dict[str, Any], s: str) -> None:
 
-		if self.split_tiers:
-			for k, v in d.items():
-				out[k] = {s: v}
-		else:
-			for k, v in d.items():
-				if k in out:
-					out[k].update(v)
+	def _aggregate_t0(self, ab: AmpelBuffer, targets: list[tuple[TargetModel, list[JsonPathGetter]]]) -> dict[str, Any]:
+
+		d: dict[str, list[Any]] = {}
+		for dp in ab.get('t0') or []:
+			for model, getters in targets:
+				for get in getters:
+					if (ret := get(dp)):
+						if ret[0] == "*":
+							for k, v in ret[1].items(): # type: ignore[union-attr]
+								d.setdefault(k, []).append(v)
+						else:
+							d.setdefault(ret[0], []).append(ret[1])
+		return d
+
+
+	def _aggregate_t1(self, ab: AmpelBuffer, targets: list[tuple[TargetModel, list[JsonPathGetter]]]) -> dict[str, Any]:
+
+		d: dict[str, Any] = {}
+		for model, getters in targets:
+
+			t1doc = None
+			for el in ab.get('t1') or []:
+				if model.unit is not None and el.get('unit') != model.unit:
+					continue
+				if model.config is not None and el.get('config') != model.config:
+					continue
+				if model.code is not None and el.get('code') != model.code:
+					continue
+				t1doc = el
+
+			if t1doc is not None:
+				self._collect(d, t1doc, getters)
+
+		return d
+
+
+	def _aggregate_t2(self, ab: AmpelBuffer, targets: list[tuple[TargetModel, list[JsonPathGetter]]]) -> dict[str, Any]:
+
+		d: dict[str, Any] = {}
+		for model, getters in targets:
+			for t2doc in ab.get('t2') or []:
+				if t2doc['unit'] != model.unit:
+					continue
+				if model.code is not None and t2doc['code'] != model.code:
+					continue
+				if body := self.get_t2_payload(t2doc['body'], t2doc['meta'], model.code):
+					self._collect(d, body, getters)
+
+		return d
+
+
+	@staticmethod
+	def _collect(d: dict[str, Any], doc: Any, getters: list[JsonPathGetter]) -> None:
+
+		if not getters:
+			d.update(doc)
+			return
+
+		for get in getters:
+			if (ret := get(doc)):
+				if ret[0] == "*":
+					# Wildcard getters return the dict to merge
+					d.update(cast(dict[str, Any], ret[1]))
 				else:
-					out[k] = v
+					d[ret[0]] = ret[1]
 
 
 	def get_t2_payload(self,
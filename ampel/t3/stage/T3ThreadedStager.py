@@ -4,13 +4,14 @@
 # License:             BSD-3-Clause
 # Author:              valery brinnel <firstname.lastname@gmail.com>
 # Date:                17.04.2021
-# Last Modified Date:  14.12.2021
+# Last Modified Date:  19.10.2026
 # Last Modified By:    valery brinnel <firstname.lastname@gmail.com>
 
 from time import time
 from itertools import islice
 from multiprocessing import JoinableQueue
 from multiprocessing.pool import ThreadPool, AsyncResult
+from typing import Literal
 from collections.abc import Generator, Iterable
 
 from ampel.abstract.AbsT3ReviewUnit import AbsT3ReviewUnit
@@ -19,6 +20,8 @@ from ampel.view.T3Store import T3Store
 from ampel.content.T3Document import T3Document
 from ampel.struct.AmpelBuffer import AmpelBuffer
 from ampel.t3.stage.T3BaseStager import T3BaseStager
+from ampel.t3.AdaptiveChunker import AdaptiveChunker, get_buffer_volume
+from ampel.t3.stage.ViewBacking import ViewBacking, get_lazy_view_type
 from ampel.t3.stage.ThreadedViewGenerator import ThreadedViewGenerator
 
 
@@ -42,6 +45,19 @@ class T3ThreadedStager(T3BaseStager, abstract=True):
 	                         time
 	"""
 
+	#: Targeted volume of the buffers staged per chunk (number of documents or BSON bytes,
+	#: see chunk_budget_unit). If set, chunk sizes are adapted toward this budget,
+	#: chunk_size being the initial and maximum size.
+	#: Chunk sizes are reported in the event document (key 'stager_chunk_sizes').
+	chunk_budget: None | int = None
+	chunk_budget_unit: Literal['docs', 'bytes'] = 'docs'
+
+	#: Provide lazily materialized views to t3 units: buffer content is frozen on first access
+	#: and shared by all views of a given buffer (also in paranoia mode, since the content is immutable).
+	#: View creation cost thereby scales with what units actually access.
+	#: Views types customizing their creation (overriden method 'of') are created eagerly.
+	lazy_views: bool = False
+
 
 	def proceed_threaded(self,
 		t3_units: list[AbsT3ReviewUnit],
@@ -72,9 +88,16 @@ class T3ThreadedStager(T3BaseStager, abstract=True):
 
 				qv = queues.values()
 
+				chunker = AdaptiveChunker(self.chunk_size, self.chunk_budget) \
+					if self.chunk_budget and self.chunk_size else None
+				chunks = chunker.chunks(buf_gen) if chunker else None
+
 				try:
 				
-					while (buffers := list(islice(buf_gen, self.chunk_size)) if self.chunk_size else buf_gen):
+					while (
+						buffers := next(chunks, None) if chunks else
+						(list(islice(buf_gen, self.chunk_size)) if self.chunk_size else buf_gen)
+					):
 
 						self.put_views(buffers, qdict)
 
@@ -83,6 +106,12 @@ class T3ThreadedStager(T3BaseStager, abstract=True):
 						for q in qv:
 							q.join()
 
+						if chunker:
+							chunker.update(
+								len(buffers), # type: ignore[arg-type]
+								sum(get_buffer_volume(ab, self.chunk_budget_unit) for ab in buffers)
+							)
+
 					# Send sentinel to threaded view generators
 					for q in qv:
 						q.put(None) # type: ignore[arg-type]
@@ -100,6 +129,10 @@ class T3ThreadedStager(T3BaseStager, abstract=True):
 						return None
 					raise e
 
+				finally:
+					if chunker:
+						self.event_hdlr.add_extra(overwrite=True, stager_chunk_sizes=chunker.get_report())
+
 			self.flush(t3_units)
 
 		except Exception as e:
@@ -150,6 +183,10 @@ class T3ThreadedStager(T3BaseStager, abstract=True):
 
 		conf = self.context.config
 
+		if self.lazy_views:
+			self.put_lazy_views(buffers, qdict)
+			return
+
 		# Simple case: all t3 units are associated with the same type of view
 		if len(qdict) == 1:
 
@@ -187,3 +224,34 @@ class T3ThreadedStager(T3BaseStager, abstract=True):
 						view = View.of(ab, conf)
 						for q in qs:
 							q.put(view)
+
+
+	def put_lazy_views(self, buffers: Iterable[AmpelBuffer], qdict: dict[type[SnapView], list[JoinableQueue]]) -> None:
+
+		conf = self.context.config
+		paranoia = self.paranoia_level
+		vtypes = [(View, get_lazy_view_type(View), qs) for View, qs in qdict.items()]
+
+		for ab in buffers:
+
+			backing = ViewBacking(ab, conf)
+
+			for View, LazyView, qs in vtypes:
+
+				if LazyView is None:
+					if paranoia:
+						for q in qs:
+							q.put(View.of(ab, conf))
+					else:
+						v = View.of(ab, conf)
+						for q in qs:
+							q.put(v)
+
+				elif paranoia:
+					for q in qs:
+						q.put(LazyView.of_backing(backing)) # type: ignore[attr-defined]
+
+				else:
+					v = LazyView.of_backing(backing) # type: ignore[attr-defined]
+					for q in qs:
+						q.put(v)
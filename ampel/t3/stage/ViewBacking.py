@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# File:                Ampel-core/ampel/t3/stage/ViewBacking.py
+# License:             BSD-3-Clause
+# Author:              valery brinnel <firstname.lastname@gmail.com>
+# Date:                19.10.2026
+# Last Modified Date:  19.10.2026
+# Last Modified By:    valery brinnel <firstname.lastname@gmail.com>
+
+from typing import Any, cast
+from collections.abc import Iterable
+from ampel.config.AmpelConfig import AmpelConfig
+from ampel.struct.AmpelBuffer import AmpelBuffer
+from ampel.view.SnapView import SnapView
+from ampel.view.T2DocView import T2DocView
+from ampel.util.freeze import recursive_freeze as rf
+
+# Lazily materialized view attributes
+lazy_keys = ('stock', 't0', 't1', 't2', 'logs', 'extra')
+
+# Key: view class, value: associated lazy view class (None if unsupported)
+_lazy_types: dict[type[SnapView], None | type[SnapView]] = {}
+
+
+class ViewBacking:
+	"""
+	Immutable content of an ampel buffer shared by all (lazy) views created from this buffer,
+	regardless of their type or of the number of t3 units they are provided to.
+	Elements are frozen the first time they are accessed by a view.
+	"""
+
+	__slots__ = 'ab', 'conf', 'cache'
+
+
+	def __init__(self, ab: AmpelBuffer, conf: None | AmpelConfig = None) -> None:
+		self.ab = ab
+		self.conf = conf
+		self.cache: dict[str, Any] = {}
+
+
+	def get(self, k: str) -> Any:
+
+		# NB: concurrent first accesses from different threads might freeze an element twice (harmless)
+		if k not in self.cache:
+
+			if not (v := self.ab.get(k)):
+				self.cache[k] = None
+			elif k in ('stock', 'extra'):
+				self.cache[k] = rf(v)
+			# t0, t1, t2, logs: document sequences
+			elif k == 't2':
+				self.cache[k] = tuple(T2DocView.of(rf(el), self.conf) for el in cast(Iterable[Any], v))
+			else:
+				self.cache[k] = tuple(rf(el) for el in cast(Iterable[Any], v))
+
+		return self.cache[k]
+
+
+def _lazy_attr(k: str) -> property:
+	return property(lambda self: self._backing.get(k))
+
+
+def _reduce(self):
+	# Unpickled as regular (eager) view
+	return (
+		self._View,
+		(self.id, self.stock, self.origin, self.t0, self.t1, self.t2, self.logs, self.extra)
+	)
+
+
+def _of_backing(cls, backing: ViewBacking) -> SnapView:
+	view = object.__new__(cls)
+	sa = object.__setattr__
+	sa(view, 'id', backing.ab['id'])
+	sa(view, 'origin', backing.ab.get('origin'))
+	sa(view, '_backing', backing)
+	return view
+
+
+def get_lazy_view_type(View: type[SnapView]) -> None | type[SnapView]:
+	"""
+	:returns: a subclass of the provided view class whose content (stock, t0, t1, t2, logs, extra)
+	is built on first access from a :class:`ViewBacking` (create instances with cls.of_backing(backing)),
+	or None if the provided view class customizes view creation (method 'of' overriden).
+	"""
+
+	if View not in _lazy_types:
+
+		if View.of.__func__ is not SnapView.of.__func__: # type: ignore[attr-defined]
+			_lazy_types[View] = None
+		else:
+			_lazy_types[View] = type(
+				f'Lazy{View.__name__}',
+				(View, ),
+				{
+					'__slots__': ('_backing', ),
+					'_View': View,
+					'__reduce__': _reduce,
+					'of_backing': classmethod(_of_backing),
+					**{k: _lazy_attr(k) for k in lazy_keys}
+				}
+			)
+
+	return _lazy_types[View]
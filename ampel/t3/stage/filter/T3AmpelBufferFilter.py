@@ -4,7 +4,7 @@
 # License:             BSD-3-Clause
 # Author:              valery brinnel <firstname.lastname@gmail.com>
 # Date:                14.01.2020
-# Last Modified Date:  18.06.2020
+# Last Modified Date:  19.10.2026
 # Last Modified By:    valery brinnel <firstname.lastname@gmail.com>
 
 import collections
@@ -21,6 +21,7 @@ from ampel.core.UnitLoader import UnitLoader
 from ampel.log.AmpelLogger import AmpelLogger
 from ampel.abstract.AbsT3Filter import AbsT3Filter
 from ampel.aux.filter.AbsLogicOperatorFilter import AbsLogicOperatorFilter
+from ampel.t3.stage.ChannelIndex import ChannelIndex
 
 
 channel_id = get_args(ChannelId) # type: ignore[misc]
@@ -57,6 +58,7 @@ class T3AmpelBufferFilter(AbsT3Filter):
 
 		super().__init__(**kwargs)
 		self.filter_blocks: list[FilterBlock] = []
+		self._index: None | ChannelIndex = None
 
 		for f in self.filters:
 
@@ -69,6 +71,14 @@ class T3AmpelBufferFilter(AbsT3Filter):
 			)
 
 
+	def set_channel_index(self, index: None | ChannelIndex) -> None:
+		"""
+		:param index: channel index of the buffers to filter next,
+		used to select buffers by channel through index lookups
+		"""
+		self._index = index
+
+
 	def filter(self, it: Iterable[AmpelBuffer]) -> Sequence[AmpelBuffer]:
 
 		debug = self.logger.verbose > 1
@@ -76,7 +86,11 @@ class T3AmpelBufferFilter(AbsT3Filter):
 
 		if self.channel:
 
-			if isinstance(self.channel, channel_id):
+			index = self._index
+			if index is not None and index.buffers is it and not isinstance(self.channel, OneOf):
+				ret = index.select(self.channel) # type: ignore[arg-type]
+
+			elif isinstance(self.channel, channel_id):
 				ret = [
 					ab for ab in it
 					if ab['stock']['channel'] == self.channel or # type: ignore
@@ -4,8 +4,8 @@
 # License:             BSD-3-Clause
 # Author:              valery brinnel <firstname.lastname@gmail.com>
 # Date:                07.01.2020
-# Last Modified Date:  22.11.2020
-# Last Modified By:    Jakob van Santen <jakob.van.santen@desy.de>
+# Last Modified Date:  19.10.2026
+# Last Modified By:    valery brinnel <firstname.lastname@gmail.com>
 
 from typing import Any
 from collections.abc import Sequence
@@ -16,6 +16,7 @@ from ampel.model.operator.AllOf import AllOf
 from ampel.model.operator.AnyOf import AnyOf
 from ampel.model.operator.OneOf import OneOf
 from ampel.aux.ComboDictModifier import ComboDictModifier
+from ampel.t3.stage.ChannelIndex import ChannelIndex
 from ampel.t3.stage.project.T3BaseProjector import T3BaseProjector
 
 
@@ -45,6 +46,7 @@ class T3ChannelProjector(T3BaseProjector):
 		if self.verbose:
 			self.logger.log(VERBOSE, f"Setting up channel project for '{self.channel}'")
 		self._channel_set: set[ChannelId] = reduce_to_set(self.channel)
+		self._index: None | ChannelIndex = None
 
 		journal_modifier = ComboDictModifier(
 			logger = self.logger,
@@ -65,6 +67,14 @@ class T3ChannelProjector(T3BaseProjector):
 			self.add_func_projector(key, self.channel_projection, first=True) # type: ignore
 
 
+	def set_channel_index(self, index: None | ChannelIndex) -> None:
+		"""
+		:param index: channel index of the chunk the buffers to project next originate from,
+		used to retrieve t1/t2 documents associated with the channel without scanning all documents
+		"""
+		self._index = index
+
+
 	def overwrite_root_channel(self, v: Sequence[ChannelId]) -> None | Sequence[ChannelId]:
 		if subset := list(self._channel_set.intersection(v)):
 			return subset
@@ -85,6 +95,9 @@ class T3ChannelProjector(T3BaseProjector):
 		if not dicts:
 			return []
 
+		if self._index is not None and (pos := self._index.get_doc_positions(dicts, channel_set)) is not None:
+			dicts = [dicts[i] for i in pos]
+
 		for el in dicts:
 			if elchan := el.get('channel'):
 				if isinstance(elchan, (str, int)):
@@ -4,14 +4,18 @@
 # License:             BSD-3-Clause
 # Author:              valery brinnel <firstname.lastname@gmail.com>
 # Date:                15.07.2021
-# Last Modified Date:  15.07.2021
+# Last Modified Date:  19.10.2026
 # Last Modified By:    valery brinnel <firstname.lastname@gmail.com>
 
 from typing import Any
-from collections.abc import Generator
+from itertools import groupby
+from collections.abc import Generator, Iterator
+from pymongo.cursor import Cursor
 from ampel.abstract.AbsT3Supplier import AbsT3Supplier
 from ampel.struct.AmpelBuffer import AmpelBuffer
 from ampel.log.utils import safe_query_dict
+from ampel.util.collections import chunks
+from ampel.util.compact import decode_arrays
 from ampel.view.T3Store import T3Store
 
 
@@ -22,6 +26,16 @@ class SimpleT2BasedSupplier(AbsT3Supplier):
 	#: minimum # of t2 docs per stock (useful in combination with $or queries)
 	min_docs: None | int
 
+	#: Sort t2 docs by stock (index-backed) and yield each buffer as soon as all docs of
+	#: the stock were retrieved, rather than gathering all buffers in memory first
+	stream: bool = False
+
+	#: In streaming mode, if the query selects stocks using {'stock': {'$in': [...]}},
+	#: split the id list into chunks of this size, each chunk being retrieved by a distinct query.
+	#: 0: no chunking
+	in_chunk_size: int = 0
+
+
 	def supply(self, t3s: T3Store) -> Generator[AmpelBuffer, None, None]:
 
 		if self.logger.verbose > 1: # log query parameters
@@ -32,11 +46,16 @@ class SimpleT2BasedSupplier(AbsT3Supplier):
 				}
 			)
 
+		if self.stream:
+			yield from self.supply_stream()
+			return
+
 		# Retrieve pymongo cursor
 		col = self.context.db.get_collection("t2")
 
 		d: dict[int, AmpelBuffer] = {}
 		for el in col.find(self.query):
+			self.decode_body(el)
 			if el['stock'] in d:
 				d[el['stock']]['t2'].append(el) # type: ignore
 			else:
@@ -53,3 +72,35 @@ class SimpleT2BasedSupplier(AbsT3Supplier):
 		else:
 			for ab in d.values():
 				yield ab
+
+
+	def supply_stream(self) -> Generator[AmpelBuffer, None, None]:
+
+		md = self.min_docs or 0
+		for cursor in self.get_cursors():
+			for stock, docs in groupby(cursor, key=lambda el: el['stock']):
+				t2 = list(docs)
+				for el in t2:
+					self.decode_body(el)
+				if len(t2) >= md:
+					yield AmpelBuffer(id=stock, t2=t2)
+
+
+	@staticmethod
+	def decode_body(doc: dict[str, Any]) -> None:
+		""" Decodes arrays of result bodies stored as compact binaries (see AbsWorker.compact_arrays) """
+		if 'body' in doc:
+			doc['body'] = decode_arrays(doc['body'])
+
+
+	def get_cursors(self) -> Iterator[Cursor]:
+		""" :returns: cursor(s) of t2 docs sorted by stock """
+
+		col = self.context.db.get_collection("t2")
+		stock = self.query.get('stock')
+
+		if self.in_chunk_size > 0 and isinstance(stock, dict) and stock.keys() == {'$in'}:
+			for ids in chunks(stock['$in'], self.in_chunk_size):
+				yield col.find(self.query | {'stock': {'$in': ids}}).sort('stock', 1)
+		else:
+			yield col.find(self.query).sort('stock', 1)
@@ -7,12 +7,17 @@
 # Last Modified Date:  13.12.2021
 # Last Modified By:    valery brinnel <firstname.lastname@gmail.com>
 
-from collections.abc import Generator, Sequence
+from itertools import chain
+from queue import Queue, Full
+from threading import Thread, Event
+from typing import Any, Literal
+from collections.abc import Generator, Iterable, Sequence
 from ampel.abstract.AbsT3Supplier import AbsT3Supplier
 from ampel.abstract.AbsT3Selector import AbsT3Selector
 from ampel.abstract.AbsT3Loader import AbsT3Loader
 from ampel.abstract.AbsBufferComplement import AbsBufferComplement
 from ampel.util.collections import chunks as chunks_func
+from ampel.t3.AdaptiveChunker import AdaptiveChunker, get_buffer_volume
 from ampel.struct.AmpelBuffer import AmpelBuffer
 from ampel.model.UnitModel import UnitModel
 from ampel.view.T3Store import T3Store
@@ -38,6 +43,33 @@ class T3DefaultBufferSupplier(AbsT3Supplier[Generator[AmpelBuffer, None, None]])
 	#: number of stocks to load at once. Set to 0 to disable chunking
 	chunk_size: int = 1000
 
+	#: number of chunks loaded and complemented in advance by a background thread,
+	#: so that database access overlaps with the processing of the current chunk by t3 units.
+	#: Memory usage is bounded by roughly (prefetch + 2) * chunk_size buffers
+	#: (prefetched chunks, chunk being loaded, chunk being consumed).
+	#: Set to 0 to disable prefetching.
+	prefetch: int = 0
+
+	#: stream the stock selection page by page (page size: chunk_size) rather than
+	#: retrieving all selected ids upfront. Processing of the first chunk starts immediately
+	#: and memory usage no longer scales with the number of selected stocks.
+	#: Requires chunking (chunk_size > 0).
+	stream_selection: bool = False
+
+	#: Targeted volume of the buffers loaded per chunk (see chunk_budget_unit).
+	#: If set, chunk sizes are adapted after each chunk toward this budget
+	#: based on the measured volume per stock, chunk_size being the initial and maximum size.
+	#: Chunk sizes are reported in the event document (run-length encoded, key 'chunk_sizes').
+	#: Requires chunking (chunk_size > 0).
+	chunk_budget: None | int = None
+
+	#: 'docs': number of documents loaded (stock, datapoints, t1, t2 and log documents),
+	#: 'bytes': BSON size of these documents (more precise but more expensive)
+	chunk_budget_unit: Literal['docs', 'bytes'] = 'docs'
+
+	#: Lower bound of adaptive chunk sizes
+	min_chunk_size: int = 1
+
 
 	def __init__(self, **kwargs) -> None:
 
@@ -86,14 +118,10 @@ class T3DefaultBufferSupplier(AbsT3Supplier[Generator[AmpelBuffer, None, None]])
 		else:
 			self.complementers = None
 
+		self._chunker: None | AdaptiveChunker = None
 
-	def supply(self, t3s: T3Store) -> Generator[AmpelBuffer, None, None]:
 
-		# NB: we consume the entire cursor at once using list() to be robust
-		# against cursor timeouts or server restarts during long lived T3 processes
-		stock_ids = list(self.selector.fetch() or [])
-		if not stock_ids:
-			raise StopIteration
+	def supply(self, t3s: T3Store) -> Generator[AmpelBuffer, None, None]:
 
 		# Usually, id_key is '_id' but it can be 'stock' if the
 		# selection is based on t2 documents for example
@@ -101,24 +129,113 @@ class T3DefaultBufferSupplier(AbsT3Supplier[Generator[AmpelBuffer, None, None]])
 
 		# Run start
 		###########
-		chunks = chunks_func(stock_ids, self.chunk_size) if self.chunk_size > 0 else [stock_ids]
+		if self.stream_selection and self.chunk_size > 0:
+			pages = self.selector.fetch_pages(self.chunk_size)
+			if (first := next(pages, None)) is None:
+				return
+			stock_ids: Iterable[Any] = chain.from_iterable(chain([first], pages))
+
+		else:
+			# NB: we consume the entire cursor at once using list() to be robust
+			# against cursor timeouts or server restarts during long lived T3 processes
+			stock_ids = list(self.selector.fetch() or [])
+			if not stock_ids:
+				return
+
+		if self.chunk_budget and self.chunk_size > 0:
+			self._chunker = AdaptiveChunker(self.chunk_size, self.chunk_budget, self.min_chunk_size)
+			chunks: Iterable[Sequence[Any]] = self._chunker.chunks(stock_ids)
+		elif self.chunk_size > 0:
+			chunks = chunks_func(stock_ids, self.chunk_size)
+		else:
+			chunks = [list(stock_ids)]
 
-		# Loop over chunks from the cursor/iterator
-		for chunk_ids in chunks:
+		try:
 
-			# allow working chunks to complete even if some raise exception
-			try:
+			if self.prefetch > 0:
+				yield from self.supply_prefetched(chunks, id_key, t3s)
+				return
+
+			# Loop over chunks from the cursor/iterator
+			for chunk_ids in chunks:
 
-				# Load info from DB
-				tran_data = self.data_loader.load([sid[id_key] for sid in chunk_ids])
+				# allow working chunks to complete even if some raise exception
+				try:
+					for ampel_buffer in self.load_chunk(chunk_ids, id_key, t3s):
+						yield ampel_buffer
+				except Exception as e:
+					self.event_hdlr.handle_error(e, self.logger)
 
-				# Potentialy add complementary information (spectra, TNS names, ...)
-				if self.complementers:
-					for appender in self.complementers:
-						appender.complement(tran_data, t3s)
+		finally:
+			if self._chunker:
+				self.event_hdlr.add_extra(overwrite=True, chunk_sizes=self._chunker.get_report())
+				self._chunker = None
 
-				for ampel_buffer in tran_data:
-					yield ampel_buffer
 
+	def load_chunk(self, chunk_ids: Sequence[Any], id_key: str, t3s: T3Store) -> Iterable[AmpelBuffer]:
+
+		# Load info from DB
+		tran_data = self.data_loader.load([sid[id_key] for sid in chunk_ids])
+
+		# Adjust size of the next chunk
+		if self._chunker:
+			self._chunker.update(
+				len(chunk_ids),
+				sum(get_buffer_volume(ab, self.chunk_budget_unit) for ab in tran_data)
+			)
+
+		# Potentialy add complementary information (spectra, TNS names, ...)
+		if self.complementers:
+			for appender in self.complementers:
+				appender.complement(tran_data, t3s)
+
+		return tran_data
+
+
+	def supply_prefetched(self,
+		chunks: Iterable[Sequence[Any]], id_key: str, t3s: T3Store
+	) -> Generator[AmpelBuffer, None, None]:
+		"""
+		Chunks are loaded and complemented by a background thread
+		while the buffers of the previous chunk are consumed
+		"""
+
+		q: Queue[None | Exception | Iterable[AmpelBuffer]] = Queue(maxsize=self.prefetch)
+		stop = Event()
+
+		def put(item: None | Exception | Iterable[AmpelBuffer]) -> bool:
+			""" :returns: False if the consumer has stopped """
+			while not stop.is_set():
+				try:
+					q.put(item, timeout=0.1)
+					return True
+				except Full:
+					continue
+			return False
+
+		def produce() -> None:
+			try:
+				for chunk_ids in chunks:
+					try:
+						item: Exception | Iterable[AmpelBuffer] = self.load_chunk(chunk_ids, id_key, t3s)
+					# allow working chunks to complete even if some raise exception
+					except Exception as e:
+						item = e
+					if not put(item):
+						return
 			except Exception as e:
-				self.event_hdlr.handle_error(e, self.logger)
+				put(e)
+			put(None) # sentinel
+
+		producer = Thread(target=produce, name='T3BufferPrefetch', daemon=True)
+		producer.start()
+
+		try:
+			while (item := q.get()) is not None:
+				if isinstance(item, Exception):
+					self.event_hdlr.handle_error(item, self.logger)
+					continue
+				yield from item
+		finally:
+			stop.set()
+			producer.join()
@@ -4,27 +4,30 @@
 # License:             BSD-3-Clause
 # Author:              valery brinnel <firstname.lastname@gmail.com>
 # Date:                17.06.2020
-# Last Modified Date:  14.12.2021
+# Last Modified Date:  19.10.2026
 # Last Modified By:    valery brinnel <firstname.lastname@gmail.com>
 
-from pymongo import MongoClient
-from typing import Optional
-from collections.abc import Iterable
+import shelve
+from typing import cast
+from collections.abc import Iterable, Sequence
 from ampel.types import StockId
 from ampel.aux.filter.SimpleDictArrayFilter import SimpleDictArrayFilter
 from ampel.content.JournalRecord import JournalRecord
+from ampel.content.StockDocument import StockDocument
 from ampel.struct.AmpelBuffer import AmpelBuffer
 from ampel.abstract.AbsBufferComplement import AbsBufferComplement
 from ampel.model.aux.FilterCriterion import FilterCriterion
 from ampel.model.operator.AllOf import AllOf
 from ampel.model.operator.FlatAnyOf import FlatAnyOf
 from ampel.view.T3Store import T3Store
+from ampel.mongo.MongoClientRegistry import MongoClientRegistry
 
 
 class T3ExtJournalAppender(AbsBufferComplement):
 	"""
 	Import journal entries from a 'foreign' database, e.g. one created
 	by a previous version of Ampel.
+	Journals of all buffers of a chunk are retrieved using a single query.
 	"""
 
 	mongo_resource: str = "resource.ext_mongo"
@@ -33,44 +36,99 @@ class T3ExtJournalAppender(AbsBufferComplement):
 	reverse: bool = True
 	filter_config: None | FilterCriterion | FlatAnyOf[FilterCriterion] | AllOf[FilterCriterion] = None
 
+	#: Path of a local persistent cache (shelve file) of the external journals.
+	#: As the foreign database is immutable, cached journals (and the absence thereof)
+	#: never need to be refreshed. None: no caching.
+	cache_path: None | str = None
+
 
 	def __init__(self, **kwargs) -> None:
 
-		super.__init__(**kwargs)
+		super().__init__(**kwargs)
+
+		self.journal_filter: None | SimpleDictArrayFilter[JournalRecord] = \
+			SimpleDictArrayFilter(filters=self.filter_config) if self.filter_config else None
 
-		if self.filter_config:
-			self.journal_filter: SimpleDictArrayFilter[JournalRecord] = SimpleDictArrayFilter(filters=self.filter_config)
+		resource = self.mongo_resource if self.mongo_resource.startswith('resource.') \
+			else f'resource.{self.mongo_resource}'
+		uri = self.context.config.get(resource, str, raise_exc=True)
 
-		self.col = MongoClient(self.context.config.get(f'resource.{self.mongo_resource}')) \
-			.get_database(self.db_name)\
+		# Clients are shared by all instances (per process) and connection pools thereby re-used
+		self.col = MongoClientRegistry.get(uri, **self.context.db.mongo_options.dict()) \
+			.get_database(self.db_name) \
 			.get_collection("stock")
 
+		self._cache: None | shelve.Shelf = shelve.open(self.cache_path) if self.cache_path else None
+
+
+	def __del__(self) -> None:
+		self.close()
+
+
+	def close(self) -> None:
+		""" Closes the local cache (if any) """
+		if getattr(self, '_cache', None) is not None:
+			self._cache.close() # type: ignore[union-attr]
+			self._cache = None
+
 
 	def get_ext_journal(self, stock_id: StockId) -> None | list[JournalRecord]:
+		return self.get_ext_journals([stock_id]).get(stock_id)
+
+
+	def get_ext_journals(self, stock_ids: Sequence[StockId]) -> dict[StockId, list[JournalRecord]]:
+		"""
+		:returns: (possibly filtered) journals of the provided stocks found in the external database
+		"""
 
-		if ext_stock := next(self.col.find({'_id': stock_id}), None):
-			if self.journal_filter:
-				return self.journal_filter.apply(ext_stock['journal'])
-			return ext_stock['journal']
-		return None
+		journals: dict[StockId, list[JournalRecord]] = {}
+		missing = list(stock_ids)
+
+		if self._cache is not None:
+			missing = []
+			for sid in stock_ids:
+				# repr: int 1 and str '1' are distinct stock ids
+				if (k := repr(sid)) in self._cache:
+					if (j := self._cache[k]) is not None:
+						journals[sid] = j
+				else:
+					missing.append(sid)
+
+		if missing:
+
+			for doc in self.col.find({'_id': {'$in': missing}}, {'journal': 1}):
+				journals[doc['_id']] = doc['journal']
+
+			if self._cache is not None:
+				for sid in missing:
+					self._cache[repr(sid)] = journals.get(sid)
+				self._cache.sync()
+
+		if self.journal_filter:
+			for sid, j in journals.items():
+				journals[sid] = self.journal_filter.apply(j)
+
+		return journals
 
 
 	def complement(self, it: Iterable[AmpelBuffer], t3s: T3Store) -> None:
 
-		for albuf in it:
+		buffers = list(it)
+		for albuf in buffers:
+			if 'stock' not in albuf or not isinstance(albuf['stock'], dict):
+				raise ValueError(f"No stock information available (buffer id: {albuf.get('id')!r})")
+
+		stocks = [cast(StockDocument, albuf['stock']) for albuf in buffers]
+		journals = self.get_ext_journals([stock['stock'] for stock in stocks])
+
+		for stock in stocks:
 
-			if 'stock' in albuf and isinstance(albuf['stock'], dict):
+			if entries := journals.get(stock['stock']):
 
-				if entries := self.get_ext_journal(albuf['stock']['stock']):
+				entries = entries + list(stock['journal'])
 
-					entries.extend(albuf['stock']['journal'])
+				if self.sort:
+					entries.sort(key=lambda x: x['ts'], reverse=self.reverse)
 
-					if self.sort:
-						dict.__setitem__(
-							albuf['stock'], 'journal', sorted( # type: ignore[index]
-								entries, key=lambda x: x['ts'], reverse=self.reverse
-							)
-						)
-			else:
-				print(albuf)
-				raise ValueError("No stock information available")
+				# Stock documents may be read-only dicts
+				dict.__setitem__(stock, 'journal', entries) # type: ignore[index]
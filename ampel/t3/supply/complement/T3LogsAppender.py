@@ -4,34 +4,51 @@
 # License:             BSD-3-Clause
 # Author:              valery brinnel <firstname.lastname@gmail.com>
 # Date:                29.03.2021
-# Last Modified Date:  13.12.2021
+# Last Modified Date:  19.10.2026
 # Last Modified By:    valery brinnel <firstname.lastname@gmail.com>
 
 from datetime import datetime
+from itertools import groupby, islice
 from bson.objectid import ObjectId
 from typing import Any
 from collections.abc import Iterable
+from ampel.types import StockId
 from ampel.view.T3Store import T3Store
 from ampel.struct.AmpelBuffer import AmpelBuffer
+from ampel.content.LogDocument import LogDocument
 from ampel.mongo.query.var.LogsLoader import LogsLoader
 from ampel.log.utils import safe_query_dict
+from ampel.mongo.utils import get_oid_time_range
+from ampel.mongo.model.ReadPreferenceModel import ReadPreferenceModel
 from ampel.abstract.AbsBufferComplement import AbsBufferComplement
 
 
 class T3LogsAppender(AbsBufferComplement):
+	"""
+	Appends log entries to buffers (key 'logs').
+	Logs are streamed sorted by stock (index on 's') and joined with buffers by stock id.
+	Entries associated with several stocks ('s' is an array) are appended to the buffer of each of these stocks.
+	"""
 
 	use_last_run: bool = True
 	logs_loader_conf: dict[str, Any] = {}
 
+	#: Max number of log entries appended per stock (most recent entries are kept), None: no limit
+	max_logs_per_stock: None | int = None
+
+	#: Read preference overriding the default of AmpelDB (see AmpelDB.get_read_collection)
+	read_preference: None | ReadPreferenceModel = None
+
+
 	def __init__(self, **kwargs) -> None:
-		super.__init__(**kwargs)
+		super().__init__(**kwargs)
 		self.log_loader = LogsLoader(**self.logs_loader_conf, read_only=True)
-		self.col = self.context.db.get_collection('logs')
 
 
 	def complement(self, it: Iterable[AmpelBuffer], t3s: T3Store) -> None:
 
-		query = {'s': {'$in': [el['id'] for el in it]}}
+		buffers = {el['id']: el for el in it}
+		query: dict[str, Any] = {'s': {'$in': list(buffers)}}
 
 		if t3s.session and self.use_last_run and t3s.session.get('last_run'):
 			query['_id'] = {
@@ -42,21 +59,83 @@ class T3LogsAppender(AbsBufferComplement):
 				)
 			}
 
-		logs = list(
-			self.log_loader.fetch_logs(self.col, query)
-		)
+		# Most recent entries first if a limit applies
+		cap = self.max_logs_per_stock
+		count = 0
+		multi: list[LogDocument] = []
+
+		for stock, logs in groupby(
+			self.log_loader.iter_logs(
+				self.context.db.get_log_collections(
+					*get_oid_time_range(query), read_only=True, read_preference=self.read_preference
+				),
+				query, sort={'s': 1, '_id': 1 if cap is None else -1}
+			),
+			key = lambda l: l['s']
+		):
+
+			# Entries associated with several stocks are dispatched below
+			if isinstance(stock, (list, tuple)):
+				multi.extend(logs)
+				continue
+
+			if (ab := buffers.get(stock)) is None:
+				continue
+
+			if cap is None:
+				entries = list(logs)
+			else:
+				entries = list(islice(logs, cap))
+				entries.reverse()
+
+			if ab.get('logs') is None:
+				ab['logs'] = entries
+			else:
+				ab['logs'].extend(entries) # type: ignore[union-attr]
+			count += len(entries)
+
+		if multi:
+			count += self._append_multi(buffers, multi, cap)
 
 		self.logger.debug(
-			f"Log query returned {len(logs)} result(s)",
+			f"Log query returned {count} result(s)",
 			extra=safe_query_dict(query)
 		)
 
-		if not logs:
+		if not count:
 			return
 
-		for ab in it:
-			if 'logs' not in ab or ab['logs'] is None:
+		for ab in buffers.values():
+			if ab.get('logs') is None:
 				ab['logs'] = []
-			for l in logs:
-				if ab['id'] == l['s']:
-					ab['logs'].append(l) # type: ignore
+
+
+	@staticmethod
+	def _append_multi(buffers: dict[StockId, AmpelBuffer], logs: list[LogDocument], cap: None | int) -> int:
+		"""
+		Appends entries associated with several stocks to the buffers of these stocks,
+		restoring the chronological order of entries (and the per stock limit) of the affected buffers
+		:returns: number of appended entries
+		"""
+
+		count = 0
+		stocks: set[StockId] = set()
+
+		for l in logs:
+			for stock in set(l['s']): # type: ignore[arg-type]
+				if (ab := buffers.get(stock)) is None:
+					continue
+				if ab.get('logs') is None:
+					ab['logs'] = []
+				ab['logs'].append(l) # type: ignore[union-attr]
+				stocks.add(stock)
+				count += 1
+
+		for stock in stocks:
+			entries = sorted(buffers[stock]['logs'], key=lambda l: l['_id']) # type: ignore[arg-type]
+			if cap is not None and len(entries) > cap:
+				count -= len(entries) - cap
+				entries = entries[-cap:]
+			buffers[stock]['logs'] = entries
+
+		return count
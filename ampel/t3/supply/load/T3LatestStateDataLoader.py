@@ -4,7 +4,7 @@
 # License:             BSD-3-Clause
 # Author:              valery brinnel <firstname.lastname@gmail.com>
 # Date:                09.12.2019
-# Last Modified Date:  03.04.2021
+# Last Modified Date:  19.10.2026
 # Last Modified By:    valery brinnel <firstname.lastname@gmail.com>
 
 import collections, ujson
@@ -45,7 +45,7 @@ class T3LatestStateDataLoader(AbsT3Loader):
 
 		super().__init__(**kwargs)
 
-		self.col_t1 = self.context.db.get_collection("t1")
+		self.col_t1 = self.context.db.get_read_collection("t1")
 
 		for directive in self.directives:
 
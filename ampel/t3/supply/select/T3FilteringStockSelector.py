@@ -4,12 +4,12 @@
 # License			: BSD-3-Clause
 # Author			: Jakob van Santen <jakob.van.santen@desy.de>
 # Date				: 02.08.2020
-# Last Modified Date:  02.08.2020
-# Last Modified By	: Jakob van Santen <jakob.van.santen@desy.de>
+# Last Modified Date:  19.10.2026
+# Last Modified By	: valery brinnel <firstname.lastname@gmail.com>
 
 from itertools import islice
 from typing import Any
-from collections.abc import Sequence, Generator
+from collections.abc import Sequence, Generator, Iterator, Iterable
 
 from ampel.types import StockId
 from ampel.t3.supply.select.T3StockSelector import T3StockSelector
@@ -38,11 +38,21 @@ class T3FilteringStockSelector(T3StockSelector):
 				}
 			]
 		}
+
+	If summary_col is set, latest T2 results are read from the summary collection
+	maintained by T2 workers (see AbsWorker.summary_col) using a plain query,
+	rather than being computed from the T2 collection by an aggregation.
+	Note that the summary holds, for each unit, the most recently committed successful
+	result regardless of the channel it was computed for (channel constraints apply to stocks).
+	Results are removed from the summary when the unit is re-run unsuccessfully.
 	"""
 
 	t2_filter: T2FilterModel | AllOf[T2FilterModel] | AnyOf[T2FilterModel]
 	chunk_size: int = 200
 
+	#: Name of the summary collection to query (ex: 't2summary'), None: aggregate the T2 collection
+	summary_col: None | str = None
+
 	# Override/Implement
 	def fetch(self) -> Generator[dict[str,Any], None, None]:
 
@@ -50,18 +60,12 @@ class T3FilteringStockSelector(T3StockSelector):
 		if not (cursor := super().fetch()):
 			return None
 
-		# Execute aggregation on T2 collection to get matching subset of stocks
-		# NB: aggregate in chunks to avoid the 100 MB aggregation memory limit
+		# NB: filter in chunks to avoid the 100 MB aggregation memory limit
 		input_count = 0
 		output_count = 0
 		while (stock_ids := [doc['stock'] for doc in islice(cursor, self.chunk_size)]):
 			count = 0
-			for count, doc in enumerate(
-				self.context.db.get_collection('t2').aggregate(
-					self._t2_filter_pipeline(stock_ids),
-				),
-				1
-			):
+			for count, doc in enumerate(self._filter(stock_ids), 1):
 				yield doc
 
 			input_count += len(stock_ids)
@@ -70,10 +74,49 @@ class T3FilteringStockSelector(T3StockSelector):
 		self.logger.info(f"{output_count}/{input_count} stocks passed filter criteria")
 
 
+	# Override
+	def fetch_pages(self, page_size: int, after: Any = None) -> Iterator[list[dict[str, Any]]]:
+		""" Filters every page of the streamed stock selection (pages may hence be smaller than page_size) """
+
+		input_count = 0
+		output_count = 0
+		for page in super().fetch_pages(page_size, after):
+			stock_ids = [doc['stock'] for doc in page]
+			for i in range(0, len(stock_ids), self.chunk_size):
+				if (docs := list(self._filter(stock_ids[i:i + self.chunk_size]))):
+					output_count += len(docs)
+					yield docs
+			input_count += len(stock_ids)
+
+		self.logger.info(f"{output_count}/{input_count} stocks passed filter criteria")
+
+
+	def _filter(self, stock_ids: list[StockId]) -> Iterable[dict[str, Any]]:
+		""" :returns: {'stock': <stock id>} for each of the provided stocks passing the filter criteria """
+
+		if self.summary_col:
+			return (
+				{'stock': doc['_id']}
+				for doc in self.context.db.get_read_collection(self.summary_col, self.read_preference).find(
+					{
+						'_id': maybe_match_array(stock_ids),
+						**build_general_query(channel=self.channel),
+						**self._build_match(self.t2_filter)
+					},
+					{'_id': 1}
+				)
+			)
+
+		# Execute aggregation on T2 collection to get matching subset of stocks
+		return self.context.db.get_read_collection('t2', self.read_preference).aggregate(
+			self._t2_filter_pipeline(stock_ids)
+		)
+
 
 	def _build_match(self, f: T2FilterModel | AllOf[T2FilterModel] | AnyOf[T2FilterModel]) -> dict[str, Any]:
 		if isinstance(f, T2FilterModel):
-			return {f"{f.unit}.{k}": v for k, v in f.match.items()}
+			# Stocks without (successful) result for this unit never match, even if f.match is empty
+			return {f.unit: {'$exists': True}} | {f"{f.unit}.{k}": v for k, v in f.match.items()}
 		elif isinstance(f, AllOf):
 			return {'$and': [self._build_match(el) for el in f.all_of]}
 		elif isinstance(f, AnyOf):
@@ -4,11 +4,12 @@
 # License:             BSD-3-Clause
 # Author:              valery brinnel <firstname.lastname@gmail.com>
 # Date:                06.12.2019
-# Last Modified Date:  03.04.2021
+# Last Modified Date:  19.10.2026
 # Last Modified By:    valery brinnel <firstname.lastname@gmail.com>
 
 from pymongo.cursor import Cursor
 from typing import Literal, Any
+from collections.abc import Iterator
 
 from ampel.types import ChannelId, Tag
 from ampel.mongo.query.stock import build_stock_query
@@ -20,6 +21,7 @@ from ampel.model.operator.AllOf import AllOf
 from ampel.model.operator.AnyOf import AnyOf
 from ampel.model.operator.OneOf import OneOf
 from ampel.model.time.TimeConstraintModel import TimeConstraintModel
+from ampel.mongo.model.ReadPreferenceModel import ReadPreferenceModel
 
 
 class T3StockSelector(AbsT3Selector):
@@ -51,6 +53,9 @@ class T3StockSelector(AbsT3Selector):
 	#: Custom selection (ex: {'run': {'$gt': 10}})
 	custom: None | dict[str, Any] = None
 
+	#: Read preference overriding the default of AmpelDB (see AmpelDB.get_read_collection)
+	read_preference: None | ReadPreferenceModel = None
+
 
 	def __init__(self, logger: AmpelLogger, **kwargs):
 
@@ -70,10 +75,9 @@ class T3StockSelector(AbsT3Selector):
 		super().__init__(**kwargs)
 
 
-	# Override/Implement
-	def fetch(self) -> None | Cursor:
+	def build_query(self) -> dict[str, Any]:
+		""" :returns: query matching selected stocks using criteria defined in config """
 
-		# Build query for matching transients using criteria defined in config
 		match_query = build_stock_query(
 			channel = self.channel,
 			tag = self.tag,
@@ -89,9 +93,51 @@ class T3StockSelector(AbsT3Selector):
 		if self.logger.verbose:
 			self.logger.log(VERBOSE, "Executing search query", extra=safe_query_dict(match_query))
 
+		return match_query
+
+
+	# Override/Implement
+	def fetch(self) -> None | Cursor:
+
 		# Execute 'find transients' query
 		cursor = self.context.db \
-			.get_collection('stock') \
-			.find(match_query, {'stock': 1})
+			.get_read_collection('stock', self.read_preference) \
+			.find(self.build_query(), {'stock': 1})
 
 		return cursor
+
+
+	# Override
+	def fetch_pages(self, page_size: int, after: Any = None) -> Iterator[list[dict[str, Any]]]:
+		"""
+		Streams the selection using keyset pagination on _id: each page is retrieved
+		by a distinct short-lived query (_id greater than the last _id of the previous page),
+		which makes long running T3 processes robust against cursor timeouts
+		without having to hold all selected ids in memory.
+
+		:param after: resume selection after the provided _id
+		"""
+
+		col = self.context.db.get_read_collection('stock', self.read_preference)
+		match_query = self.build_query()
+
+		while True:
+
+			page = list(
+				col.find(
+					{'$and': [match_query, {'_id': {'$gt': after}}]} if after is not None else match_query,
+					{'stock': 1}
+				)
+				.sort('_id', 1)
+				.limit(page_size)
+			)
+
+			if not page:
+				return
+
+			yield page
+
+			if len(page) < page_size:
+				return
+
+			after = page[-1]['_id']
@@ -10,6 +10,7 @@ import datetime
 
 from ampel.config.builder.DistConfigBuilder import DistConfigBuilder
 from ampel.mongo.update.DBUpdatesBuffer import DBUpdatesBuffer
+from ampel.mongo.MongoClientRegistry import MongoClientRegistry
 from ampel.dev.DevAmpelContext import DevAmpelContext
 
 from ampel.mongo.update.MongoStockIngester import MongoStockIngester
@@ -73,7 +74,8 @@ def mongod(pytestconfig):
 
 @pytest.fixture
 def patch_mongo(monkeypatch):
-    monkeypatch.setattr("ampel.core.AmpelDB.MongoClient", mongomock.MongoClient)
+    monkeypatch.setattr("ampel.mongo.MongoClientRegistry.MongoClient", mongomock.MongoClient)
+    monkeypatch.setattr(MongoClientRegistry, "_clients", {})
     # ignore codec_options in DataLoader
     monkeypatch.setattr("mongomock.codec_options.is_supported", lambda *args: None)
 
@@ -7,8 +7,9 @@
 # Last Modified Date:  11.02.2021
 # Last Modified By:    jvs
 
-import time
-from collections.abc import Sequence
+import socket, time
+from typing import ClassVar
+from collections.abc import Sequence, Iterable
 
 from ampel.struct.UnitResult import UnitResult
 from ampel.types import StockId, UBson
@@ -17,6 +18,7 @@ from ampel.abstract.AbsStockT2Unit import AbsStockT2Unit
 from ampel.abstract.AbsPointT2Unit import AbsPointT2Unit
 from ampel.abstract.AbsStateT2Unit import AbsStateT2Unit
 from ampel.abstract.AbsTiedStateT2Unit import AbsTiedStateT2Unit
+from ampel.abstract.AbsCustomStateT2Unit import AbsCustomStateT2Unit
 
 from ampel.content.DataPoint import DataPoint
 from ampel.content.T1Document import T1Document
@@ -65,6 +67,11 @@ class DummyStockT2Unit(AbsStockT2Unit):
         return {"id": stock_doc["stock"]}
 
 
+class DummyArrayStockT2Unit(AbsStockT2Unit):
+    def process(self, stock_doc):
+        return {"id": stock_doc["stock"], "cov": [[float(i * j) for j in range(4)] for i in range(4)]}
+
+
 class DummyPointT2Unit(AbsPointT2Unit):
     def process(self, datapoint):
         return {"thing": datapoint["body"]["thing"]}
@@ -93,3 +100,38 @@ class DummyTiedStateT2Unit(AbsTiedStateT2Unit):
         data = t2views[-1].get_payload() or {}
         assert isinstance(data, dict)
         return {k: v * 2 for k, v in data.items()}
+
+
+class DummyCustomStateT2Unit(AbsCustomStateT2Unit[list]):
+
+    #: number of calls to build() (shared by subclasses)
+    build_count: ClassVar[list[int]] = [0]
+
+    @staticmethod
+    def build(compound: T1Document, datapoints: Iterable[DataPoint]) -> list:
+        DummyCustomStateT2Unit.build_count[0] += 1
+        return [dp["id"] for dp in datapoints]
+
+    def process(self, arg: list) -> UBson | UnitResult:
+        return {"len": len(arg)}
+
+
+class OtherDummyCustomStateT2Unit(DummyCustomStateT2Unit):
+
+    def process(self, arg: list) -> UBson | UnitResult:
+        return {"sum": sum(arg)}
+
+
+class DummySleepyStockT2Unit(AbsStockT2Unit):
+
+    sleep: float = 0
+
+    def process(self, stock_doc):
+        self.logger.info("Going to sleep")
+        time.sleep(self.sleep)
+        return {"id": stock_doc["stock"]}
+
+
+class DummyNetworkTimeoutStockT2Unit(AbsStockT2Unit):
+    def process(self, stock_doc):
+        raise socket.timeout("timed out")
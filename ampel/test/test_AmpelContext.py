@@ -0,0 +1,15 @@
+from ampel.dev.DevAmpelContext import DevAmpelContext
+
+
+def test_run_id_block(mock_context, testing_config):
+    assert mock_context.new_run_id() == 1
+
+    mock_context.db.run_id_block = 10
+    other = DevAmpelContext.load(config=str(testing_config))
+    other.db = mock_context.db
+
+    assert [mock_context.new_run_id() for _ in range(3)] == [2, 3, 4]
+    # other contexts (processes) draw ids from distinct blocks
+    assert other.new_run_id() == 12
+    assert [mock_context.new_run_id() for _ in range(9)] == [5, 6, 7, 8, 9, 10, 11, 22, 23]
+    assert mock_context.db.get_collection("counter").find_one()["value"] == 31
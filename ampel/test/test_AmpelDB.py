@@ -0,0 +1,207 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from ampel.log.LightLogRecord import LightLogRecord
+from ampel.log.LogFlag import LogFlag
+from ampel.mongo.model.AmpelColModel import AmpelColModel
+from ampel.mongo.model.ReadPreferenceModel import ReadPreferenceModel
+from ampel.mongo.query.var.LogsLoader import LogsLoader
+from ampel.mongo.update.var.DBLoggingHandler import DBLoggingHandler
+from ampel.mongo.utils import get_log_partition, get_log_partition_range
+
+
+def test_col_model_profiles():
+    col = AmpelColModel(
+        name="t2",
+        indexes=[{"field": "stock"}, {"field": "code"}],
+        profiles={
+            "t2": [{"index": [{"field": "code"}, {"field": "unit"}]}],
+            "t3": [{"field": "stock"}, {"index": [{"field": "stock"}, {"field": "unit"}]}],
+        },
+    )
+    assert [idx.get_id() for idx in col.get_indexes()] == ["stock_1", "code_1"]
+    assert [idx.get_id() for idx in col.get_indexes("t2")] == ["stock_1", "code_1", "code_1_unit_1"]
+    # duplicates are skipped, unknown profiles ignored
+    assert [idx.get_id() for idx in col.get_indexes(["t3", "ingest"])] == [
+        "stock_1", "code_1", "stock_1_unit_1"
+    ]
+
+
+def test_apply_index_profile(mock_context, ampel_logger):
+    db = mock_context.db
+    col = db.get_collection("t2")
+    assert "code_1_unit_1" not in col.index_information()
+
+    db.apply_index_profile("t2", ampel_logger)
+    assert {"code_1_unit_1", "stock_1_unit_1_config_1_link_1"} <= set(col.index_information())
+    assert "link_1" in db.get_collection("t1").index_information()
+
+    # switching profile removes indexes of the previous one
+    db.apply_index_profile("t3", ampel_logger)
+    assert "code_1_unit_1" not in col.index_information()
+    assert "stock_1_unit_1" in col.index_information()
+
+    with pytest.raises(ValueError):
+        db.apply_index_profile("nope", ampel_logger)
+
+
+def test_copy_indexes(mock_context):
+    db = mock_context.db
+    target = db._get_pymongo_db("data", role="w").get_collection("CHAN_stock")
+    db._copy_indexes(db.get_collection("stock"), target)
+    info = target.index_information()
+    # compound unique (stock, channel) index is reduced to a non-unique stock index
+    assert info["stock_1"]["key"] == [("stock", 1)]
+    assert not info["stock_1"].get("unique")
+
+
+def test_materialized_view(integration_context):
+    db = integration_context.db
+    stock = db.get_collection("stock")
+    t2 = db.get_collection("t2")
+    for i, chans in enumerate((["A"], ["A", "B"], ["B"])):
+        stock.insert_one(
+            {"stock": i, "channel": chans, "journal": [], "ts": {c: {"upd": 1} for c in chans}}
+        )
+        t2.insert_one({"stock": i, "link": i, "unit": "T2X", "channel": chans, "meta": [], "code": 0})
+
+    db.create_one_view("A", materialize=True)
+    mstock = db._get_pymongo_db("data", role="w").get_collection("A_stock")
+    mt2 = db._get_pymongo_db("data", role="w").get_collection("A_t2")
+    assert sorted(d["stock"] for d in mstock.find()) == [0, 1]
+    assert mt2.count_documents({}) == 2
+    assert "stock_1" in mt2.index_information()
+
+    # incremental refresh only picks up stocks updated since last refresh,
+    # including those updated within the same second as the previous refresh
+    upd = db.get_collection("mview").find_one({"_id": "A"})["upd"]
+    assert isinstance(upd, int)
+    stock.update_one({"stock": 2}, {"$set": {"channel": ["A", "B"], "ts.A.upd": upd}})
+    t2.update_one({"stock": 2}, {"$set": {"channel": ["A", "B"]}})
+    db.refresh_materialized_view("A")
+    assert sorted(d["stock"] for d in mstock.find()) == [0, 1, 2]
+    assert mt2.count_documents({}) == 3
+
+    # t3 documents with human readable (string) ids are added as well
+    t3 = db.get_collection("t3")
+    t3.insert_one({"_id": "[T3X] 2026-10-19", "channel": ["A"], "meta": {"ts": upd + 1}})
+    db.refresh_materialized_view("A")
+    assert db._get_pymongo_db("data", role="w").get_collection("A_t3").find_one({"_id": "[T3X] 2026-10-19"})
+
+    db.delete_one_view("A")
+    assert db.get_collection("mview").count_documents({}) == 0
+
+
+@pytest.mark.parametrize(
+    "period,name,end",
+    [
+        ("day", "logs_20261021", datetime(2026, 10, 22, tzinfo=timezone.utc)),
+        ("week", "logs_20261019", datetime(2026, 10, 26, tzinfo=timezone.utc)),
+        ("month", "logs_20261001", datetime(2026, 11, 1, tzinfo=timezone.utc)),
+    ],
+)
+def test_log_partition(period, name, end):
+    dt = datetime(2026, 10, 21, 23, 59, tzinfo=timezone.utc)
+    assert get_log_partition(dt, period) == name
+    assert get_log_partition(dt.timestamp(), period) == name
+    start, stop = get_log_partition_range(name, period)
+    assert start <= dt < stop == end
+
+
+def test_partitioned_logging(mock_context):
+    db = mock_context.db
+    db.log_partition = "day"
+    now = datetime.now(timezone.utc)
+    yesterday = now - timedelta(days=1)
+
+    # records spanning two partitions
+    handler = DBLoggingHandler(db, run_id=1, level=LogFlag.INFO)
+    for dt, msg in ((yesterday, "a"), (now, "b")):
+        rec = LightLogRecord(name=0, levelno=LogFlag.INFO, msg=msg)
+        rec.created = dt.timestamp()
+        handler.handle(rec)
+    handler.flush()
+
+    names = [get_log_partition(yesterday, "day"), get_log_partition(now, "day")]
+    cols = [c for c in db.get_log_collections() if c.name != "logs"]
+    assert [c.name for c in cols] == names
+    assert [c.find_one()["m"] for c in cols] == ["a", "b"]
+
+    # time-restricted lookups skip partitions out of range
+    assert [c.name for c in db.get_log_collections(after=now - timedelta(seconds=1))] == ["logs", names[1]]
+
+    assert db.drop_log_partitions(now - timedelta(seconds=1)) == names[:1]
+    assert [c.name for c in db.get_log_collections()] == ["logs", names[1]]
+
+
+class _Col:
+    def __init__(self, name, docs):
+        self.name, self.docs = name, docs
+
+    def aggregate(self, pipeline):
+        return iter(self.docs)
+
+
+def test_logs_loader_merge():
+    cols = [
+        _Col("logs_20261018", [{"s": 1, "_id": 2}, {"s": 2, "_id": 1}]),
+        _Col("logs_20261019", [{"s": 1, "_id": 4}, {"s": 1, "_id": 3}, {"s": 3, "_id": 5}]),
+    ]
+    # sorted partition results are merged
+    assert [(d["s"], d["_id"]) for d in LogsLoader._aggregate(cols, [], {"s": 1, "_id": -1})] == [
+        (1, 4), (1, 3), (1, 2), (2, 1), (3, 5)
+    ]
+    # _id sorted partition results are concatenated, most recent partition first
+    assert [d["_id"] for d in LogsLoader._aggregate(cols, [], {"_id": -1})] == [4, 3, 5, 2, 1]
+
+    # mixed int/str and scalar/array stock ids are merged following the mongodb sort order
+    cols = [
+        _Col("logs_20261018", [{"s": 2, "_id": 1}, {"s": "a", "_id": 2}]),
+        _Col("logs_20261019", [{"s": None, "_id": 4}, {"_id": 5}, {"s": [1, 3], "_id": 3}, {"s": "b", "_id": 6}]),
+    ]
+    assert [d["_id"] for d in LogsLoader._aggregate(cols, [], {"s": 1, "_id": 1})] == [4, 5, 3, 1, 2, 6]
+
+
+def test_read_preference(mock_context):
+    db = mock_context.db
+    assert db.get_read_collection("stock").read_preference.mongos_mode == "primary"
+
+    db.read_preference = ReadPreferenceModel(mode="secondaryPreferred", max_staleness=120)
+    col = db.get_read_collection("stock")
+    assert col.read_preference.mongos_mode == "secondaryPreferred"
+    assert col.read_preference.max_staleness == 120
+    # writes are unaffected
+    assert db.get_collection("stock").read_preference.mongos_mode == "primary"
+    # per-query override
+    assert db.get_read_collection("t2", ReadPreferenceModel(mode="nearest")).read_preference.mongos_mode == "nearest"
+    assert {c.read_preference.mongos_mode for c in db.get_log_collections(read_only=True)} == {"secondaryPreferred"}
+
+
+def test_shard_key():
+    with pytest.raises(ValueError, match="not prefixed by the shard key"):
+        AmpelColModel(
+            name="t0", indexes=[{"field": "id", "args": {"unique": True}}], shard_key={"stock": "hashed"}
+        )
+
+
+def test_check_targetable(mock_context):
+    from ampel.mongo.update.MongoT2Ingester import MongoT2Ingester
+
+    db = mock_context.db
+    assert not db.is_sharded
+    db.check_targetable("t2", MongoT2Ingester.match_keys)
+    db.col_config["t2"] = AmpelColModel(name="t2", shard_key={"body": 1})
+    with pytest.raises(ValueError, match="missing shard key"):
+        db.check_targetable("t2", MongoT2Ingester.match_keys)
+
+
+def test_check_claimable(mock_context):
+    db = mock_context.db
+    db.check_claimable("t2")
+    db.col_config["t2"] = AmpelColModel(name="t2", shard_key={"stock": "hashed"})
+    db.check_claimable("t2")
+    # mongomock reports version 3.0
+    db.is_sharded = True
+    with pytest.raises(ValueError, match="MongoDB >= 7.0"):
+        db.check_claimable("t2")
@@ -0,0 +1,147 @@
+import gzip, json
+from time import time
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+
+import pytest
+
+from ampel.log.AmpelLogger import AmpelLogger
+from ampel.mongo.utils import get_log_partition
+from ampel.ops.AmpelPurger import AmpelPurger
+
+
+@pytest.fixture
+def stocks(mock_context):
+    db = mock_context.db
+    old = time() - 10 * 86400
+    # stock 0, 1: inactive, stock 2: active, stock 3: also in channel without purge config
+    for i, (chans, upd) in enumerate(
+        ((["A"], old), (["A"], old), (["A"], time()), (["A", "B"], old))
+    ):
+        db.get_collection("stock").insert_one(
+            {"stock": i, "channel": chans, "ts": {c: {"upd": upd} for c in chans}}
+        )
+        db.get_collection("t1").insert_one({"stock": i, "link": i, "channel": chans})
+        db.get_collection("t2").insert_one({"stock": i, "link": i, "unit": "T2X", "channel": chans})
+    db.get_collection("t0").insert_many(
+        [{"id": 1, "stock": [0]}, {"id": 2, "stock": [0, 1]}, {"id": 3, "stock": [1, 2]}]
+    )
+    return db
+
+
+def get_purger(mock_context, tmp_path, **kwargs):
+    return AmpelPurger(
+        context=mock_context,
+        logger=AmpelLogger.get_logger(),
+        channel="A",
+        path=str(tmp_path),
+        **kwargs
+    )
+
+
+def test_purge(mock_context, stocks, tmp_path):
+
+    purger = get_purger(mock_context, tmp_path, content={"delay": 1, "format": "json", "unify": True})
+    beacon = purger.run()
+    assert beacon["purged"]["stocks"] == 2
+
+    assert sorted(d["stock"] for d in stocks.get_collection("stock").find()) == [2, 3]
+    assert sorted(d["stock"] for d in stocks.get_collection("t2").find()) == [2, 3]
+    # datapoint shared with active stock is kept
+    assert [d["id"] for d in stocks.get_collection("t0").find()] == [3]
+
+    files = list(tmp_path.iterdir())
+    assert len(files) == 1 and files[0].name.endswith(".json.gz")
+    with gzip.open(files[0], "rt") as f:
+        archived = [json.loads(line) for line in f]
+    assert [a["stock"]["stock"] for a in archived] == [0, 1]
+    assert sorted(d["id"] for d in archived[1]["t0"]) == [2, 3]
+
+
+def test_purge_shared_across_batches(mock_context, stocks, tmp_path):
+
+    purger = get_purger(mock_context, tmp_path, batch_size=1, content={"delay": 1, "format": "bson"})
+    assert purger.run()["purged"]["stocks"] == 2
+
+    # datapoint shared by stocks 0 and 1 (purged in different batches) is deleted,
+    # purged ids are pulled from the datapoint shared with active stock 2
+    assert [(d["id"], d["stock"]) for d in stocks.get_collection("t0").find()] == [(3, [2])]
+
+
+def test_purge_resume(mock_context, stocks, tmp_path):
+
+    purger = get_purger(
+        mock_context, tmp_path, batch_size=1, max_stocks=1,
+        content={"delay": 1, "format": "bson", "compress": False},
+    )
+
+    beacon = purger.run()
+    assert beacon["purged"]["stocks"] == 1
+    beacon = purger.run(beacon)
+    assert beacon["purged"]["stocks"] == 1
+    # exhausted selection: progress is reset
+    beacon = purger.run(beacon)
+    assert beacon["purged"]["stocks"] == 0 and not beacon["last"]
+
+    assert stocks.get_collection("stock").count_documents({}) == 2
+    assert sorted(f.name.rsplit("_", 1)[-1] for f in tmp_path.iterdir()) == [
+        "stock.bson", "t0.bson", "t1.bson", "t2.bson"
+    ]
+
+
+def test_purge_dry_run(mock_context, stocks, tmp_path):
+
+    purger = get_purger(
+        mock_context, tmp_path, batch_size=1, max_stocks=1, dry_run=True,
+        content={"delay": 1, "format": "bson", "compress": False},
+    )
+
+    # progress of actual runs is left unchanged
+    last = {"A": stocks.get_collection("stock").find_one({"stock": 0})["_id"]}
+    beacon = purger.run({"last": last})
+    assert beacon["purged"]["stocks"] == 1 and beacon["last"] == last
+    assert purger.run()["last"] == {}
+    assert stocks.get_collection("stock").count_documents({}) == 4
+
+
+def test_purge_summary(mock_context, stocks, tmp_path):
+
+    summary = stocks.get_collection("t2summary")
+    summary.insert_many([{"_id": i, "channel": ["A"], "T2X": {}} for i in range(4)])
+    purger = get_purger(mock_context, tmp_path, summary_col="t2summary", content={"delay": 1, "format": "bson"})
+    assert purger.run()["purged"]["stocks"] == 2
+    assert sorted(d["_id"] for d in summary.find()) == [2, 3]
+
+
+def test_purge_log_partitions(mock_context, tmp_path):
+
+    db = mock_context.db
+    db.log_partition = "day"
+    old = datetime.now(timezone.utc) - timedelta(days=5)
+    for dt in (old, old + timedelta(hours=1), datetime.now(timezone.utc)):
+        db.get_log_collection(dt).insert_one({"_id": ObjectId.from_datetime(dt), "f": 1, "r": 1})
+
+    purger = get_purger(
+        mock_context, tmp_path, content={"delay": 1, "format": "bson"}, logs={"delay": 2, "format": "json"}
+    )
+    beacon = purger.run()
+    assert beacon["purged"]["logs"] == 2
+    assert [c.name for c in db.get_log_collections() if c.name != "logs"] == [
+        get_log_partition(datetime.now(timezone.utc), "day")
+    ]
+
+
+def test_purge_logs_dry_run(mock_context, tmp_path):
+
+    col = mock_context.db.get_collection("logs")
+    old = datetime.now(timezone.utc) - timedelta(days=5)
+    col.insert_many([{"_id": ObjectId.from_datetime(old + timedelta(seconds=i)), "f": 1, "r": 1} for i in range(25)])
+
+    purger = get_purger(
+        mock_context, tmp_path, batch_size=1, dry_run=True,
+        content={"delay": 1, "format": "bson"}, logs={"delay": 2, "format": "json"}
+    )
+    # all entries are archived, not only the first batch
+    assert purger.run()["purged"]["logs"] == 25
+    assert col.count_documents({}) == 25
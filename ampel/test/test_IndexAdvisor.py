@@ -0,0 +1,61 @@
+import pytest
+
+from ampel.dev.DevAmpelContext import DevAmpelContext
+from ampel.mongo.instrument.QuerySampler import get_query_shape
+from ampel.mongo.instrument.IndexAdvisor import IndexAdvisor
+
+
+@pytest.fixture
+def sampled_context(patch_mongo, testing_config):
+    return DevAmpelContext.load(
+        config=str(testing_config),
+        purge_db=True,
+        custom_conf={"mongo.query_sampling": 1.0},
+    )
+
+
+def test_query_shape():
+    assert get_query_shape(
+        {"code": {"$in": [0, -1]}, "unit": "T2X", "$or": [{"a": 1}, {"b": {"$gt": 2}}]}
+    ) == {"code": "$in", "unit": "eq", "$or.a": "eq", "$or.b": "$gt"}
+
+
+def test_advise(sampled_context: DevAmpelContext):
+
+    db = sampled_context.db
+    t2 = db.get_collection("t2")
+    t2.insert_many([{"stock": i, "unit": "T2X", "code": 0, "link": i} for i in range(10)])
+
+    assert len(list(t2.find({"unit": "T2X", "link": {"$gt": 3}}).sort("stock", -1))) == 6
+    assert [doc["stock"] for doc in t2.find({"unit": "T2X", "link": 1})] == [1]
+    assert (doc := t2.find_one({"stock": 2})) is not None
+    assert doc["link"] == 2
+    t2.update_one({"unit": "T2X", "link": 5}, {"$set": {"code": 1}})
+
+    db.flush_query_samples()
+    stats = db.get_collection("querystats")
+    assert stats.count_documents({}) == 4
+    assert {doc["site"].split(":")[0] for doc in stats.find()} == {__name__}
+
+    advisor = IndexAdvisor(stats, lambda name: db.get_collection(name)._col)
+    res = {str(el["shape"]): el for el in advisor.advise()}
+
+    ranged = res[str({"unit": "eq", "link": "$gt"})]
+    assert ranged["sort"] == [["stock", -1]]
+    assert ranged["propose"] == [["unit", 1], ["stock", -1], ["link", 1]]
+
+    # find and update_one share the same shape
+    eq = res[str({"unit": "eq", "link": "eq"})]
+    assert eq["calls"] == 2 and len(eq["sites"]) == 2
+    assert eq["propose"] == [["unit", 1], ["link", 1]]
+
+    # stock is indexed
+    assert res[str({"stock": "eq"})]["propose"] is None
+
+
+def test_flush_on_close(sampled_context: DevAmpelContext):
+    db = sampled_context.db
+    db.get_collection("t2").find_one({"stock": 1})
+    assert db.get_collection("querystats").count_documents({}) == 0
+    db.close()
+    assert db.get_collection("querystats").count_documents({}) == 1
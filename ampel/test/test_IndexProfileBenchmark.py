@@ -0,0 +1,33 @@
+import pytest
+
+from ampel.dev.IndexProfileBenchmark import IndexProfileBenchmark
+
+
+@pytest.fixture
+def bench(patch_mongo):
+    bench = IndexProfileBenchmark("mongodb://localhost:27017", nstock=20, nunit=2, nchan=2)
+    bench.populate()
+    return bench
+
+
+def test_populate(bench):
+    assert bench.db.stock.count_documents({}) == 20
+    assert bench.db.t1.count_documents({}) == 20
+    assert bench.db.t2.count_documents({}) == 40
+
+
+@pytest.mark.parametrize("profile", [None, "ingest", "t2", "t3"])
+def test_set_profile(bench, profile):
+    bench.set_profile(profile)
+    for col_config in bench.db_model.collections:
+        if col_config.name not in ("stock", "t1", "t2"):
+            continue
+        expected = {
+            tuple(tuple(el) for el in idx.dict(exclude_unset=True)["index"])
+            for idx in col_config.get_indexes(profile)
+        }
+        indexes = {
+            tuple(v["key"]) for k, v in bench.db.get_collection(col_config.name).index_information().items()
+            if k != "_id_"
+        }
+        assert indexes == expected
@@ -0,0 +1,25 @@
+from ampel.mongo.MongoClientRegistry import MongoClientRegistry
+
+
+def test_registry(patch_mongo):
+    MongoClientRegistry.reset()
+    mc = MongoClientRegistry.get("mongodb://localhost", "writer", maxPoolSize=10)
+    assert MongoClientRegistry.get("mongodb://localhost", "writer", maxPoolSize=10) is mc
+    assert MongoClientRegistry.get("mongodb://localhost", "logger", maxPoolSize=10) is not mc
+    assert MongoClientRegistry.get("mongodb://localhost", "writer", maxPoolSize=20) is not mc
+    assert MongoClientRegistry.stats() == {"clients": 3, "hits": 1, "misses": 3}
+
+    # clients are not inherited by child processes
+    MongoClientRegistry._pid = -1
+    assert MongoClientRegistry.get("mongodb://localhost", "writer", maxPoolSize=10) is not mc
+    assert MongoClientRegistry.stats()["clients"] == 1
+
+
+def test_shared_clients(mock_context, testing_config, ampel_logger):
+    from ampel.dev.DevAmpelContext import DevAmpelContext
+
+    other = DevAmpelContext.load(config=str(testing_config))
+    col = mock_context.db.get_collection("stock")
+    assert other.db.get_collection("stock").database.client is col.database.client
+    # roles are not mixed
+    assert mock_context.db.get_collection("logs").database.client is not col.database.client
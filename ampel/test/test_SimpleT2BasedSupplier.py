@@ -0,0 +1,64 @@
+import pytest
+
+from ampel.core.EventHandler import EventHandler
+from ampel.dev.DevAmpelContext import DevAmpelContext
+from ampel.model.UnitModel import UnitModel
+from ampel.t3.supply.SimpleT2BasedSupplier import SimpleT2BasedSupplier
+from ampel.view.T3Store import T3Store
+from ampel.util.compact import encode_arrays
+
+
+@pytest.fixture
+def t2s(mock_context: DevAmpelContext):
+    # stock i has i+1 t2 docs (inserted in interleaved order)
+    mock_context.db.get_collection("t2").insert_many(
+        [
+            {"stock": stock, "unit": "DummyStockT2Unit", "code": 0, "n": n}
+            for n in range(5)
+            for stock in range(5)
+            if n <= stock
+        ]
+    )
+
+
+def get_supplier(context, ampel_logger, **kwargs) -> SimpleT2BasedSupplier:
+    return context.loader.new_context_unit(
+        UnitModel(
+            unit="SimpleT2BasedSupplier",
+            config={"query": {"code": 0}, "min_docs": 2} | kwargs,
+        ),
+        context=context,
+        sub_type=SimpleT2BasedSupplier,
+        logger=ampel_logger,
+        event_hdlr=EventHandler("t3", context.db, tier=3, run_id=1),
+    )
+
+
+@pytest.mark.parametrize(
+    "config",
+    [
+        {},
+        {"stream": True},
+        {"stream": True, "in_chunk_size": 2, "query": {"code": 0, "stock": {"$in": [4, 0, 1, 2, 3]}}},
+    ],
+)
+def test_supply(mock_context, t2s, ampel_logger, config):
+    supplier = get_supplier(mock_context, ampel_logger, **config)
+    buffers = {ab["id"]: ab for ab in supplier.supply(T3Store())}
+    assert set(buffers) == {1, 2, 3, 4}
+    for stock, ab in buffers.items():
+        assert sorted(t2["n"] for t2 in ab["t2"]) == list(range(stock + 1))  # type: ignore[union-attr]
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_supply_compact_bodies(mock_context, ampel_logger, stream):
+    matrix = [[float(i * j) for j in range(5)] for i in range(5)]
+    mock_context.db.get_collection("t2").insert_many(
+        [
+            {"stock": 1, "unit": "DummyStockT2Unit", "code": 0, "body": encode_arrays([{"cov": matrix}], 16)}
+            for _ in range(2)
+        ]
+    )
+    supplier = get_supplier(mock_context, ampel_logger, stream=stream)
+    (ab,) = supplier.supply(T3Store())
+    assert [t2["body"] for t2 in ab["t2"]] == [[{"cov": matrix}]] * 2  # type: ignore[union-attr]
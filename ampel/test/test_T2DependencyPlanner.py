@@ -0,0 +1,65 @@
+from ampel.dev.DevAmpelContext import DevAmpelContext
+from ampel.log.AmpelLogger import AmpelLogger
+from ampel.content.DataPoint import DataPoint
+from ampel.content.T2Document import T2Document
+from ampel.enum.DocumentCode import DocumentCode
+from ampel.model.StateT2Dependency import StateT2Dependency
+from ampel.struct.UnitResult import UnitResult
+from ampel.t2.T2DependencyPlanner import T2DependencyPlanner
+from ampel.t2.T2Worker import T2Worker
+from ampel.test.dummy import DummyPointT2Unit, DummyStockT2Unit, DummyTiedStateT2Unit
+
+
+def get_t2_doc() -> T2Document:
+    return {
+        "unit": "DummyTiedStateT2Unit", "config": None, "code": DocumentCode.NEW,
+        "stock": 42, "link": 7, "channel": ["TEST_CHANNEL"], "meta": []
+    }
+
+
+def test_point_dependency(mock_context: DevAmpelContext, ampel_logger: AmpelLogger):
+    """State t2s tied with point t2s match the datapoints of their state"""
+
+    for unit in (DummyPointT2Unit, DummyStockT2Unit):
+        mock_context.register_unit(unit)
+
+    planner = T2DependencyPlanner(mock_context.config)
+    dps: list[DataPoint] = [{"id": i, "stock": 42, "body": {"jd": -i}} for i in (3, 1, 2)]
+
+    t2_unit = DummyTiedStateT2Unit(
+        logger=ampel_logger,
+        t2_dependency=[
+            StateT2Dependency.parse_obj({"unit": "DummyPointT2Unit"}),
+            StateT2Dependency.parse_obj({"unit": "DummyStockT2Unit"})
+        ]
+    )
+    assert planner.build_query(t2_unit, get_t2_doc(), ampel_logger, dps) == {
+        "channel": {"$in": ["TEST_CHANNEL"]},
+        "stock": 42,
+        "$or": [
+            {"unit": "DummyPointT2Unit", "config": None, "link": {"$in": [3, 1, 2]}},
+            {"unit": "DummyStockT2Unit", "config": None, "link": 42},
+        ]
+    }
+
+    # link_override: first datapoint sorted by body.jd
+    t2_unit = DummyTiedStateT2Unit(
+        logger=ampel_logger,
+        t2_dependency=[
+            StateT2Dependency.parse_obj({"unit": "DummyPointT2Unit", "link_override": {"sort": "jd", "select": "first"}})
+        ]
+    )
+    planner = T2DependencyPlanner(mock_context.config)
+    assert (query := planner.build_query(t2_unit, get_t2_doc(), ampel_logger, dps))
+    assert query["link"] == 3
+
+
+def test_no_dependency(mock_context: DevAmpelContext, ampel_logger: AmpelLogger):
+    """Units without dependency yield no query (mongodb rejects empty $or arrays)"""
+
+    t2_unit = DummyTiedStateT2Unit(logger=ampel_logger, t2_dependency=[])
+    assert T2DependencyPlanner(mock_context.config).build_query(t2_unit, get_t2_doc(), ampel_logger, []) is None
+
+    t2 = T2Worker(context=mock_context, process_name="t2")
+    ret = t2.run_tied_query(None, get_t2_doc(), None, ampel_logger)  # type: ignore[arg-type]
+    assert isinstance(ret, UnitResult) and ret.code == DocumentCode.T2_MISSING_DEPENDENCY
@@ -1,11 +1,27 @@
+import signal, time
+from collections import OrderedDict
+
+import pytest
+
 from ampel.content.T2Document import T2Document
 from ampel.dev.DevAmpelContext import DevAmpelContext
 from ampel.enum.DocumentCode import DocumentCode
 from contextlib import contextmanager
 
 from ampel.metrics.AmpelMetricsRegistry import AmpelMetricsRegistry
-from ampel.t2.T2Worker import T2Worker
-from ampel.test.dummy import DummyPointT2Unit
+from ampel.t2 import isolation
+from ampel.t2.T2Worker import T2Worker, T2_UNIT_TIMEOUT
+from ampel.mongo.update.DBUpdatesBuffer import DBUpdatesBuffer
+from ampel.ingest.ChainedIngestionHandler import ChainedIngestionHandler
+from ampel.model.UnitModel import UnitModel
+from ampel.model.ingest.T1Combine import T1Combine
+from ampel.model.ingest.IngestBody import IngestBody
+from ampel.model.ingest.CompilerOptions import CompilerOptions
+from ampel.model.ingest.IngestDirective import IngestDirective
+from ampel.test.dummy import (
+    DummyPointT2Unit, DummyCustomStateT2Unit,
+    OtherDummyCustomStateT2Unit, DummySleepyStockT2Unit, DummyNetworkTimeoutStockT2Unit
+)
 
 
 @contextmanager
@@ -84,3 +100,185 @@ def test_tied_t2s(dev_context, ingest_tied_t2):
         assert num_docs == 2
         assert t2.find_one({"unit": "DummyStateT2Unit"})["body"][0]["len"] == num_dps
         assert t2.find_one({"unit": "DummyTiedStateT2Unit"})["body"][0]["len"] == 2*num_dps
+
+
+def test_state_cache(dev_context: DevAmpelContext, ampel_logger):
+    for unit in (DummyCustomStateT2Unit, OtherDummyCustomStateT2Unit):
+        dev_context.register_unit(unit)
+
+    updates_buffer = DBUpdatesBuffer(dev_context.db, run_id=0, logger=ampel_logger)
+    handler = ChainedIngestionHandler(
+        dev_context, tier=0, run_id=0, trace_id={},
+        updates_buffer=updates_buffer, logger=ampel_logger,
+        compiler_opts=CompilerOptions(), shaper=UnitModel(unit="NoShaper"),
+        directives=[
+            IngestDirective(
+                channel="TEST_CHANNEL",
+                ingest=IngestBody(
+                    combine=[
+                        T1Combine.parse_obj({
+                            "unit": "T1SimpleCombiner",
+                            "state_t2": [
+                                {"unit": "DummyCustomStateT2Unit"},
+                                {"unit": "OtherDummyCustomStateT2Unit"}
+                            ]
+                        })
+                    ]
+                )
+            )
+        ],
+    )
+    handler.ingest(
+        [{"id": i, "stock": "stockystock", "body": {}} for i in range(3)],
+        [(0, True)], stock_id="stockystock", jm_extra={"alert": 123}
+    )
+    updates_buffer.push_updates()
+
+    DummyCustomStateT2Unit.build_count[0] = 0
+    t2 = T2Worker(context=dev_context, raise_exc=True, process_name="t2", state_cache_size=10)
+    assert t2.run() == 2
+    assert DummyCustomStateT2Unit.build_count[0] == 1
+
+    col = dev_context.db.get_collection("t2")
+    assert col.find_one({"unit": "DummyCustomStateT2Unit"})["body"] == [{"len": 3}]
+    assert col.find_one({"unit": "OtherDummyCustomStateT2Unit"})["body"] == [{"sum": 3}]
+
+    event = dev_context.db.get_collection("events").find_one({"run": {"$exists": True}})
+    assert event["state_cache"] == {"hits": 1, "misses": 1, "size": 1}
+    assert len(t2._state_cache) == 0 # type: ignore[arg-type]
+
+
+def test_tied_t2s_deferred(dev_context, ingest_tied_t2):
+    """Tied docs with pending dependencies are deferred rather than re-polled"""
+    col = dev_context.db.get_collection("t2")
+    # dependencies are being processed by another worker
+    col.update_many({"unit": ingest_tied_t2.param}, {"$set": {"code": DocumentCode.RUNNING}})
+
+    t2 = T2Worker(context=dev_context, raise_exc=True, process_name="t2", run_dependent_t2s=False)
+    assert t2.run() == 1
+
+    tied = col.find_one({"unit": "DummyTiedStateT2Unit"})
+    assert tied["code"] == DocumentCode.T2_PENDING_DEPENDENCY
+    assert len([m for m in tied["meta"] if m["tier"] == 2]) == 1
+
+    # dependencies done, tied doc is processed in the next run
+    col.update_many({"unit": ingest_tied_t2.param}, {"$set": {"code": DocumentCode.NEW}})
+    t2.run()
+    assert col.count_documents({"code": {"$ne": DocumentCode.OK}}) == 0
+    assert col.find_one({"unit": "DummyTiedStateT2Unit"})["body"][-1]
+
+
+@pytest.mark.parametrize("isolated", [False, True])
+@pytest.mark.parametrize("sleep,code", [(0, DocumentCode.OK), (5, T2_UNIT_TIMEOUT)])
+def test_unit_timeout(dev_context: DevAmpelContext, ingest_stock_t2, monkeypatch, isolated, sleep, code):
+    dev_context.register_unit(DummySleepyStockT2Unit)
+    col = dev_context.db.get_collection("t2")
+    col.update_one({}, {"$set": {"unit": "DummySleepyStockT2Unit", "config": {"sleep": sleep}}})
+    dev_context.db.get_collection("stock").insert_one({"stock": "stockystock"})
+
+    t2 = T2Worker(
+        context=dev_context, raise_exc=True, process_name="t2",
+        unit_timeout={"DummySleepyStockT2Unit": 0.5},
+        isolated_units=["DummySleepyStockT2Unit"] if isolated else [],
+    )
+    t0 = time.time()
+    assert t2.run() == 1
+    assert time.time() - t0 < 5
+
+    doc = col.find_one({})
+    assert doc["code"] == code
+    assert len(doc["meta"]) == 2 # ingestion + single processing attempt
+    if code == DocumentCode.OK:
+        assert doc["body"] == [{"id": "stockystock"}]
+    else:
+        assert dev_context.db.get_collection("troubles").count_documents({}) == 1
+    if not isolated:
+        return
+
+    assert (proc := t2._isolated_proc) is not None, "isolated process is kept across runs"
+    if code == DocumentCode.OK:
+        # next run re-uses the isolated process, which is stopped when the worker is terminated
+        pid = proc.pid
+        process_doc = T2Worker.process_doc
+
+        def process_and_exit(self, *args):
+            assert self._isolated_proc.pid == pid
+            ret = process_doc(self, *args)
+            self.sig_exit(signal.SIGTERM, None)
+            return ret
+
+        monkeypatch.setattr(T2Worker, "process_doc", process_and_exit)
+        col.update_one({}, {"$set": {"code": DocumentCode.RERUN_REQUESTED}})
+        assert t2.run() == 1
+        assert proc.spawn_count == 1
+        assert t2._isolated_proc is None
+    else:
+        t2.close()
+        assert t2._isolated_proc is None
+
+
+@pytest.mark.parametrize("isolated", [False, True])
+def test_unit_timeout_error(dev_context: DevAmpelContext, ingest_stock_t2, isolated):
+    """TimeoutErrors raised by units (ex: network timeouts) are regular exceptions"""
+    dev_context.register_unit(DummyNetworkTimeoutStockT2Unit)
+    col = dev_context.db.get_collection("t2")
+    col.update_one({}, {"$set": {"unit": "DummyNetworkTimeoutStockT2Unit"}})
+    dev_context.db.get_collection("stock").insert_one({"stock": "stockystock"})
+
+    t2 = T2Worker(
+        context=dev_context, raise_exc=False, process_name="t2",
+        unit_timeout={"DummyNetworkTimeoutStockT2Unit": 5},
+        isolated_units=["DummyNetworkTimeoutStockT2Unit"] if isolated else [],
+    )
+    assert t2.run() == 1
+    assert col.find_one({})["code"] == DocumentCode.EXCEPTION
+
+    t2 = T2Worker(context=dev_context, raise_exc=True, process_name="t2", unit_timeout={"DummyNetworkTimeoutStockT2Unit": 5})
+    col.update_one({}, {"$set": {"code": DocumentCode.NEW}})
+    with pytest.raises(TimeoutError):
+        t2.run()
+
+
+def test_unit_instance_cache(dev_context, ingest_stock_t2):
+    t2 = T2Worker(context=dev_context, raise_exc=True, process_name="t2", unit_cache_size=1)
+    col = dev_context.db.get_collection("t2")
+
+    stats = {}
+    with collect_diff(stats):
+        assert t2.run() == 1
+    assert stats[("ampel_t2_unit_instantiation_seconds_count", (("unit", "DummyStockT2Unit"),))] == 1
+    (unit, _), = t2._instances.values()
+
+    # instance survives across runs
+    col.update_one({}, {"$set": {"code": DocumentCode.NEW}})
+    assert t2.run() == 1
+    assert t2._instances["DummyStockT2Unit_None"][0] is unit
+
+    # least recently used instance is evicted
+    col.update_one({}, {"$set": {"code": DocumentCode.NEW, "config": {}}})
+    assert t2.run() == 1
+    assert list(t2._instances) == ["DummyStockT2Unit_{}"]
+
+
+def test_isolated_instance_cache(monkeypatch):
+    monkeypatch.setattr(isolation, "_instances", OrderedDict())
+    for sleep in (0, 0.001, 0):
+        ret, _ = isolation.run_unit(
+            f"DummySleepyStockT2Unit_{sleep}", "ampel.test.dummy", "DummySleepyStockT2Unit",
+            {"sleep": sleep}, ({"stock": 1},), 0, cache_size=1
+        )
+        assert ret == {"id": 1}
+    assert list(isolation._instances) == ["DummySleepyStockT2Unit_0"]
+
+
+def test_isolated_instance_logs(monkeypatch):
+    monkeypatch.setattr(isolation, "_instances", OrderedDict())
+    for _ in range(2):
+        for sleep in (0, 0.001):
+            k = f"DummySleepyStockT2Unit_{sleep}"
+            _, records = isolation.run_unit(
+                k, "ampel.test.dummy", "DummySleepyStockT2Unit",
+                {"sleep": sleep}, ({"stock": 1},), 0, cache_size=1
+            )
+            # each instance (including re-created ones) logs through its own handler
+            assert [(r["name"], r["msg"]) for r in records] == [(k, "Going to sleep")]
@@ -0,0 +1,66 @@
+import pytest
+
+from ampel.core.EventHandler import EventHandler
+from ampel.log.AmpelLogger import AmpelLogger
+from ampel.struct.AmpelBuffer import AmpelBuffer
+from ampel.t3.stage.T3AggregatingStager import T3AggregatingStager, compile_json_path
+from ampel.util.mappings import get_by_json_path
+from ampel.view.T3Store import T3Store
+
+
+def get_buffers(n: int):
+    return (
+        AmpelBuffer(
+            id=i,
+            t0=[{"id": j, "body": {"mag": j, "jd": 10 * j}} for j in range(3)],  # type: ignore[typeddict-item]
+            t1=[{"unit": "T1Dummy", "code": 0, "dps": [0, 1]}, {"unit": "T1Dummy", "code": 0, "dps": [0, 1, 2]}],  # type: ignore[typeddict-item]
+            t2=[
+                {
+                    "unit": "T2Dummy",
+                    "code": 0,
+                    "body": [{"data": [{"a": i, "b": 2}]}],
+                    "meta": [{"tier": 2, "code": 0}],
+                }
+            ],  # type: ignore[typeddict-item]
+        )
+        for i in range(n)
+    )
+
+
+def get_stager(context, **kwargs) -> T3AggregatingStager:
+    return T3AggregatingStager(
+        context=context,
+        logger=AmpelLogger.get_logger(),
+        event_hdlr=EventHandler("t3", context.db, tier=3, run_id=1),
+        t0={"field": "body.mag"},
+        t1={"unit": "T1Dummy", "field": "dps"},
+        t2={"unit": "T2Dummy", "field": "data[0].*"},
+        **kwargs,
+    )
+
+
+@pytest.mark.parametrize("path", ["body[0].data[0].*", "body[0].data[0].a", "body[-1].nope", "id"])
+def test_compile_json_path(path):
+    d = {"id": 1, "body": [{"data": [{"a": 1, "b": 2}]}]}
+    assert compile_json_path(path)(d) == get_by_json_path(d, path)
+
+
+def test_aggregate(mock_context):
+    docs = list(get_stager(mock_context).stage(get_buffers(3), T3Store()))  # type: ignore[arg-type]
+    assert len(docs) == 1
+    assert docs[0]["stock"] == [0, 1, 2]
+    assert docs[0]["body"]["1"] == {"mag": [0, 1, 2], "dps": [0, 1, 2], "a": 1, "b": 2}  # type: ignore[index]
+
+
+def test_aggregate_split_tiers(mock_context):
+    docs = list(get_stager(mock_context, split_tiers=True).stage(get_buffers(1), T3Store()))  # type: ignore[arg-type]
+    assert docs[0]["body"]["0"] == {  # type: ignore[index]
+        "t0": {"mag": [0, 1, 2]}, "t1": {"dps": [0, 1, 2]}, "t2": {"a": 0, "b": 2}
+    }
+
+
+def test_aggregate_shards(mock_context):
+    docs = list(get_stager(mock_context, shard_size=200).stage(get_buffers(10), T3Store()))  # type: ignore[arg-type]
+    assert len(docs) > 1
+    assert sum((doc["stock"] for doc in docs), []) == list(range(10))  # type: ignore[arg-type]
+    assert [k for doc in docs for k in doc["body"]] == [str(i) for i in range(10)]  # type: ignore[union-attr]
@@ -5,6 +5,8 @@ import pytest
 
 from ampel.content.StockDocument import StockDocument
 from ampel.struct.AmpelBuffer import AmpelBuffer
+from ampel.model.operator.AllOf import AllOf
+from ampel.model.operator.AnyOf import AnyOf
 from ampel.log.AmpelLogger import AmpelLogger, DEBUG
 from ampel.t3.stage.project.T3ChannelProjector import T3ChannelProjector
 
@@ -116,3 +118,33 @@ def test_multi_channel(stock_doc, logger, logic_op):
                 channel
             ).issubset(target):
                 raise
+
+
+def test_channel_index(logger):
+    from ampel.t3.stage.ChannelIndex import ChannelIndex
+    from ampel.t3.stage.filter.T3AmpelBufferFilter import T3AmpelBufferFilter
+
+    buffers = [
+        AmpelBuffer(
+            id=i,
+            stock={"stock": i, "channel": chans, "journal": [], "ts": {}},  # type: ignore[typeddict-item]
+            t2=[
+                {"unit": "A", "channel": chans},
+                {"unit": "B", "channel": chans[0]},
+                {"unit": "C", "channel": ["OTHER"]},
+            ],  # type: ignore[typeddict-item]
+        )
+        for i, chans in enumerate([["CHAN1"], ["CHAN2", "CHAN1"], ["CHAN2"], ["CHAN3"]])
+    ]
+    index = ChannelIndex(buffers)
+    assert index.stock == {"CHAN1": [0, 1], "CHAN2": [1, 2], "CHAN3": [3]}
+    nested = AnyOf[str](any_of=[AllOf[str](all_of=["CHAN1", "CHAN2"]), "CHAN3"])
+    assert [ab["id"] for ab in index.select(nested)] == [1, 3]
+
+    for channel in ("CHAN1", "CHAN2", {"any_of": ["CHAN1", "CHAN3"]}, {"all_of": ["CHAN1", "CHAN2"]}):
+        filtr = T3AmpelBufferFilter(channel=channel, logger=logger)
+        proj = T3ChannelProjector(channel=channel, logger=logger)
+        expected = proj.project(filtr.filter(buffers))
+        filtr.set_channel_index(index)
+        proj.set_channel_index(index)
+        assert proj.project(filtr.filter(buffers)) == expected
@@ -0,0 +1,99 @@
+import pytest
+
+from ampel.core.EventHandler import EventHandler
+from ampel.dev.DevAmpelContext import DevAmpelContext
+from ampel.model.UnitModel import UnitModel
+from ampel.t3.AdaptiveChunker import AdaptiveChunker
+from ampel.t3.supply.T3DefaultBufferSupplier import T3DefaultBufferSupplier
+from ampel.view.T3Store import T3Store
+
+
+@pytest.fixture
+def stocks(mock_context: DevAmpelContext):
+    mock_context.db.get_collection("stock").insert_many(
+        [{"stock": i, "channel": ["TEST_CHANNEL"]} for i in range(10)]
+    )
+    return list(range(10))
+
+
+def get_supplier(context: DevAmpelContext, ampel_logger, **kwargs) -> T3DefaultBufferSupplier:
+    return context.loader.new_context_unit(
+        UnitModel(
+            unit="T3DefaultBufferSupplier",
+            config={
+                "select": {"unit": "T3StockSelector"},
+                "load": {
+                    "unit": "T3SimpleDataLoader",
+                    "config": {"directives": [{"col": "stock"}]},
+                },
+                "chunk_size": 3,
+            } | kwargs,
+        ),
+        context=context,
+        sub_type=T3DefaultBufferSupplier,
+        logger=ampel_logger,
+        event_hdlr=EventHandler("t3", context.db, tier=3, run_id=1),
+    )
+
+
+@pytest.mark.parametrize("prefetch", [0, 1, 3])
+def test_prefetch(mock_context, stocks, ampel_logger, prefetch):
+    supplier = get_supplier(mock_context, ampel_logger, prefetch=prefetch)
+    assert [ab["id"] for ab in supplier.supply(T3Store())] == stocks
+
+
+def test_prefetch_early_exit(mock_context, stocks, ampel_logger):
+    supplier = get_supplier(mock_context, ampel_logger, prefetch=1)
+    gen = supplier.supply(T3Store())
+    assert next(gen)["id"] == 0
+    # closing the generator stops the background thread
+    gen.close()
+
+
+@pytest.mark.parametrize("prefetch", [0, 2])
+def test_stream_selection(mock_context, stocks, ampel_logger, prefetch):
+    supplier = get_supplier(
+        mock_context, ampel_logger, prefetch=prefetch, stream_selection=True
+    )
+    assert [ab["id"] for ab in supplier.supply(T3Store())] == stocks
+
+
+@pytest.mark.parametrize("stream_selection", [False, True])
+def test_empty_selection(mock_context, ampel_logger, stream_selection):
+    supplier = get_supplier(mock_context, ampel_logger, stream_selection=stream_selection)
+    assert list(supplier.supply(T3Store())) == []
+
+
+def test_fetch_pages_resume(mock_context, stocks, ampel_logger):
+    selector = get_supplier(mock_context, ampel_logger).selector
+    pages = list(selector.fetch_pages(4))
+    assert [len(page) for page in pages] == [4, 4, 2]
+    assert [doc["stock"] for doc in sum(pages, [])] == stocks
+    # resume after the first page
+    resumed = list(selector.fetch_pages(4, after=pages[0][-1]["_id"]))
+    assert [doc["stock"] for doc in sum(resumed, [])] == stocks[4:]
+
+
+@pytest.mark.parametrize("prefetch", [0, 1])
+def test_chunk_budget(mock_context, stocks, ampel_logger, prefetch):
+    # stock documents only: 1 doc per buffer
+    supplier = get_supplier(
+        mock_context, ampel_logger, prefetch=prefetch, chunk_budget=2
+    )
+    assert [ab["id"] for ab in supplier.supply(T3Store())] == stocks
+    assert supplier.event_hdlr.extra == {"chunk_sizes": [[3, 1], [2, 3], [1, 1]]}
+
+
+def test_adaptive_chunker():
+    chunker = AdaptiveChunker(10, budget=100, max_size=50)
+    gen = chunker.chunks(range(1000))
+    assert len(next(gen)) == 10
+    # dense elements: shrink immediately
+    chunker.update(10, 500)
+    assert len(next(gen)) == 2
+    # sparse elements: growth limited to a factor 2 per chunk
+    chunker.update(2, 2)
+    assert len(next(gen)) == 4
+    chunker.update(4, 4)
+    assert len(next(gen)) == 8
+    assert chunker.get_report() == [[10, 1], [2, 1], [4, 1], [8, 1]]
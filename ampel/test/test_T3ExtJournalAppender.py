@@ -0,0 +1,62 @@
+import pytest
+
+from ampel.dev.DevAmpelContext import DevAmpelContext
+from ampel.log.AmpelLogger import AmpelLogger
+from ampel.struct.AmpelBuffer import AmpelBuffer
+from ampel.t3.supply.complement.T3ExtJournalAppender import T3ExtJournalAppender
+from ampel.view.T3Store import T3Store
+
+
+@pytest.fixture
+def ext_context(patch_mongo, testing_config):
+    return DevAmpelContext.load(
+        config=str(testing_config),
+        purge_db=True,
+        custom_conf={"resource.ext_mongo": "mongodb://ext:27017"},
+    )
+
+
+def get_buffers():
+    return [
+        AmpelBuffer(
+            id=i,
+            stock={"stock": i, "journal": [{"ts": 10 + i, "tier": 0}]},  # type: ignore[typeddict-item]
+        )
+        for i in range(3)
+    ]
+
+
+@pytest.mark.parametrize("cached", [False, True])
+def test_complement(ext_context, tmp_path, cached):
+    appender = T3ExtJournalAppender(
+        context=ext_context,
+        logger=AmpelLogger.get_logger(),
+        cache_path=str(tmp_path / "journals") if cached else None,
+    )
+    appender.col.insert_many(
+        [{"_id": i, "journal": [{"ts": i, "tier": -1}]} for i in (0, 2)]
+    )
+
+    for _ in range(2):
+        buffers = get_buffers()
+        appender.complement(buffers, T3Store())
+        assert [el["ts"] for el in buffers[0]["stock"]["journal"]] == [10, 0]  # type: ignore[index]
+        assert [el["ts"] for el in buffers[1]["stock"]["journal"]] == [11]  # type: ignore[index]
+        assert [el["ts"] for el in buffers[2]["stock"]["journal"]] == [12, 2]  # type: ignore[index]
+        if cached:
+            # journals (and missing journals) are served from the local cache
+            appender.col.delete_many({})
+
+    appender.close()
+    assert appender._cache is None
+
+
+def test_cache_keys(ext_context, tmp_path):
+    appender = T3ExtJournalAppender(
+        context=ext_context, logger=AmpelLogger.get_logger(), cache_path=str(tmp_path / "journals")
+    )
+    appender.col.insert_one({"_id": 1, "journal": [{"ts": 1, "tier": -1}]})
+    assert appender.get_ext_journal(1) == [{"ts": 1, "tier": -1}]
+    # int and str stock ids are not confused
+    assert appender.get_ext_journal("1") is None
+    appender.close()
@@ -1,7 +1,11 @@
 import pytest, mongomock
 
+from ampel.enum.DocumentCode import DocumentCode
+
 from ampel.t3.supply.select.T3FilteringStockSelector import T3FilteringStockSelector
 from ampel.t2.T2Worker import T2Worker
+from ampel.test.dummy import DummyStockT2Unit
+from ampel.mongo.update.MongoStockUpdater import MongoStockUpdater
 
 
 @pytest.fixture
@@ -61,3 +65,76 @@ def test_filter(dev_context, processed_t2s, ampel_logger):
 
     assert len(ids := list(selector.fetch())) == 1
     assert ids[0] == {"stock": "stockystock"}
+
+
+def test_filter_summary(dev_context, ingest_tied_t2, ampel_logger):
+    num_docs = T2Worker(
+        context=dev_context,
+        raise_exc=True,
+        process_name="t2",
+        run_dependent_t2s=True,
+        summary_col="t2summary",
+    ).run()
+    assert num_docs
+
+    summary = dev_context.db.get_collection("t2summary").find_one({"_id": "stockystock"})
+    assert summary["channel"] == ["TEST_CHANNEL"]
+    assert set(summary.keys()) == {"_id", "channel", ingest_tied_t2.param, "DummyTiedStateT2Unit"}
+
+    def select(t2_filter, channel="TEST_CHANNEL"):
+        return list(
+            T3FilteringStockSelector(
+                context=dev_context,
+                logger=ampel_logger,
+                channel=channel,
+                t2_filter=t2_filter,
+                summary_col="t2summary",
+            ).fetch()
+        )
+
+    assert select({"unit": "DummyTiedStateT2Unit", "match": {}}) == [{"stock": "stockystock"}]
+    assert select({"unit": "DummyStockT2Unit", "match": {"nope": 1}}) == []
+    assert select({"unit": "DummyTiedStateT2Unit", "match": {}}, channel="OTHER_CHANNEL") == []
+    # units without result do not match
+    assert select({"unit": "DummyCustomStateT2Unit", "match": {}}) == []
+
+    # unsuccessful re-run
+    t2 = T2Worker(context=dev_context, process_name="t2", summary_col="t2summary")
+    doc = dev_context.db.get_collection("t2").find_one({"unit": "DummyTiedStateT2Unit"})
+    t2.commit_update(
+        {"_id": doc["_id"]}, t2.gen_meta(1, None, 0), ampel_logger, code=DocumentCode.ERROR, doc=doc
+    )
+    assert select({"unit": "DummyTiedStateT2Unit", "match": {}}) == []
+    assert ingest_tied_t2.param in dev_context.db.get_collection("t2summary").find_one({"_id": "stockystock"})
+
+
+@pytest.mark.parametrize("failing", ["unit", "worker"])
+def test_filter_summary_exception(dev_context, ingest_stock_t2, ampel_logger, monkeypatch, failing):
+
+    col_t2 = dev_context.db.get_collection("t2")
+    col_summary = dev_context.db.get_collection("t2summary")
+    dev_context.db.get_collection("stock").insert_one({"stock": "stockystock", "channel": ["TEST_CHANNEL"]})
+    assert T2Worker(context=dev_context, process_name="t2", summary_col="t2summary").run() == 1
+    assert "DummyStockT2Unit" in col_summary.find_one({"_id": "stockystock"})
+
+    # re-run raising an exception (in the unit or in the worker) removes the previous result
+    def fail(self, *args):
+        raise ValueError("boom")
+
+    if failing == "unit":
+        monkeypatch.setattr(DummyStockT2Unit, "process", fail)
+    else:
+        monkeypatch.setattr(MongoStockUpdater, "add_journal_record", fail)
+    col_t2.update_many({}, {"$set": {"code": DocumentCode.RERUN_REQUESTED}})
+    assert T2Worker(context=dev_context, process_name="t2", summary_col="t2summary").run() == 1
+    assert col_t2.find_one({})["code"] == DocumentCode.EXCEPTION
+    assert "DummyStockT2Unit" not in col_summary.find_one({"_id": "stockystock"})
+
+    selector = T3FilteringStockSelector(
+        context=dev_context,
+        logger=ampel_logger,
+        channel="TEST_CHANNEL",
+        t2_filter={"unit": "DummyStockT2Unit", "match": {}},
+        summary_col="t2summary",
+    )
+    assert list(selector.fetch()) == []
@@ -0,0 +1,60 @@
+import pytest
+from bson import ObjectId
+
+from ampel.dev.DevAmpelContext import DevAmpelContext
+from ampel.log.AmpelLogger import AmpelLogger
+from ampel.log.LogFlag import LogFlag
+from ampel.struct.AmpelBuffer import AmpelBuffer
+from ampel.t3.supply.complement.T3LogsAppender import T3LogsAppender
+from ampel.view.T3Store import T3Store
+
+
+@pytest.fixture
+def logs(integration_context: DevAmpelContext):
+    docs = [
+        {"_id": ObjectId(), "s": stock, "f": int(LogFlag.INFO), "r": 1, "m": f"msg{i}"}
+        for i in range(3)
+        for stock in (1, 2, 3)
+    ]
+    # entry associated with several stocks
+    docs.append({"_id": ObjectId(), "s": [2, 3], "f": int(LogFlag.INFO), "r": 1, "m": "msg3"})
+    integration_context.db.get_collection("logs").insert_many(docs)
+    return docs
+
+
+@pytest.mark.parametrize("cap", [None, 2])
+def test_complement(integration_context, logs, cap):
+    appender = T3LogsAppender(
+        context=integration_context,
+        logger=AmpelLogger.get_logger(),
+        use_last_run=False,
+        max_logs_per_stock=cap,
+    )
+    buffers = [AmpelBuffer(id=i) for i in (0, 1, 2)]
+    appender.complement(buffers, T3Store())
+
+    assert buffers[0]["logs"] == []
+    for ab in buffers[1:]:
+        msgs = [l["m"] for l in ab["logs"]]  # type: ignore[union-attr]
+        assert all(l["s"] in (ab["id"], [2, 3]) for l in ab["logs"])  # type: ignore[union-attr]
+        if ab["id"] == 1:
+            assert msgs == (["msg0", "msg1", "msg2"] if cap is None else ["msg1", "msg2"])
+        else:
+            assert msgs == (["msg0", "msg1", "msg2", "msg3"] if cap is None else ["msg2", "msg3"])
+
+
+@pytest.mark.parametrize("cap", [None, 1])
+def test_append_multi(cap):
+    oids = [ObjectId() for _ in range(3)]
+    buffers = {i: AmpelBuffer(id=i) for i in (1, 2)}
+    buffers[1]["logs"] = [{"_id": oids[1], "s": 1}]
+    logs = [{"_id": oids[2], "s": [1, 2, 3]}, {"_id": oids[0], "s": [1, 1]}]
+
+    count = T3LogsAppender._append_multi(buffers, logs, cap)
+    if cap is None:
+        assert count == 3
+        assert [l["_id"] for l in buffers[1]["logs"]] == oids
+    else:
+        assert count == 1
+        assert [l["_id"] for l in buffers[1]["logs"]] == oids[2:]
+    assert [l["_id"] for l in buffers[2]["logs"]] == oids[2:]
@@ -0,0 +1,72 @@
+import mongomock
+import pytest
+
+from ampel.enum.DocumentCode import DocumentCode
+from ampel.core.UnitClaimScheduler import UnitClaimScheduler
+from ampel.mongo.utils import maybe_match_array
+
+
+@pytest.fixture
+def t2_col():
+    col = mongomock.MongoClient().db.t2
+    col.insert_many(
+        [{"unit": "SlowUnit", "code": DocumentCode.NEW} for _ in range(10)]
+        + [{"unit": "FastUnit", "code": DocumentCode.NEW} for _ in range(10)]
+        + [{"unit": "FastUnit", "code": DocumentCode.T2_NEW_PRIO} for _ in range(2)]
+    )
+    return col
+
+
+def claim_all(scheduler):
+    claimed = []
+    while doc := scheduler.claim({"$set": {"code": DocumentCode.RUNNING}}):
+        claimed.append((doc["unit"], doc["code"]))
+    return claimed
+
+
+def test_weighted_claims(t2_col):
+    scheduler = UnitClaimScheduler(
+        t2_col,
+        {"code": maybe_match_array([DocumentCode.NEW, DocumentCode.T2_NEW_PRIO])},
+        tier=2,
+        weights={"FastUnit": 3},
+        prio_code=DocumentCode.T2_NEW_PRIO,
+    )
+    doc = scheduler.claim({"$set": {"code": DocumentCode.RUNNING}})
+    assert scheduler.backlog == {"SlowUnit": 10, "FastUnit": 10}
+    assert scheduler.prio_backlog == {"SlowUnit": 0, "FastUnit": 2}
+
+    claimed = [(doc["unit"], doc["code"])] + claim_all(scheduler)
+    assert len(claimed) == 22
+
+    # priority class first
+    assert claimed[:2] == [("FastUnit", DocumentCode.T2_NEW_PRIO)] * 2
+    # then 3 claims of FastUnit for each claim of SlowUnit
+    assert [el[0] for el in claimed[2:10]] == ["FastUnit", "SlowUnit", "FastUnit", "FastUnit"] * 2
+
+
+def test_excluded_ids(t2_col):
+    ids = [doc["_id"] for doc in t2_col.find({"unit": "SlowUnit"})]
+    scheduler = UnitClaimScheduler(t2_col, {"code": DocumentCode.NEW}, tier=2, weights={})
+    while scheduler.claim({"$set": {"code": DocumentCode.RUNNING}}, exclude=ids):
+        pass
+    assert t2_col.count_documents({"code": DocumentCode.NEW}) == 10
+
+
+def test_backlog_refresh(t2_col, monkeypatch):
+    scheduler = UnitClaimScheduler(
+        t2_col, {"code": DocumentCode.NEW}, tier=2, weights={"FastUnit": 3}, refresh_interval=3600
+    )
+    counts = []
+    aggregate = t2_col.aggregate
+    monkeypatch.setattr(t2_col, "aggregate", lambda *args, **kwargs: counts.append(1) or aggregate(*args, **kwargs))
+
+    claimed = claim_all(scheduler)
+    assert len(claimed) == 20
+    # one count at start, one once estimated backlogs are exhausted
+    assert len(counts) == 2
+    assert [el[0] for el in claimed[:8]] == ["FastUnit", "SlowUnit", "FastUnit", "FastUnit"] * 2
+
+    # documents added after the last count are claimed regardless of the interval
+    t2_col.insert_one({"unit": "SlowUnit", "code": DocumentCode.NEW})
+    assert claim_all(scheduler) == [("SlowUnit", DocumentCode.NEW)]
@@ -0,0 +1,57 @@
+import pickle
+
+from ampel.struct.AmpelBuffer import AmpelBuffer
+from ampel.view.SnapView import SnapView
+from ampel.t3.stage.ViewBacking import ViewBacking, get_lazy_view_type
+
+
+def get_buffer() -> AmpelBuffer:
+    return AmpelBuffer(
+        id=1,
+        stock={"stock": 1, "channel": ["A", "B"], "tag": ["X"]},
+        t0=[{"id": 1, "body": {"mag": 18.0}}, {"id": 2, "body": {"mag": 18.5}}],
+        t1=[{"link": 1, "dps": [1, 2], "channel": ["A"]}],
+        extra={"foo": [1, 2]},
+    )
+
+
+def test_lazy_view():
+
+    ab = get_buffer()
+    backing = ViewBacking(ab)
+    LazyView = get_lazy_view_type(SnapView)
+    assert LazyView is not None
+    assert get_lazy_view_type(SnapView) is LazyView
+
+    view = LazyView.of_backing(backing)  # type: ignore[attr-defined]
+    assert isinstance(view, SnapView)
+    assert view.id == 1
+
+    # Nothing frozen before access
+    assert backing.cache == {}
+    assert view.t0[1]["body"]["mag"] == 18.5
+    assert set(backing.cache) == {"t0"}
+
+    eager = SnapView.of(ab)
+    for k in ("id", "stock", "origin", "t0", "t1", "t2", "logs", "extra"):
+        assert getattr(view, k) == getattr(eager, k)
+
+    # Views created from the same backing share content
+    other = LazyView.of_backing(backing)  # type: ignore[attr-defined]
+    assert other is not view
+    assert other.stock is view.stock
+
+    # Unpickled as eager view
+    copy = pickle.loads(pickle.dumps(view))
+    assert type(copy) is SnapView
+    assert copy.t1 == eager.t1
+
+
+def test_custom_view_type():
+
+    class CustomView(SnapView):
+        @classmethod
+        def of(cls, ab, conf=None, freeze=True):
+            return super().of(ab, conf, freeze)
+
+    assert get_lazy_view_type(CustomView) is None
@@ -0,0 +1,90 @@
+from typing import Any
+
+import pytest
+from bson import BSON
+from bson.binary import Binary
+
+from ampel.dev.DevAmpelContext import DevAmpelContext
+from ampel.enum.DocumentCode import DocumentCode
+from ampel.t2.T2Worker import T2Worker
+from ampel.test.dummy import DummyArrayStockT2Unit
+from ampel.util.compact import encode_arrays, decode_arrays
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        [float(i) / 3 for i in range(100)],
+        [[float(i * j) for j in range(10)] for i in range(10)],
+        [[[i, j, k] for k in range(3)] for j in range(2) for i in range(4)],
+        list(range(-50, 50)),
+        [2**62, -(2**62)] * 10,
+    ],
+)
+def test_roundtrip(value):
+    enc = encode_arrays({"a": value, "b": "x"})
+    assert isinstance(enc["a"], Binary)
+    assert enc["b"] == "x"
+    assert decode_arrays(enc) == {"a": value, "b": "x"}
+    # survives bson serialization
+    assert decode_arrays(BSON.encode(enc).decode()) == {"a": value, "b": "x"}
+
+
+def test_compact_size():
+    body = {"cov": [[i * 0.1 + j for j in range(10)] for i in range(10)]}
+    assert len(BSON.encode(encode_arrays(body))) < 0.75 * len(BSON.encode(body))
+
+
+def test_mixed_types():
+    # ints are promoted to floats if lossless
+    assert decode_arrays(encode_arrays([1, 2.5] * 10)) == [1.0, 2.5] * 10
+    # otherwise arrays are left as is
+    value = [2**60, 2.5] * 10
+    assert encode_arrays(value) == value
+    value = [2**64] * 20
+    assert encode_arrays(value) == value
+
+
+MIXED: list[Any] = [1.0] * 10 + [None] * 10
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        [1.0] * 15,  # too short
+        [[1.0] * 10, [1.0] * 9],  # not rectangular
+        [True] * 20,
+        ["a"] * 20,
+        MIXED,
+    ],
+)
+def test_unchanged(value):
+    assert encode_arrays(value) == value
+
+
+def test_frozen():
+    enc = encode_arrays({"a": [[1.0, 2.0]] * 10, "b": [1, "a"]})
+    assert decode_arrays(enc, frozen=True) == {"a": ((1.0, 2.0),) * 10, "b": [1, "a"]}
+    # nothing to decode: same object
+    d = {"a": [1, 2]}
+    assert decode_arrays(d) is d
+
+
+def test_worker(dev_context: DevAmpelContext, ingest_stock_t2):
+    dev_context.register_unit(DummyArrayStockT2Unit)
+    dev_context.db.get_collection("stock").insert_one({"stock": "stockystock", "channel": ["TEST_CHANNEL"]})
+    col = dev_context.db.get_collection("t2")
+    col.update_one({}, {"$set": {"unit": "DummyArrayStockT2Unit"}})
+
+    for _ in range(3):
+        t2 = T2Worker(
+            context=dev_context, raise_exc=True, process_name="t2",
+            compact_arrays=4, max_bodies=2,
+        )
+        assert t2.run() == 1
+        col.update_one({}, {"$set": {"code": DocumentCode.NEW}})
+
+    doc = col.find_one({})
+    assert len(doc["body"]) == 2
+    assert all(isinstance(b["cov"], Binary) for b in doc["body"])
+    assert decode_arrays(doc["body"])[-1]["cov"][3] == [0.0, 3.0, 6.0, 9.0]
@@ -12,7 +12,7 @@ from prometheus_client.openmetrics.exposition import generate_latest
 from ampel.metrics.AmpelMetricsRegistry import AmpelMetricsRegistry
 from ampel.metrics.AmpelProcessCollector import AmpelProcessCollector
 from ampel.metrics.prometheus import mmap_dict
-from ampel.util.concurrent import _Process, process
+from ampel.util.concurrent import _Process, process, ReusableProcess, TimeBudgetExceeded
 
 
 def echo(arg):
@@ -331,3 +331,24 @@ async def test_replica_numbering():
     await launch()
     assert not _Process._active
     assert not _Process._expired
+
+
+def test_reusable_process():
+    p = ReusableProcess()
+    try:
+        assert p.call(echo, 42) == 42
+        pid = p.pid
+        assert p.call(echo, "foo") == "foo"
+        assert p.pid == pid, "subprocess is reused"
+        with pytest.raises(NotImplementedError):
+            p.call(throw)
+        assert p.pid == pid, "subprocess survives exceptions"
+        with pytest.raises(TimeBudgetExceeded):
+            p.call(time.sleep, 5, timeout=0.5)
+        assert not p.is_alive()
+        assert p.call(echo, 42) == 42
+        assert p.spawn_count == 2
+        with pytest.raises(RuntimeError):
+            p.call(abort)
+    finally:
+        p.stop()
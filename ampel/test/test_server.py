@@ -4,7 +4,7 @@
 # License:             BSD-3-Clause
 # Author:              jvs
 # Date:                Unspecified
-# Last Modified Date:  11.02.2021
+# Last Modified Date:  19.10.2026
 # Last Modified By:    jvs
 
 import asyncio, pytest, yaml
@@ -239,3 +239,16 @@ async def test_event_query(test_client, mocker):
     assert isinstance(andlist := query["$and"], list)
     gtime = andlist[0]["_id"]["$gt"].generation_time
     assert 7200 < (datetime.now(gtime.tzinfo) - gtime).total_seconds() < 7230
+
+
+def test_transform_doc_decodes_arrays():
+    from ampel.util.compact import encode_arrays
+
+    matrix = [[float(i)] * 10 for i in range(10)]
+    doc = {
+        "stock": 1, "code": 0, "journal": [],
+        "body": [{"ts": 0, "cov": matrix}],
+    }
+    doc["body"] = encode_arrays(doc["body"], 20)
+    assert not isinstance(doc["body"][0]["cov"], list)
+    assert server.transform_doc(doc, 2)["body"][0]["cov"] == matrix
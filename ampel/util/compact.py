@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# File:                Ampel-core/ampel/util/compact.py
+# License:             BSD-3-Clause
+# Author:              valery brinnel <firstname.lastname@gmail.com>
+# Date:                19.10.2026
+# Last Modified Date:  19.10.2026
+# Last Modified By:    valery brinnel <firstname.lastname@gmail.com>
+
+import struct, sys
+from array import array
+from typing import Any
+from bson.binary import Binary, USER_DEFINED_SUBTYPE
+
+# Binary layout: typecode (1 byte, 'd': float64, 'q': int64), ndim (1 byte),
+# shape (ndim little endian uint32), row-major little endian values
+ARRAY_SUBTYPE = USER_DEFINED_SUBTYPE
+INT64_MIN, INT64_MAX = -2**63, 2**63 - 1
+
+
+def encode_arrays(arg: Any, min_size: int = 16) -> Any:
+	"""
+	Replaces (possibly nested, rectangular) lists of numbers with at least 'min_size' elements
+	by compact BSON binaries embedding dtype and shape. Other values are returned unchanged.
+	Integers of arrays also containing floats are stored (and decoded) as floats.
+	Ex: a 10x10 covariance matrix shrinks from 1.2 KB (BSON array of arrays) to 820 bytes,
+	an array of 1000 floats from 12.9 KB to 8 KB.
+	"""
+
+	if isinstance(arg, dict):
+		return {k: encode_arrays(v, min_size) for k, v in arg.items()}
+
+	if isinstance(arg, (list, tuple)) and arg:
+		if (shape := _get_shape(arg)) is not None:
+			flat = _flatten(arg, len(shape))
+			if len(flat) >= min_size:
+				if (tc := _get_typecode(flat)):
+					a = array(tc, flat)
+					if sys.byteorder == 'big':
+						a.byteswap()
+					return Binary(
+						struct.pack(f'<cB{len(shape)}I', tc.encode(), len(shape), *shape) + a.tobytes(),
+						ARRAY_SUBTYPE
+					)
+		return [encode_arrays(el, min_size) for el in arg]
+
+	return arg
+
+
+def decode_arrays(arg: Any, frozen: bool = False) -> Any:
+	"""
+	Reverts :func:`encode_arrays`.
+	Containers without encoded arrays are returned as is (no copy).
+	:param frozen: decode arrays as (nested) tuples rather than lists
+	"""
+
+	if isinstance(arg, Binary):
+		return _decode(arg, frozen) if arg.subtype == ARRAY_SUBTYPE else arg
+
+	if not _has_arrays(arg):
+		return arg
+
+	# Preserve container types (ex: ReadOnlyDict, tuples of frozen documents)
+	if isinstance(arg, dict):
+		return arg.__class__({k: decode_arrays(v, frozen) for k, v in arg.items()})
+
+	return arg.__class__(decode_arrays(el, frozen) for el in arg)
+
+
+def _has_arrays(arg: Any) -> bool:
+	if isinstance(arg, Binary):
+		return arg.subtype == ARRAY_SUBTYPE
+	if isinstance(arg, dict):
+		return any(_has_arrays(v) for v in arg.values())
+	if isinstance(arg, (list, tuple)):
+		return any(_has_arrays(v) for v in arg)
+	return False
+
+
+def _decode(b: bytes, frozen: bool) -> Any:
+
+	tc, ndim = struct.unpack_from('<cB', b)
+	shape = struct.unpack_from(f'<{ndim}I', b, 2)
+	a = array(tc.decode())
+	a.frombytes(b[2 + 4 * ndim:])
+	if sys.byteorder == 'big':
+		a.byteswap()
+
+	ret: Any = a.tolist()
+	for n in reversed(shape[1:]):
+		ret = [ret[i:i + n] for i in range(0, len(ret), n)]
+
+	if frozen:
+		return _to_tuple(ret)
+	return ret
+
+
+def _to_tuple(arg: list) -> tuple:
+	return tuple(_to_tuple(el) if isinstance(el, list) else el for el in arg)
+
+
+def _get_shape(arg: Any) -> None | list[int]:
+	""" :returns: shape of a rectangular nested list of numbers, None otherwise """
+
+	if not isinstance(arg, (list, tuple)) or not arg:
+		return None
+
+	if all(isinstance(el, (int, float)) and not isinstance(el, bool) for el in arg):
+		return [len(arg)]
+
+	shapes = [_get_shape(el) for el in arg]
+	if shapes[0] is None or any(s != shapes[0] for s in shapes):
+		return None
+
+	return [len(arg)] + shapes[0]
+
+
+def _flatten(arg: Any, ndim: int) -> list:
+	if ndim == 1:
+		return list(arg)
+	return [x for el in arg for x in _flatten(el, ndim - 1)]
+
+
+def _get_typecode(flat: list) -> None | str:
+	""" :returns: array typecode or None if values cannot be stored losslessly """
+	if any(isinstance(el, float) for el in flat):
+		# Integers beyond 2**53 cannot be represented exactly as float64
+		return 'd' if all(isinstance(el, float) or -2**53 <= el <= 2**53 for el in flat) else None
+	if all(INT64_MIN <= el <= INT64_MAX for el in flat):
+		return 'q'
+	return None
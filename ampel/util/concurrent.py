@@ -13,10 +13,14 @@ from pebble.concurrent.process. Like pebble, the future returned by the
 decorated function can be cancelled to terminate the underlying subprocess.
 Unlike pebble (or concurrent.futures.ProcessPoolExecutor), no extra Python
 threads are needed to manage the process lifecycle.
+
+:class:`ReusableProcess` provides a synchronous, long-lived variant executing
+several calls in the same subprocess, with a per-call time budget.
 """
 
-import asyncio, io, itertools, os, signal, sys, traceback
+import asyncio, io, itertools, os, pickle, select, signal, subprocess, sys, time, traceback
 from typing import Any
+from collections.abc import Callable
 from functools import wraps, partial
 from multiprocessing import reduction, spawn  # type: ignore
 from multiprocessing.context import set_spawning_popen
@@ -41,6 +45,15 @@ def process(function=None, **kwargs):
         return _process_wrapper(function)
 
 
+class TimeBudgetExceeded(BaseException):
+    """
+    Raised when a call exceeds its wall-clock time budget (see :class:`ReusableProcess`).
+    Like KeyboardInterrupt, it does not derive from Exception so that code interrupted
+    by a SIGALRM-based budget (see ampel.t2.isolation.time_limit) cannot swallow it
+    using a broad ``except Exception``.
+    """
+
+
 class RemoteTraceback(Exception):
     """Traceback wrapper for exceptions in remote process.
 
@@ -285,3 +298,153 @@ def _process_wrapper(function, timeout=3.0):
         return asyncio.create_task(proc.launch())
 
     return wrapper
+
+
+def _write_frame(fd: int, payload: bytes) -> None:
+    data = memoryview(len(payload).to_bytes(8, "big") + payload)
+    while data:
+        data = data[os.write(fd, data):]
+
+
+def _read_exactly(fd: int, n: int, deadline: None | float = None) -> None | bytes:
+    """
+    :returns: n bytes or None if the pipe was closed
+    :raises: TimeBudgetExceeded if deadline is exceeded
+    """
+    buf = bytearray()
+    while len(buf) < n:
+        if deadline is not None:
+            if (remaining := deadline - time.monotonic()) <= 0:
+                raise TimeBudgetExceeded
+            if not select.select([fd], [], [], remaining)[0]:
+                raise TimeBudgetExceeded
+        if not (chunk := os.read(fd, n - len(buf))):
+            return None
+        buf += chunk
+    return bytes(buf)
+
+
+def _read_frame(fd: int, deadline: None | float = None) -> None | bytes:
+    if (header := _read_exactly(fd, 8, deadline)) is None:
+        return None
+    return _read_exactly(fd, int.from_bytes(header, "big"), deadline)
+
+
+def reusable_main(read_fd, write_fd):
+    """
+    Execute pickled (callable, args, kwargs) tuples received over pipe until the pipe is closed
+    """
+    if (prep_data := _read_frame(read_fd)) is None:
+        sys.exit(1)
+    prepare(pickle.loads(prep_data))
+    while (frame := _read_frame(read_fd)) is not None:
+        try:
+            target, args, kwargs = pickle.loads(frame)
+            payload = pickle.dumps(target(*args, **kwargs))
+        except Exception as error:
+            error.traceback = traceback.format_exc()
+            try:
+                payload = pickle.dumps(RemoteException(error, error.traceback))
+            except Exception:
+                payload = pickle.dumps(
+                    RemoteException(RuntimeError(repr(error)), error.traceback)
+                )
+        _write_frame(write_fd, payload)
+    sys.exit(0)
+
+
+class ReusableProcess:
+    """
+    Subprocess executing pickleable callables sequentially, thereby amortizing
+    the process startup cost (and allowing the child to cache state, such as
+    unit instances, between calls).
+    Calls are synchronous. If a call exceeds its time budget, the subprocess is
+    killed and TimeBudgetExceeded is raised. The next call spawns a new subprocess.
+    Callables must be importable by the child (module-level functions).
+    """
+
+    def __init__(self, name: str = "reusable") -> None:
+        self.name = name
+        self._proc: None | subprocess.Popen = None
+        self._rx: int = -1
+        self._tx: int = -1
+        #: number of (re)spawned subprocesses
+        self.spawn_count = 0
+
+    @property
+    def pid(self) -> None | int:
+        return self._proc.pid if self._proc else None
+
+    def is_alive(self) -> bool:
+        return self._proc is not None and self._proc.poll() is None
+
+    def start(self) -> None:
+        child_r, parent_w = os.pipe()
+        parent_r, child_w = os.pipe()
+        self._proc = subprocess.Popen(
+            (
+                spawn.get_executable(),
+                *_args_from_interpreter_flags(),
+                "-c",
+                f"from ampel.util.concurrent import reusable_main; reusable_main({child_r}, {child_w})",
+            ),
+            pass_fds=(child_r, child_w),
+            start_new_session=True,
+        )
+        os.close(child_r)
+        os.close(child_w)
+        self._rx, self._tx = parent_r, parent_w
+        self.spawn_count += 1
+        set_spawning_popen(self)  # type: ignore[arg-type]
+        try:
+            prep_data = pickle.dumps(spawn.get_preparation_data(self.name))
+        finally:
+            set_spawning_popen(None)
+        _write_frame(self._tx, prep_data)
+
+    def call(self, target: Callable, *args, timeout: None | float = None, **kwargs) -> Any:
+        """
+        :param timeout: wall-clock budget of the call in seconds
+        :raises: TimeBudgetExceeded if budget is exceeded, RuntimeError if the subprocess died,
+        or any exception raised by target
+        """
+        if not self.is_alive():
+            self.stop()
+            self.start()
+        try:
+            _write_frame(self._tx, pickle.dumps((target, args, kwargs)))
+            payload = _read_frame(
+                self._rx, None if timeout is None else time.monotonic() + timeout
+            )
+        except TimeBudgetExceeded:
+            self.kill()
+            raise TimeBudgetExceeded(f"Process {self.name} exceeded time budget ({timeout}s)")
+        except BrokenPipeError:
+            payload = None
+        if payload is None:
+            exitcode = self._proc.wait() if self._proc else None
+            self.stop()
+            raise RuntimeError(f"Process {self.name} died (exit code: {exitcode})")
+        ret = pickle.loads(payload)
+        if isinstance(ret, BaseException):
+            raise ret
+        return ret
+
+    def kill(self) -> None:
+        if self._proc and self._proc.poll() is None:
+            self._proc.kill()
+        self.stop()
+
+    def stop(self, timeout: float = 3.0) -> None:
+        """ Closes pipes (which makes the child exit) and reaps the subprocess """
+        for fd in (self._rx, self._tx):
+            if fd >= 0:
+                os.close(fd)
+        self._rx = self._tx = -1
+        if self._proc:
+            try:
+                self._proc.wait(timeout)
+            except subprocess.TimeoutExpired:
+                self._proc.kill()
+                self._proc.wait()
+            self._proc = None
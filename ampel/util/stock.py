@@ -4,14 +4,14 @@
 # License:             BSD-3-Clause
 # Author:              valery brinnel <firstname.lastname@gmail.com>
 # Date:                29.04.2020
-# Last Modified Date:  29.04.2020
+# Last Modified Date:  19.10.2026
 # Last Modified By:    valery brinnel <firstname.lastname@gmail.com>
 
-from pymongo import MongoClient
 from pymongo.collection import Collection
 from multiprocessing import Pool
 from collections.abc import Sequence
 from ampel.types import ChannelId, StockId
+from ampel.mongo.MongoClientRegistry import MongoClientRegistry
 
 
 def get_ids_using_find(
@@ -41,7 +41,7 @@ def get_ids_using_parallel_find(
 
 	if isinstance(channel, (int, str)):
 		return get_ids_using_find(
-			MongoClient(mongo_uri) \
+			MongoClientRegistry.get(mongo_uri) \
 				.get_database(db_name) \
 				.get_collection(col_name),
 			channel, batch_size
@@ -73,7 +73,7 @@ def find_ids_worker(
 	col_name='stock', batch_size=1000000
 ) -> set[StockId]:
 
-	mc = MongoClient(mongo_uri)
+	mc = MongoClientRegistry.get(mongo_uri)
 	db = mc.get_database(db_name)
 
 	return {